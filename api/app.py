@@ -1,14 +1,34 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from elevenlabs import ElevenLabs, VoiceSettings
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+from elevenlabs import VoiceSettings
 import os
-import logging
-from io import BytesIO
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from api.routes.chat_route import router as chat_router
 from api.routes.extract_info_routes import router as extract_info_routes
 from api.config.logging_config import setup_logging, get_logger
+from api.services.tts_service import (
+    TTSService,
+    SynthesisOptions,
+    prime,
+)
+from api.services.tts_warmup import warmup_tts_cache
+from api.services.openai_service import OpenAIService
+from api.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from api.services.tts_scheduler import tts_scheduler
+from api.services.tts_cache import (
+    is_valid_key,
+    parse_range,
+    guess_audio_media_type,
+    COPY_CHUNK_SIZE,
+)
+from api.services.text_normalization import split_sentences
+from api.services.request_timing import ServerTimingMiddleware, phase
+from api.config.performance_config import PerformanceConfig, cache_manager
+from api.config import metrics
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -17,7 +37,25 @@ load_dotenv()
 setup_logging(level="INFO")
 logger = get_logger(__name__)
 
-app = FastAPI(title="Text-to-Speech API with ElevenLabs")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # گرم‌کردن کش TTS در پس‌زمینه تا شروع سرور منتظر ElevenLabs نماند
+    warmup_task = None
+    if PerformanceConfig.TTS_WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(warmup_tts_cache())
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+
+
+app = FastAPI(title="Text-to-Speech API with ElevenLabs", lifespan=lifespan)
+# زمان هر مرحله (kb، prompt، upstream، parse، ...) در هدر Server-Timing و لاگ
+if PerformanceConfig.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+# تعداد و مدت درخواست‌ها برای /metrics
+if PerformanceConfig.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 app.include_router(chat_router, prefix="/assistant")
 app.include_router(extract_info_routes, prefix="/extractInfo")
 
@@ -27,67 +65,360 @@ ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 if not ELEVENLABS_API_KEY:
     raise ValueError("ELEVENLABS_API_KEY is not set in environment variables")
 
-client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+# کلاینت async؛ فراخوانی‌های ElevenLabs event loop را مسدود نمی‌کنند
+tts_service = TTSService()
 
 
 # مدل داده برای درخواست
 class TextToSpeechRequest(BaseModel):
     text: str
     # voice_id: str = "pjcYQlDFKMbcOUp6F5GD"  # صدای پیش‌فرض (Adam)
-    stability: float = 0.7
-    similarity_boost: float = 0.8
+    stability: float = PerformanceConfig.TTS_DEFAULT_STABILITY
+    similarity_boost: float = PerformanceConfig.TTS_DEFAULT_SIMILARITY_BOOST
+    # تقسیم به جمله و تولید همزمان؛ None یعنی خودکار برای متن‌های طولانی
+    chunked: Optional[bool] = None
+    # فرمت خروجی (مثلاً mp3_22050_32، opus_48000_32، pcm_16000)؛ در غیر این صورت از هدر Accept
+    output_format: Optional[str] = None
+    # مدل سریع‌تر (از لیست مجاز) و سطح بهینه‌سازی تأخیر ElevenLabs
+    model_id: Optional[str] = None
+    optimize_streaming_latency: Optional[int] = Field(default=None, ge=0, le=4)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """مقایسه هدر If-None-Match با ETag (مقایسه ضعیف)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def _negotiate_output_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """فرمت خروجی از فیلد درخواست یا هدر Accept (به ترتیب q)"""
+    if requested:
+        if requested not in PerformanceConfig.TTS_OUTPUT_FORMATS:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported output_format: {requested}"
+            )
+        return requested
+
+    candidates = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, media_type.strip().lower()))
+    for _, _, media_type in sorted(candidates):
+        if media_type in PerformanceConfig.TTS_ACCEPT_FORMATS:
+            return PerformanceConfig.TTS_ACCEPT_FORMATS[media_type]
+    return PerformanceConfig.TTS_DEFAULT_OUTPUT_FORMAT
+
+
+def _synthesis_options(request: TextToSpeechRequest, accept: Optional[str]):
+    model_id = request.model_id or PerformanceConfig.TTS_DEFAULT_MODEL
+    if model_id not in PerformanceConfig.TTS_MODEL_ALLOWLIST:
+        raise HTTPException(status_code=400, detail=f"Unsupported model_id: {model_id}")
+    return SynthesisOptions(
+        model_id=model_id,
+        output_format=_negotiate_output_format(request.output_format, accept),
+        optimize_streaming_latency=request.optimize_streaming_latency,
+    )
 
 
 @app.post("/text-to-speech")
-async def text_to_speech(request: TextToSpeechRequest):
+async def text_to_speech(request: TextToSpeechRequest, raw_request: Request):
+    with phase("negotiate"):
+        options = _synthesis_options(request, raw_request.headers.get("accept"))
+    media_type, extension = PerformanceConfig.TTS_OUTPUT_FORMATS[options.output_format]
+
     try:
         # تنظیمات صدا
         voice_settings = VoiceSettings(
             stability=request.stability, similarity_boost=request.similarity_boost
         )
 
-        # تولید فایل صوتی با استفاده از متد جدید
-        voice_id = os.getenv("ELEVENLABS_VOICE_ID")
-        if not voice_id:
-            raise ValueError("ELEVENLABS_VOICE_ID is not set in environment variables")
+        # کلید کش بر اساس متن، صدا، مدل، فرمت خروجی و تنظیمات صدا
+        cache_key = tts_service.cache_key(request.text, voice_settings, options=options)
+        headers = {
+            "Content-Disposition": f"attachment; filename=output.{extension}",
+            "Vary": "Accept",
+            "Content-Location": f"/audio/{cache_key}",
+            "X-Audio-Hash": cache_key,
+        }
 
-        audio_stream = client.text_to_speech.convert(
-            voice_id=voice_id,
-            text=request.text,
-            model_id="eleven_multilingual_v2",
-            voice_settings=voice_settings,
-        )
+        if PerformanceConfig.TTS_CACHE_ENABLED:
+            with phase("cache"):
+                cached = await asyncio.to_thread(tts_service.cache.get, cache_key)
+            if cached is not None:
+                metrics.tts_bytes_served_total.labels("text_to_speech").inc(len(cached))
+                return Response(
+                    cached,
+                    media_type=media_type,
+                    headers={**headers, "ETag": f'"{cache_key}"', "X-Cache": "HIT"},
+                )
 
-        # جمع‌آوری داده‌های صوتی در یک بافر
-        audio_buffer = BytesIO()
-        for chunk in audio_stream:
-            audio_buffer.write(chunk)
-        audio_buffer.seek(0)
-
-        # ارسال فایل صوتی به‌صورت استریم
-        return StreamingResponse(
-            audio_buffer,
-            media_type="audio/mpeg",
-            headers={"Content-Disposition": "attachment; filename=output.mp3"},
+        # متن طولانی: جمله‌ها همزمان تولید و به ترتیب استریم می‌شوند
+        sentences = split_sentences(request.text, PerformanceConfig.TTS_CHUNK_MAX_CHARS)
+        chunked = (
+            request.chunked
+            if request.chunked is not None
+            else len(request.text) > PerformanceConfig.TTS_CHUNK_MIN_CHARS
         )
 
+        # شروع استریم؛ خطاهای ElevenLabs قبل از ارسال هدرها به 500 تبدیل می‌شوند
+        # (زمان upstream تا رسیدن اولین تکه صوتی است)
+        with phase("upstream"):
+            if chunked and len(sentences) > 1:
+                audio_stream = await prime(
+                    tts_service.stream_sentences(
+                        sentences, voice_settings, options=options
+                    )
+                )
+                headers["X-TTS-Chunks"] = str(len(sentences))
+            else:
+                audio_stream = await tts_service.open_stream(
+                    request.text, voice_settings, options=options
+                )
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating audio: {str(e)}")
 
+    served = metrics.tts_bytes_served_total.labels("text_to_speech")
+
+    async def write_to_cache(writer, data: bytes):
+        """نوشتن در کش نباید پاسخ را خراب کند؛ در صورت خطا کش رها می‌شود"""
+        try:
+            await asyncio.to_thread(writer.write, data)
+            return writer
+        except Exception as e:
+            logger.warning(f"Failed to cache TTS audio {cache_key}: {e}")
+            await asyncio.to_thread(writer.abort)
+            return None
+
+    async def passthrough():
+        # ارسال مستقیم هر تکه صوتی به کلاینت به محض دریافت؛ همزمان تکه‌ها
+        # در دسته‌های کوچک روی دیسک کش نوشته می‌شوند تا کل صدا در حافظه نماند
+        writer = None
+        if PerformanceConfig.TTS_CACHE_ENABLED:
+            try:
+                writer = await asyncio.to_thread(tts_service.cache.writer, cache_key)
+            except Exception as e:
+                logger.warning(f"Failed to cache TTS audio {cache_key}: {e}")
+        pending = bytearray()
+        try:
+            async for chunk in audio_stream:
+                served.inc(len(chunk))
+                yield chunk
+                if writer is not None:
+                    pending += chunk
+                    if len(pending) >= COPY_CHUNK_SIZE:
+                        writer = await write_to_cache(writer, bytes(pending))
+                        pending.clear()
+            # فقط صدای کامل در کش ذخیره می‌شود
+            if writer is not None and pending:
+                writer = await write_to_cache(writer, bytes(pending))
+            if writer is not None:
+                finished, writer = writer, None
+                try:
+                    await asyncio.to_thread(finished.commit)
+                except Exception as e:
+                    logger.warning(f"Failed to cache TTS audio {cache_key}: {e}")
+                    finished.abort()
+        except Exception as e:
+            # هدرها ارسال شده‌اند؛ اتصال قطع می‌شود تا کلاینت پاسخ ناقص را تشخیص دهد
+            logger.error(f"TTS stream failed mid-stream: {e}")
+            raise
+        finally:
+            # استریم ناقص یا قطع اتصال کلاینت: فایل موقت حذف می‌شود
+            if writer is not None:
+                writer.abort()
+
+    return StreamingResponse(
+        passthrough(),
+        media_type=media_type,
+        headers={**headers, "X-Cache": "MISS"},
+    )
+
+
+@app.get("/audio/{audio_hash}")
+async def get_cached_audio(audio_hash: str, request: Request):
+    """صدای کش‌شده با آدرس ثابت؛ قابل کش در کلاینت و CDN"""
+    audio = None
+    if is_valid_key(audio_hash):
+        audio = await asyncio.to_thread(tts_service.cache.get, audio_hash)
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    etag = f'"{audio_hash}"'
+    media_type = guess_audio_media_type(audio)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # محتوا با هش آدرس‌دهی شده و هرگز تغییر نمی‌کند
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), len(audio))
+    except ValueError:
+        return Response(
+            status_code=416,
+            headers={**headers, "Content-Range": f"bytes */{len(audio)}"},
+        )
+    if byte_range is None:
+        metrics.tts_bytes_served_total.labels("audio").inc(len(audio))
+        return Response(audio, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    metrics.tts_bytes_served_total.labels("audio").inc(end + 1 - start)
+    return Response(
+        audio[start : end + 1],
+        status_code=206,
+        media_type=media_type,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(audio)}"},
+    )
+
+
+@app.get("/tts/stats")
+async def tts_stats():
+    """وضعیت صف و همزمانی درخواست‌های TTS و کش صوتی"""
+    return {"scheduler": tts_scheduler.stats(), "cache": tts_service.cache.stats()}
+
+
+def _memory_totals():
+    """تعداد نشست‌های فعال و پیام‌های حافظه (فقط در زمان scrape)"""
+    conversations = OpenAIService._memory.conversations if OpenAIService._memory else {}
+    return {
+        "sessions": len(conversations),
+        "messages": sum(len(history) for history in list(conversations.values())),
+    }
+
+
+def _cache_stats():
+    """(hits, misses, hit_ratio) برای هر کش"""
+    tts = tts_service.cache.stats()
+    shared = cache_manager.stats()
+    return {
+        "cache_manager": (shared["hits"], shared["misses"], shared["hit_ratio"]),
+        "tts_audio": (
+            tts["memory_hits"] + tts["disk_hits"],
+            tts["misses"],
+            tts["hit_ratio"],
+        ),
+    }
+
+
+metrics.registry.gauge_function(
+    "active_sessions",
+    "Sessions with conversation memory",
+    lambda: _memory_totals()["sessions"],
+)
+metrics.registry.gauge_function(
+    "memory_messages",
+    "Messages held in conversation memory across sessions",
+    lambda: _memory_totals()["messages"],
+)
+metrics.registry.counter_function(
+    "cache_hits_total",
+    "Cache hits since start",
+    lambda: {(name,): s[0] for name, s in _cache_stats().items()},
+    ("cache",),
+)
+metrics.registry.counter_function(
+    "cache_misses_total",
+    "Cache misses since start",
+    lambda: {(name,): s[1] for name, s in _cache_stats().items()},
+    ("cache",),
+)
+metrics.registry.gauge_function(
+    "cache_hit_ratio",
+    "Cache hit ratio since start",
+    lambda: {(name,): s[2] for name, s in _cache_stats().items()},
+    ("cache",),
+)
+
+# کد عددی وضعیت breaker برای Prometheus
+_BREAKER_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _breaker_stats():
+    """آمار breaker مسیر OpenAI بر اساس نام؛ تا ساخته‌شدن سرویس خالی است"""
+    service = OpenAIService._instance
+    if service is None or not hasattr(service, "breaker"):
+        return {}
+    return {(service.breaker.name,): service.breaker.stats()}
+
+
+def _failover_stats():
+    """شمارنده‌های failover به Ollama"""
+    service = OpenAIService._instance
+    if service is None or not hasattr(service, "failover_stats"):
+        return {"ollama_turns": 0, "ollama_errors": 0}
+    return service.failover_stats
+
+
+metrics.registry.gauge_function(
+    "circuit_breaker_state",
+    "Circuit breaker state (0=closed, 1=half_open, 2=open)",
+    lambda: {
+        name: _BREAKER_STATE_CODES[s["state"]] for name, s in _breaker_stats().items()
+    },
+    ("breaker",),
+)
+metrics.registry.gauge_function(
+    "circuit_breaker_error_rate",
+    "Share of failed calls in the breaker window",
+    lambda: {name: s["error_rate"] for name, s in _breaker_stats().items()},
+    ("breaker",),
+)
+metrics.registry.gauge_function(
+    "circuit_breaker_slow_rate",
+    "Share of slow calls in the breaker window",
+    lambda: {name: s["slow_rate"] for name, s in _breaker_stats().items()},
+    ("breaker",),
+)
+metrics.registry.counter_function(
+    "ollama_failover_turns_total",
+    "Chat turns answered by Ollama after OpenAI failed or the breaker opened",
+    lambda: _failover_stats()["ollama_turns"],
+)
+metrics.registry.counter_function(
+    "ollama_failover_errors_total",
+    "Failover attempts on Ollama that failed as well",
+    lambda: _failover_stats()["ollama_errors"],
+)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """متریک‌ها با فرمت متنی Prometheus"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 
 @app.get("/voices")
-async def get_voices():
+async def get_voices(request: Request):
     try:
-        # دریافت لیست صداهای موجود
-        voices = client.voices.get_all()
-        return {
-            "voices": [
-                {"id": voice.voice_id, "name": voice.name} for voice in voices.voices
-            ]
-        }
+        # لیست صداها از کش؛ فقط اولین درخواست منتظر ElevenLabs می‌ماند
+        voices, etag = await tts_service.voices.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching voices: {str(e)}")
 
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={PerformanceConfig.VOICES_CACHE_TTL}",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({"voices": voices}, headers=headers)
+
 
 if __name__ == "__main__":
     import uvicorn
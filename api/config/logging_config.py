@@ -2,33 +2,234 @@
 تنظیمات لاگینگ برای پروژه
 """
 
-import logging
+import re
 import sys
-from typing import Optional
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from api.config.performance_config import PerformanceConfig
+
+# ویژگی‌های استاندارد LogRecord؛ بقیه فیلدهای extra هستند
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "verbose",
+}
+
+_DIGIT = "[0-9۰-۹٠-٩]"
+# ایمیل، شماره تلفن/کد ملی/کارت (۱۰ رقم یا بیشتر، با فاصله یا خط تیره) و شماره گذرنامه؛
+# رشته‌ای که وسط عدد شروع شود یا به «:رقم» یا «.رقم» برسد (ساعت، اعشار) شماره نیست
+_PII_PATTERNS = [
+    re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"),
+    re.compile(
+        rf"(?<!{_DIGIT})(?<!\.)\+?{_DIGIT}(?:[\s-]?{_DIGIT}){{9,}}"
+        rf"(?!{_DIGIT}|[:.]{_DIGIT})"
+    ),
+    re.compile(rf"\b[A-Za-z]{{1,2}}\s?{_DIGIT}{{6,9}}\b"),
+]
+REDACTED = "[REDACTED]"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def redact(text: str) -> str:
+    """حذف اطلاعات شخصی (ایمیل، تلفن، کد ملی، گذرنامه) از متن لاگ"""
+    for pattern in _PII_PATTERNS:
+        text = pattern.sub(REDACTED, text)
+    return text
+
+
+def truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return f"{text[:limit]}...[{len(text) - limit} chars truncated]"
+    return text
+
+
+def _clean(value: Any, limit: int, redact_enabled: bool) -> Any:
+    """
+    متن‌ها (حتی داخل dict و list) پاک‌سازی و کوتاه می‌شوند؛ پاک‌سازی قبل از
+    کوتاه‌سازی است تا شماره‌ای که در مرز برش قرار دارد نیمه‌کاره ثبت نشود
+    """
+    if isinstance(value, str):
+        if redact_enabled:
+            value = redact(value)
+        return truncate(value, limit)
+    if isinstance(value, dict):
+        return {k: _clean(v, limit, redact_enabled) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v, limit, redact_enabled) for v in value]
+    return value
+
+
+def record_extras(record: logging.LogRecord) -> Dict[str, Any]:
+    return {
+        key: value
+        for key, value in vars(record).items()
+        if key not in _RECORD_ATTRS and not key.startswith("_")
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """یک خط JSON برای هر رکورد؛ فیلدهای extra (مثل payload یا timing) هم ثبت می‌شوند"""
+
+    def __init__(
+        self,
+        max_field_chars: int = PerformanceConfig.LOG_MAX_FIELD_CHARS,
+        redact_enabled: bool = PerformanceConfig.LOG_REDACT_ENABLED,
+    ):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+        self.redact_enabled = redact_enabled
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _clean(message, self.max_field_chars, self.redact_enabled),
+        }
+        for key, value in record_extras(record).items():
+            entry[key] = _clean(value, self.max_field_chars, self.redact_enabled)
+        if record.exc_text:
+            entry["exception"] = (
+                redact(record.exc_text) if self.redact_enabled else record.exc_text
+            )
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """
+    فرمت متنی قبلی، با همان کوتاه‌سازی و پاک‌سازی و فیلدهای extra در انتها؛
+    فقط پیام، extraها و traceback پاک‌سازی می‌شوند و پیشوند (زمان، نام، سطح) دست نمی‌خورد
+    """
+
+    def __init__(
+        self,
+        fmt: str,
+        max_field_chars: int = PerformanceConfig.LOG_MAX_FIELD_CHARS,
+        redact_enabled: bool = PerformanceConfig.LOG_REDACT_ENABLED,
+    ):
+        super().__init__(fmt)
+        self.max_field_chars = max_field_chars
+        self.redact_enabled = redact_enabled
+
+    def format(self, record: logging.LogRecord) -> str:
+        extras = record_extras(record)
+        # روی کپی کار می‌کنیم تا handlerهای دیگر پیام اصلی را ببینند
+        record = copy.copy(record)
+        record.msg = _clean(
+            record.getMessage(), self.max_field_chars, self.redact_enabled
+        )
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text and self.redact_enabled:
+            record.exc_text = redact(record.exc_text)
+        text = super().format(record)
+        if extras:
+            extras = _clean(extras, self.max_field_chars, self.redact_enabled)
+            text += " " + json.dumps(extras, ensure_ascii=False, default=str)
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    نمونه‌برداری از رکوردهای پرحجم: رکوردهای DEBUG یا با extra={"verbose": True}
+    با احتمال ``rate`` نگه داشته می‌شوند؛ WARNING و بالاتر همیشه ثبت می‌شوند
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        super().__init__()
+        self.rate = PerformanceConfig.LOG_VERBOSE_SAMPLE_RATE if rate is None else rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if record.levelno > logging.DEBUG and not getattr(record, "verbose", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class _PreparingQueueHandler(logging.handlers.QueueHandler):
+    """
+    پیام را در thread درخواست می‌سازد ولی traceback را جدا نگه می‌دارد
+    (QueueHandler پیش‌فرض آن را به پیام می‌چسباند و کوتاه‌سازی آن را می‌برد)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 
-def setup_logging(level: str = "INFO", log_file: Optional[str] = None):
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_file: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    sample_rate: Optional[float] = None,
+):
     """
     تنظیم لاگینگ برای کل پروژه
 
+    رکوردها در مسیر درخواست فقط در یک صف قرار می‌گیرند؛ فرمت JSON،
+    پاک‌سازی و نوشتن در stdout یا فایل در thread جداگانه QueueListener انجام می‌شود.
+
     Args:
         level: سطح لاگینگ (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: مسیر فایل لاگ (اختیاری)
+        json_format: خروجی JSON؛ پیش‌فرض از LOG_FORMAT
+        sample_rate: نرخ نگه‌داشتن رکوردهای پرحجم؛ پیش‌فرض از LOG_VERBOSE_SAMPLE_RATE
     """
+    if json_format is None:
+        json_format = PerformanceConfig.LOG_FORMAT == "json"
+
     # فرمت لاگ
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    formatter = JsonFormatter() if json_format else RedactingFormatter(log_format)
 
-    # تنظیمات handler ها
+    # تنظیمات handler ها (در thread شنونده اجرا می‌شوند)
     handlers = [logging.StreamHandler(sys.stdout)]
 
     if log_file:
         handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _stop_listener()
+    global _listener
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _PreparingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
 
     # تنظیم لاگینگ اصلی
     logging.basicConfig(
         level=getattr(logging, level.upper()),
-        format=log_format,
-        handlers=handlers,
+        handlers=[queue_handler],
         force=True,  # بازنویسی تنظیمات قبلی
     )
 
@@ -42,6 +243,10 @@ def setup_logging(level: str = "INFO", log_file: Optional[str] = None):
     logger.info(f"Logging configured with level: {level}")
 
 
+# تخلیه صف هنگام خروج تا رکوردهای آخر از دست نروند
+atexit.register(_stop_listener)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     دریافت logger برای ماژول مشخص
@@ -0,0 +1,363 @@
+"""
+متریک‌های سازگار با Prometheus (فرمت متنی 0.0.4) بدون وابستگی خارجی
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Tuple
+
+# مرزهای پیش‌فرض هیستوگرام تأخیر (ثانیه)
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """پایه متریک‌ها: هر ترکیب برچسب یک child جدا با شمارنده خودش دارد"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwargs: Any):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[Any, ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, names, values, value in self._samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}"
+            )
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self):
+        return [
+            ("", self.labelnames, key, child.value)
+            for key, child in list(self._children.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class GaugeFunction(_Metric):
+    """
+    مقدار در زمان scrape از تابع خوانده می‌شود؛ تابع یک عدد یا دیکشنری
+    {تاپل مقادیر برچسب: عدد} برمی‌گرداند. در مسیر درخواست هزینه‌ای ندارد.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], Any],
+        labelnames: Tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _samples(self):
+        result = self.function()
+        if isinstance(result, dict):
+            return [
+                ("", self.labelnames, tuple(key), value)
+                for key, value in result.items()
+                if value is not None
+            ]
+        return [] if result is None else [("", (), (), result)]
+
+
+class CounterFunction(GaugeFunction):
+    """مانند GaugeFunction برای شمارنده‌هایی که خود سرویس نگه می‌دارد"""
+
+    kind = "counter"
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self):
+        samples = []
+        names = self.labelnames + ("le",)
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    ("_bucket", names, key + (_format_value(bound),), cumulative)
+                )
+            samples.append(("_sum", self.labelnames, key, total))
+            samples.append(("_count", self.labelnames, key, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """ثبت متریک؛ ثبت دوباره با همان نام نسخه قبلی را جایگزین می‌کند"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_function(
+        self, name: str, documentation: str, function, labelnames=()
+    ) -> GaugeFunction:
+        return self.register(GaugeFunction(name, documentation, function, labelnames))
+
+    def counter_function(
+        self, name: str, documentation: str, function, labelnames=()
+    ) -> CounterFunction:
+        return self.register(CounterFunction(name, documentation, function, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# رجیستری مشترک برای کل پروژه
+registry = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+http_requests_total = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status",
+    ("route", "method", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration until the last body byte",
+    ("route", "method"),
+)
+upstream_request_duration_seconds = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Upstream (LLM / TTS) call duration by provider and model",
+    ("provider", "model", "outcome"),
+)
+upstream_requests_in_flight = registry.gauge(
+    "upstream_requests_in_flight",
+    "Upstream calls currently waiting for a response",
+    ("provider",),
+)
+tts_bytes_served_total = registry.counter(
+    "tts_bytes_served_total",
+    "Audio bytes sent to clients by endpoint",
+    ("endpoint",),
+)
+
+
+@contextmanager
+def track_upstream(provider: str, model: str) -> Iterator[None]:
+    """زمان و تعداد در حال اجرای یک فراخوانی upstream"""
+    in_flight = upstream_requests_in_flight.labels(provider)
+    in_flight.inc()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        in_flight.dec()
+        upstream_request_duration_seconds.labels(
+            provider, model or "", outcome
+        ).observe(time.perf_counter() - started)
+
+
+async def track_upstream_stream(
+    provider: str, model: str, stream: AsyncIterator[Any]
+) -> AsyncIterator[Any]:
+    """مانند track_upstream برای استریم؛ زمان تا آخرین تکه اندازه‌گیری می‌شود"""
+    with track_upstream(provider, model):
+        async for item in stream:
+            yield item
+
+
+class MetricsMiddleware:
+    """
+    middleware خالص ASGI: تعداد و مدت درخواست‌ها به تفکیک الگوی مسیر
+    (مثلاً /audio/{audio_hash}) تا تعداد برچسب‌ها محدود بماند
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route_for(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in getattr(scope.get("app"), "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            path = path or "unmatched"
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500, "done": False}
+
+        def record():
+            if status["done"]:
+                return
+            status["done"] = True
+            route = self._route_for(scope)
+            http_requests_total.labels(
+                route, scope["method"], str(status["code"])
+            ).inc()
+            http_request_duration_seconds.labels(route, scope["method"]).observe(
+                time.perf_counter() - started
+            )
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                record()
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            record()
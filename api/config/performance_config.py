@@ -3,6 +3,7 @@
 """
 
 import os
+import tempfile
 import threading
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
@@ -15,18 +16,23 @@ class CacheManager:
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._lock = threading.RLock()
         self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
 
     def get(self, key: str) -> Optional[Any]:
         """دریافت مقدار از کش"""
         with self._lock:
             if key not in self._cache:
+                self.misses += 1
                 return None
 
             cache_item = self._cache[key]
             if datetime.now() > cache_item["expires_at"]:
                 del self._cache[key]
+                self.misses += 1
                 return None
 
+            self.hits += 1
             return cache_item["value"]
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
@@ -53,6 +59,17 @@ class CacheManager:
             for key in expired_keys:
                 del self._cache[key]
 
+    def stats(self) -> Dict[str, Any]:
+        """تعداد hit/miss و نسبت hit از شروع برنامه"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "items": len(self._cache),
+            }
+
 
 # Instance مشترک برای کل پروژه
 cache_manager = CacheManager()
@@ -62,10 +79,148 @@ class PerformanceConfig:
     """تنظیمات بهینه‌سازی عملکرد"""
 
     # تنظیمات OpenAI
+    OPENAI_CHAT_MODEL = "gpt-4o"
+    OPENAI_CHEAP_MODEL = "gpt-4o-mini"
     OPENAI_TIMEOUT = 60
     OPENAI_MAX_TOKENS = 2000
     OPENAI_TEMPERATURE = 0.7
 
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+    # بک‌اندهای LLM (سازگار با OpenAI یا Ollama)؛ هر مسیر بک‌اند پیش‌فرض خود را دارد
+    # و هر درخواست می‌تواند با فیلد backend یکی از همین نام‌ها را انتخاب کند
+    LLM_BACKENDS = {
+        "openai": {
+            "type": "openai",
+            "base_url": OPENAI_BASE_URL,
+            "api_key_env": "OPENAI_API_KEY",
+            "model": OPENAI_CHAT_MODEL,
+        },
+        "ollama": {"type": "ollama", "model": os.getenv("OLLAMA_MODEL", "llama3")},
+    }
+    LLM_DEFAULT_BACKEND = "openai"
+    LLM_ROUTE_BACKENDS = {
+        "chat": os.getenv("LLM_BACKEND_CHAT", LLM_DEFAULT_BACKEND),
+        "extract_info": os.getenv("LLM_BACKEND_EXTRACT_INFO", LLM_DEFAULT_BACKEND),
+    }
+
+    # تنظیمات timeout تطبیقی، hedging و retry برای درخواست‌های OpenAI
+    OPENAI_MIN_TIMEOUT = 5
+    OPENAI_TIMEOUT_MULTIPLIER = 2.0  # timeout = p99 * ضریب
+    OPENAI_LATENCY_WINDOW = 200
+    OPENAI_LATENCY_MIN_SAMPLES = 20
+    OPENAI_HEDGE_QUANTILE = 0.9
+    OPENAI_HEDGE_BUDGET = 0.1  # حداکثر نسبت درخواست‌های تکراری (hedged)
+    OPENAI_HEDGE_WORKERS = 16
+    OPENAI_MAX_RETRIES = 2
+    OPENAI_BACKOFF_BASE = 0.5
+    OPENAI_BACKOFF_MAX = 8.0
+
+    # تنظیمات circuit breaker و انتقال خودکار به Ollama
+    OPENAI_BREAKER_WINDOW = 20
+    OPENAI_BREAKER_MIN_CALLS = 5
+    OPENAI_BREAKER_ERROR_RATE = 0.5
+    OPENAI_BREAKER_LATENCY = 15.0  # ثانیه؛ پاسخ‌های کندتر «کند» شمرده می‌شوند
+    OPENAI_BREAKER_SLOW_RATE = 0.5
+    OPENAI_BREAKER_PROBE_INTERVAL = 10.0
+    OLLAMA_FAILOVER_ENABLED = (
+        os.getenv("OLLAMA_FAILOVER_ENABLED", "true").lower() == "true"
+    )
+    OLLAMA_FAILOVER_TIMEOUT = 30
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # مدت نگه داشتن مدل در حافظه Ollama پس از هر درخواست
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+    # مدل ارزان اول؛ فقط در صورت خروجی نامعتبر به مدل اصلی ارجاع می‌شود
+    CASCADE_ENABLED = os.getenv("MODEL_CASCADE_ENABLED", "true").lower() == "true"
+
+    # مسیریابی محلی هر نوبت به یک پروفایل prompt (رزرو، سوالات متداول، راهنمای سفر، گفتگو)
+    INTENT_ROUTING_ENABLED = (
+        os.getenv("INTENT_ROUTING_ENABLED", "true").lower() == "true"
+    )
+    INTENT_ROUTING_MARGIN = 1  # حداقل اختلاف امتیاز؛ در غیر این صورت پروفایل کامل
+
+    # کش صوتی TTS (کلید: هش متن، صدا، مدل و تنظیمات صدا)
+    # پیش‌فرض در پوشه موقت، چون روی Vercel فقط /tmp قابل نوشتن است
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_DIR = os.getenv(
+        "TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_cache")
+    )
+    TTS_CACHE_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+    TTS_CACHE_DISK_MAX_BYTES = int(
+        os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))
+    )
+    # تولید صدای جملات ثابت هنگام شروع برنامه و پر کردن کش TTS
+    TTS_WARMUP_ENABLED = os.getenv("TTS_WARMUP_ENABLED", "false").lower() == "true"
+    TTS_WARMUP_CONCURRENCY = 2
+
+    ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+    ELEVENLABS_TIMEOUT = 60
+
+    # مدل و فرمت خروجی TTS؛ کلاینت می‌تواند مدل سریع‌تر یا فرمت کم‌حجم‌تر انتخاب کند
+    TTS_DEFAULT_MODEL = "eleven_multilingual_v2"
+    TTS_MODEL_ALLOWLIST = [
+        model.strip()
+        for model in os.getenv(
+            "TTS_MODEL_ALLOWLIST",
+            "eleven_multilingual_v2,eleven_turbo_v2_5,eleven_flash_v2_5",
+        ).split(",")
+        if model.strip()
+    ]
+    TTS_DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
+    # تنظیمات پیش‌فرض صدا در /text-to-speech، چت و warmup (باید یکسان باشند تا کش مشترک بماند)
+    TTS_DEFAULT_STABILITY = 0.7
+    TTS_DEFAULT_SIMILARITY_BOOST = 0.8
+    # فرمت خروجی ElevenLabs → (media type، پسوند فایل)
+    TTS_OUTPUT_FORMATS = {
+        "mp3_44100_128": ("audio/mpeg", "mp3"),
+        "mp3_44100_64": ("audio/mpeg", "mp3"),
+        "mp3_22050_32": ("audio/mpeg", "mp3"),
+        "opus_48000_32": ("audio/ogg", "ogg"),
+        "opus_48000_64": ("audio/ogg", "ogg"),
+        "pcm_16000": ("audio/pcm;rate=16000", "pcm"),
+    }
+    # نوع رسانه در هدر Accept → فرمت خروجی
+    TTS_ACCEPT_FORMATS = {
+        "audio/mpeg": "mp3_44100_128",
+        "audio/mp3": "mp3_44100_128",
+        "audio/ogg": "opus_48000_32",
+        "audio/opus": "opus_48000_32",
+        "audio/pcm": "pcm_16000",
+        "audio/l16": "pcm_16000",
+    }
+
+    # سقف درخواست‌های همزمان به ElevenLabs (کل حساب و هر صدا)؛ بقیه در صف منتظر می‌مانند
+    TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+    TTS_PER_VOICE_CONCURRENCY = int(os.getenv("TTS_PER_VOICE_CONCURRENCY", "3"))
+
+    # کش لیست صداها؛ پس از TTL در پس‌زمینه تازه می‌شود و تا آن زمان نسخه قبلی ارسال می‌شود
+    VOICES_CACHE_TTL = 3600
+    VOICES_RETRY_INTERVAL = 30  # فاصله تلاش مجدد پس از خطای ElevenLabs
+
+    # حداکثر تعداد درخواست همزمان TTS برای پیام‌های یک پاسخ در /assistant/chat/stream
+    TTS_PIPELINE_CONCURRENCY = 3
+
+    # تقسیم متن‌های طولانی به جمله و تولید همزمان صدای آن‌ها در /text-to-speech
+    TTS_CHUNK_MIN_CHARS = 300  # متن کوتاه‌تر یکجا ارسال می‌شود
+    TTS_CHUNK_MAX_CHARS = 250  # حداکثر طول هر تکه پس از ادغام جملات کوتاه
+    TTS_CHUNK_CONCURRENCY = 3
+
+    # WebSocket چت: حداکثر فریم در صف ارسال هر اتصال (backpressure برای کلاینت کند)
+    WS_SEND_QUEUE_SIZE = 16
+
+    # زمان‌بندی مراحل هر درخواست در هدر Server-Timing و لاگ ساختاریافته
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    # لاگ: json یا text، حداکثر طول هر فیلد، حذف اطلاعات شخصی و نرخ نمونه‌برداری
+    # از رکوردهای پرحجم (DEBUG یا extra={"verbose": True})
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+    LOG_REDACT_ENABLED = os.getenv("LOG_REDACT_ENABLED", "true").lower() == "true"
+    LOG_VERBOSE_SAMPLE_RATE = float(os.getenv("LOG_VERBOSE_SAMPLE_RATE", "0.1"))
+
+    # متریک‌های Prometheus در /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
     # تنظیمات کش
     KNOWLEDGE_BASE_CACHE_TTL = 3600  # 1 ساعت
     SESSION_CACHE_TTL = 1800  # 30 دقیقه
@@ -74,6 +229,17 @@ class PerformanceConfig:
     MAX_MEMORY_MESSAGES = 200
     MAX_SESSIONS = 1000
 
+    # سقف توکن هر نشست (۰ یعنی بدون سقف). پس از عبور از سقف:
+    # cheap_model مدل ارزان‌تر و max_tokens کمتر، trim_context فقط پیام‌های آخر حافظه
+    SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
+    SESSION_BUDGET_ACTIONS = {
+        action.strip()
+        for action in os.getenv("SESSION_BUDGET_ACTIONS", "cheap_model").split(",")
+        if action.strip()
+    }
+    SESSION_BUDGET_MAX_TOKENS = 300
+    SESSION_BUDGET_HISTORY_MESSAGES = 6
+
     @classmethod
     def get_openai_config(cls) -> Dict[str, Any]:
         """دریافت تنظیمات OpenAI"""
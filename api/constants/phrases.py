@@ -0,0 +1,94 @@
+"""
+جملات ثابتی که دستیار عیناً می‌گوید
+این جملات در prompt، پیام‌های خطا و گرم‌کردن کش TTS مشترک هستند
+"""
+
+from typing import Dict, List
+
+# جملاتی که prompt سیستم دستیار را موظف به گفتن عینی آن‌ها می‌کند
+FIXED_PHRASES: Dict[str, Dict[str, str]] = {
+    "booking_success": {
+        "fa": "عالی! همه اطلاعات شما با موفقیت ثبت شد. حالا می‌توانید از طریق کیو آر کد اطلاعات را مشاهده و تأیید کنید.",
+    },
+    "edit_via_qr": {
+        "fa": "می‌توانید با اسکن کیوآرکد هرکدام از اطلاعات واردشده را اصلاح کنید.",
+        "en": "You can edit any of your entered information by scanning the QR code.",
+    },
+    "qr_displayed": {
+        "fa": "کیو آر کد به شما نمایش داده می‌شود و با اسکن آن می‌توانید اطلاعات خود را ویرایش کنید و به مراحل بعدی بروید",
+        "en": "A QR code will be displayed to you, and by scanning it you can edit your information and proceed to the next steps",
+    },
+    "correct_later": {
+        "fa": "اشکال ندارد، می‌توانی آن را در فرم نهایی اصلاح کنی",
+        "en": "No problem, you can correct it in the final form",
+    },
+    "additional_info": {
+        "fa": "اگر توضیح اضافه‌ای دارید بفرمایید",
+        "en": "If you have any additional information, please provide it",
+    },
+}
+
+# پیام‌های خطای get_assistant_response
+ERROR_MESSAGES: Dict[str, Dict[str, str]] = {
+    "parse_error": {
+        "fa": "متأسفانه مشکلی در پردازش پاسخ پیش آمد. لطفاً دوباره تلاش کنید.",
+        "en": "Unfortunately, there was a problem processing the response. Please try again.",
+    },
+    "processing_error": {
+        "fa": "خطایی در پردازش پاسخ رخ داد. لطفاً دوباره تلاش کنید.",
+        "en": "An error occurred while processing the response. Please try again.",
+    },
+}
+
+# عبارت پیشنهادی سوال برای هر فیلد رزرو (در راهنمای وضعیت به مدل داده می‌شود)
+FIELD_QUESTIONS: Dict[str, Dict[str, str]] = {
+    "fa": {
+        "origin": "لطفاً فرودگاه مبدأ را بفرمایید.",
+        "travel_type": "نوع پرواز شما ورودی است یا خروجی؟",
+        "travel_date": "تاریخ سفر را بفرمایید.",
+        "flight_number": "لطفاً شماره پرواز را بفرمایید.",
+        "num_passengers": "تعداد مسافران چند نفر است؟",
+        "contact_phone": "لطفاً شماره تماس خود را بفرمایید.",
+        "first_name": "لطفاً نام مسافر را بفرمایید.",
+        "last_name": "لطفاً نام خانوادگی مسافر را بفرمایید.",
+        "national_id": "لطفاً کد ملی مسافر را بفرمایید.",
+        "passport_number": "لطفاً شماره گذرنامه مسافر را بفرمایید.",
+        "luggage_count": "مسافر چند چمدان دارد؟",
+        "passenger_type": "مسافر بزرگسال است یا نوزاد؟",
+        "gender": "جنسیت مسافر را بفرمایید.",
+        "nationality": "ملیت مسافر را بفرمایید.",
+    },
+    "en": {
+        "origin": "Which airport are you departing from?",
+        "travel_type": "Is this an arrival or a departure flight?",
+        "travel_date": "What is your travel date?",
+        "flight_number": "What is your flight number?",
+        "num_passengers": "How many passengers are traveling?",
+        "contact_phone": "What is your contact phone number?",
+        "first_name": "What is the passenger's first name?",
+        "last_name": "What is the passenger's last name?",
+        "national_id": "What is the passenger's national ID?",
+        "passport_number": "What is the passenger's passport number?",
+        "luggage_count": "How many pieces of luggage does the passenger have?",
+        "passenger_type": "Is the passenger an adult or an infant?",
+        "gender": "What is the passenger's gender?",
+        "nationality": "What is the passenger's nationality?",
+    },
+}
+
+
+def phrases_for(language: str) -> Dict[str, str]:
+    """Fixed phrases of one language, keyed by name"""
+    return {
+        name: texts[language]
+        for name, texts in FIXED_PHRASES.items()
+        if language in texts
+    }
+
+
+def warmup_phrases(language: str) -> List[str]:
+    """Every predictable utterance of one language, without duplicates"""
+    texts = list(phrases_for(language).values())
+    texts += [messages[language] for messages in ERROR_MESSAGES.values()]
+    texts += list(FIELD_QUESTIONS.get(language, {}).values())
+    return list(dict.fromkeys(texts))
@@ -1,9 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from api.schemas.chat_schema import ChatRequest, ChatResponse, Message
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from elevenlabs import VoiceSettings
+from api.schemas.chat_schema import (
+    ChatRequest,
+    ChatResponse,
+    ChatSpeechRequest,
+    Message,
+)
 
 from api.services.openai_service import OpenAIService
+from api.services.upstream_client import get_upstream_stats
+from api.services.intent_router import intent_router
+from api.services.llm_backend import UnknownBackendError, backend_for
+from api.services.request_timing import phase
+from api.services.token_usage import token_usage
+from api.services.tts_service import TTSService
 from api.config.logging_config import get_logger
+from api.config.performance_config import PerformanceConfig
 import os
+import json
+from typing import Optional
+from pydantic import ValidationError
+import base64
+import asyncio
 
 # تنظیم لاگر
 logger = get_logger(__name__)
@@ -21,10 +40,22 @@ def get_openai_service():
     return _openai_service
 
 
+def get_tts_service():
+    return TTSService()
+
+
 def get_openai_api_key():
     return os.getenv("OPENAI_API_KEY")
 
 
+def check_backend(name: Optional[str]):
+    """400 for a requested LLM backend that is not configured"""
+    try:
+        backend_for("chat", name)
+    except UnknownBackendError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/")
 def root():
     logger.info("Root endpoint called")
@@ -39,11 +70,14 @@ def test():
 
 @router.post("/chat", response_model=ChatResponse)
 def chat(request: ChatRequest):
-    logger.info(f"Chat endpoint called with message: {request.message}")
+    logger.info(
+        "Chat endpoint called", extra={"payload": request.message, "verbose": True}
+    )
 
     api_key = get_openai_api_key()
     if not api_key:
         raise HTTPException(status_code=401, detail="OpenAI API key is not set")
+    check_backend(request.backend)
 
     try:
         # استفاده از instance مشترک برای بهبود عملکرد
@@ -56,7 +90,7 @@ def chat(request: ChatRequest):
         # Use a stable default session to avoid unintended restarts during testing
         stable_session_id = session_id if session_id else "default"
         openai_messages, session_id = openai_service.get_assistant_response(
-            request.message, stable_session_id, language
+            request.message, stable_session_id, language, backend=request.backend
         )
         logger.info(
             f"[OpenAI] returned {len(openai_messages)} messages for session: {session_id}"
@@ -64,38 +98,43 @@ def chat(request: ChatRequest):
 
         # تبدیل پاسخ‌ها به یک Message object
         try:
-            combined_text = ""
-            combined_facial_expression = "default"
-            combined_animation = "StandingIdle"
-
-            if isinstance(openai_messages, list):
-                for m in openai_messages:
-                    text = m.get("text") if isinstance(m, dict) else None
-                    if text:
-                        combined_text += str(text) + "\n"
-                        # Use the facial expression and animation from the first message
-                        if combined_facial_expression == "default" and m.get(
-                            "facialExpression"
-                        ):
-                            combined_facial_expression = m.get("facialExpression")
-                        if combined_animation == "StandingIdle" and m.get("animation"):
-                            combined_animation = m.get("animation")
-            elif isinstance(openai_messages, dict) and "text" in openai_messages:
-                combined_text = str(openai_messages["text"])
-                combined_facial_expression = openai_messages.get(
-                    "facialExpression", "default"
-                )
-                combined_animation = openai_messages.get("animation", "StandingIdle")
+            with phase("assemble"):
+                combined_text = ""
+                combined_facial_expression = "default"
+                combined_animation = "StandingIdle"
 
-            combined_text = combined_text.strip()
+                if isinstance(openai_messages, list):
+                    for m in openai_messages:
+                        text = m.get("text") if isinstance(m, dict) else None
+                        if text:
+                            combined_text += str(text) + "\n"
+                            # Use the facial expression and animation from the first message
+                            if combined_facial_expression == "default" and m.get(
+                                "facialExpression"
+                            ):
+                                combined_facial_expression = m.get("facialExpression")
+                            if combined_animation == "StandingIdle" and m.get(
+                                "animation"
+                            ):
+                                combined_animation = m.get("animation")
+                elif isinstance(openai_messages, dict) and "text" in openai_messages:
+                    combined_text = str(openai_messages["text"])
+                    combined_facial_expression = openai_messages.get(
+                        "facialExpression", "default"
+                    )
+                    combined_animation = openai_messages.get(
+                        "animation", "StandingIdle"
+                    )
 
-            message_obj = Message(
-                text=combined_text,
-                facialExpression=combined_facial_expression,
-                animation=combined_animation,
-            )
-            response = ChatResponse(messages=message_obj, session_id=session_id)
-            return response
+                combined_text = combined_text.strip()
+
+                message_obj = Message(
+                    text=combined_text,
+                    facialExpression=combined_facial_expression,
+                    animation=combined_animation,
+                )
+                response = ChatResponse(messages=message_obj, session_id=session_id)
+                return response
         except Exception as combine_error:
             logger.error(f"Error creating message object: {combine_error}")
             raise HTTPException(
@@ -107,12 +146,247 @@ def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatSpeechRequest):
+    """
+    چت و تبدیل به گفتار در یک درخواست (Server-Sent Events)
+    صدای هر پیام به محض مشخص شدن متن آن به‌صورت همزمان تولید و به ترتیب پیام‌ها ارسال می‌شود
+    """
+    logger.info(
+        "Chat stream endpoint called",
+        extra={"payload": request.message, "verbose": True},
+    )
+
+    if not get_openai_api_key():
+        raise HTTPException(status_code=401, detail="OpenAI API key is not set")
+    check_backend(request.backend)
+
+    try:
+        openai_service = get_openai_service()
+        tts_service = get_tts_service()
+        openai_messages, session_id = await asyncio.to_thread(
+            openai_service.get_assistant_response,
+            request.message,
+            request.session_id or "default",
+            request.language,
+            backend=request.backend,
+        )
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    messages = [
+        Message(
+            text=str(m["text"]),
+            facialExpression=m.get("facialExpression", "default"),
+            animation=m.get("animation", "StandingIdle"),
+        )
+        for m in openai_messages
+        if isinstance(m, dict) and m.get("text")
+    ]
+    voice_settings = VoiceSettings(
+        stability=request.stability, similarity_boost=request.similarity_boost
+    )
+    semaphore = asyncio.Semaphore(PerformanceConfig.TTS_PIPELINE_CONCURRENCY)
+
+    async def speak(text: str) -> bytes:
+        async with semaphore:
+            return await tts_service.synthesize(text, voice_settings)
+
+    async def events():
+        # همه درخواست‌های TTS همزمان شروع می‌شوند؛ ارسال به ترتیب پیام‌ها است
+        tasks = [asyncio.create_task(speak(m.text)) for m in messages]
+        try:
+            yield _sse("session", {"session_id": session_id})
+            for index, (message, task) in enumerate(zip(messages, tasks)):
+                try:
+                    audio = await task
+                    message.audio = base64.b64encode(audio).decode("ascii")
+                except Exception as e:
+                    logger.error(f"TTS failed for message {index}: {e}")
+                yield _sse("message", {"index": index, **message.model_dump()})
+            yield _sse("done", {"count": len(messages)})
+        finally:
+            # کلاینت قطع شد یا خطا رخ داد؛ درخواست‌های باقی‌مانده لغو می‌شوند
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws/{session_id}")
+async def chat_ws(websocket: WebSocket, session_id: str, language: str = "fa"):
+    """
+    کانال WebSocket پایدار برای هر جلسه کیوسک
+    کلاینت پیام کاربر را به‌صورت JSON می‌فرستد و پیام‌های دستیار (JSON) و صدای هر پیام
+    (فریم‌های باینری) را دریافت می‌کند. صف ارسال محدود است، پس اگر کلاینت کند بخواند
+    تولید فریم‌ها متوقف می‌شود و نوبت بعدی تا خالی شدن صف خوانده نمی‌شود.
+    """
+    if not get_openai_api_key():
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    logger.info(f"WebSocket opened for session: {session_id}")
+
+    # وضعیت جلسه در طول عمر اتصال نگه داشته می‌شود
+    openai_service = get_openai_service()
+    tts_service = get_tts_service()
+    settings = {
+        "session_id": session_id,
+        "language": language,
+        "stability": PerformanceConfig.TTS_DEFAULT_STABILITY,
+        "similarity_boost": PerformanceConfig.TTS_DEFAULT_SIMILARITY_BOOST,
+        "backend": None,
+    }
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=PerformanceConfig.WS_SEND_QUEUE_SIZE)
+
+    async def writer():
+        while True:
+            frame = await outbox.get()
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(json.dumps(frame, ensure_ascii=False))
+
+    async def turn(request: ChatSpeechRequest):
+        openai_messages, _ = await asyncio.to_thread(
+            openai_service.get_assistant_response,
+            request.message,
+            session_id,
+            request.language,
+            backend=request.backend,
+        )
+        voice_settings = VoiceSettings(
+            stability=request.stability, similarity_boost=request.similarity_boost
+        )
+        messages = [
+            Message(
+                text=str(m["text"]),
+                facialExpression=m.get("facialExpression", "default"),
+                animation=m.get("animation", "StandingIdle"),
+            )
+            for m in openai_messages
+            if isinstance(m, dict) and m.get("text")
+        ]
+        for index, message in enumerate(messages):
+            await outbox.put(
+                {
+                    "type": "message",
+                    "index": index,
+                    **message.model_dump(exclude={"audio"}),
+                }
+            )
+            # صدای هر پیام به محض تولید و تکه‌تکه ارسال می‌شود (از کش در صورت وجود)
+            error = None
+            try:
+                async for chunk in tts_service.stream_sentences(
+                    [message.text], voice_settings
+                ):
+                    await outbox.put(chunk)
+            except Exception as e:
+                logger.error(f"TTS failed for message {index}: {e}")
+                error = str(e)
+            await outbox.put({"type": "audio_end", "index": index, "error": error})
+        await outbox.put({"type": "done", "count": len(messages)})
+
+    async def reader():
+        await outbox.put({"type": "session", "session_id": session_id})
+        while True:
+            try:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+            except WebSocketDisconnect:
+                logger.info(f"WebSocket client disconnected: {session_id}")
+                return
+            if message.get("text") is None:
+                # فقط فریم متنی JSON پذیرفته می‌شود؛ فریم باینری اتصال را نمی‌بندد
+                await outbox.put(
+                    {"type": "error", "detail": "Binary frames are not supported"}
+                )
+                continue
+            try:
+                payload = json.loads(message["text"])
+                if not isinstance(payload, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError:
+                await outbox.put({"type": "error", "detail": "Invalid JSON"})
+                continue
+            if payload.get("type") == "ping":
+                await outbox.put({"type": "pong"})
+                continue
+            try:
+                request = ChatSpeechRequest(
+                    **{**settings, **payload, "session_id": session_id}
+                )
+            except (TypeError, ValidationError) as e:
+                await outbox.put({"type": "error", "detail": str(e)})
+                continue
+            settings.update(
+                backend=request.backend,
+                language=request.language,
+                stability=request.stability,
+                similarity_boost=request.similarity_boost,
+            )
+            try:
+                await turn(request)
+            except Exception as e:
+                logger.error(f"Error in chat websocket turn: {e}")
+                await outbox.put({"type": "error", "detail": str(e)})
+
+    tasks = [asyncio.create_task(reader()), asyncio.create_task(writer())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"WebSocket closed for session: {session_id}")
+
+
 @router.get("/health")
 def health():
     logger.info("Health endpoint called")
     return {"status": "ok", "message": "Backend is running!"}
 
 
+@router.get("/stats")
+def stats():
+    """Runtime stats for the chat path (circuit breaker, failover, upstream latency)"""
+    openai_service = get_openai_service()
+    return {
+        "openai_breaker": openai_service.breaker.stats(),
+        "failover": dict(openai_service.failover_stats),
+        "cascade": openai_service.cascade_stats.stats(),
+        "routing": intent_router.stats(),
+        "upstream": get_upstream_stats(),
+    }
+
+
+@router.get("/usage")
+def usage():
+    """Token usage totals by route and model"""
+    return token_usage.stats()
+
+
+@router.get("/usage/{session_id}")
+def session_usage(session_id: str):
+    """Token usage of one session and whether it is over its budget"""
+    report = token_usage.session(session_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No token usage for this session")
+    return report
+
+
 @router.get("/memory/{session_id}")
 def get_memory(session_id: str):
     """Get conversation history for a session"""
@@ -5,6 +5,7 @@ from api.schemas.extract_info_schema import (
     BookingStateData,
 )
 from api.services.extract_info_service import call_openai
+from api.services.llm_backend import UnknownBackendError, backend_for
 from api.services.openai_service import OpenAIService
 from api.schemas.extract_info_schema import Passenger
 import json
@@ -22,10 +23,17 @@ async def extract_info(request: ExtractInfoRequest):
             f"Received extract_info request with {len(request.messages)} messages"
         )
         logger.info(
-            f"First message: {request.messages[0] if request.messages else 'No messages'}"
+            "First message",
+            extra={
+                "payload": request.messages[0].text if request.messages else None,
+                "verbose": True,
+            },
         )
-        result = await call_openai(request)
+        backend = backend_for("extract_info", request.backend)
+        result = await call_openai(request, backend)
         return result
+    except UnknownBackendError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in extract_info: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -103,20 +111,22 @@ async def debug_extract_info(request: Request):
         # Try to parse JSON
         try:
             json_data = await request.json()
-            print(f"Parsed JSON: {json_data}")
+            logger.debug("Parsed JSON", extra={"payload": json_data})
         except Exception as json_error:
-            print(f"JSON parsing error: {json_error}")
+            logger.warning(f"JSON parsing error: {json_error}")
             return {"error": "JSON parsing failed", "detail": str(json_error)}
 
         # Try to validate with Pydantic
         try:
             validated_data = ExtractInfoRequest(**json_data)
-            print(f"Validated data: {validated_data}")
+            logger.debug(
+                "Validated data", extra={"payload": validated_data.model_dump()}
+            )
             return {"success": True, "data": validated_data.dict()}
         except Exception as validation_error:
-            print(f"Validation error: {validation_error}")
+            logger.warning(f"Validation error: {validation_error}")
             return {"error": "Validation failed", "detail": str(validation_error)}
 
     except Exception as e:
-        print(f"General error: {e}")
+        logger.error(f"General error: {e}")
         return {"error": "General error", "detail": str(e)}
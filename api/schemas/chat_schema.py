@@ -1,19 +1,26 @@
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+from api.config.performance_config import PerformanceConfig
 
 
 class Message(BaseModel):
     text: str
     facialExpression: Optional[str] = "default"
     animation: Optional[str] = "StandingIdle"
-    # audio: Optional[str] = None  # base64 encoded
-    # lipsync: Optional[Dict[str, Any]] = None
+    audio: Optional[str] = None  # base64 encoded
+    lipsync: Optional[Dict[str, Any]] = None
 
 
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     language: Optional[str] = "fa"  # Default to Persian, can be "fa" or "en"
+    backend: Optional[str] = None  # LLM backend name, defaults to the route's
+
+
+class ChatSpeechRequest(ChatRequest):
+    stability: float = PerformanceConfig.TTS_DEFAULT_STABILITY
+    similarity_boost: float = PerformanceConfig.TTS_DEFAULT_SIMILARITY_BOOST
 
 
 class ChatResponse(BaseModel):
@@ -38,6 +38,8 @@ class MessageInput(BaseModel):
 
 class ExtractInfoRequest(BaseModel):
     messages: List[MessageInput]
+    # نام یکی از بک‌اندهای LLM_BACKENDS؛ در غیر این صورت بک‌اند پیش‌فرض مسیر
+    backend: Optional[str] = None
 
 
 class ExtractInfoResponse(BaseModel):
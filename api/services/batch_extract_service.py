@@ -0,0 +1,247 @@
+"""
+Offline bulk re-extraction through the OpenAI Batch API.
+
+Usage:
+    python -m api.services.batch_extract_service conversations.jsonl results.jsonl
+
+Each input line is a JSON object with an ``id`` and the same ``messages`` list
+accepted by ``/extractInfo/extract-info``. Results are written one per line as
+``{"id": ..., "result": {...}}`` or ``{"id": ..., "error": "..."}``.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Dict, Optional, Any
+import httpx
+from api.config.performance_config import PerformanceConfig
+from api.schemas.extract_info_schema import ExtractInfoRequest
+from api.services.extract_info_service import (
+    build_extraction_payload,
+    parse_extraction,
+)
+
+logger = logging.getLogger(__name__)
+
+OPENAI_BASE_URL = PerformanceConfig.OPENAI_BASE_URL
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchJobError(Exception):
+    """Raised when a batch job does not finish successfully"""
+
+
+class BatchExtractionRunner:
+    """Write, submit, poll and post-process an extraction batch job"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        poll_interval: float = 30.0,
+        completion_window: str = "24h",
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            logger.error("OPENAI_API_KEY not set")
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+
+        self.base_url = (base_url or OPENAI_BASE_URL).rstrip("/")
+        self.client = client
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def write_requests(
+        self, conversations: Dict[str, ExtractInfoRequest], path: str
+    ) -> str:
+        """Write one Batch API request line per conversation."""
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, messages in conversations.items():
+                line = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": build_extraction_payload(messages),
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        logger.info(f"Wrote {len(conversations)} batch requests to {path}")
+        return path
+
+    async def submit(self, client: httpx.AsyncClient, path: str) -> str:
+        """Upload the request file and create the batch, returning its id."""
+        with open(path, "rb") as f:
+            upload = await client.post(
+                f"{self.base_url}/files",
+                headers=self.headers,
+                data={"purpose": "batch"},
+                files={"file": (os.path.basename(path), f, "application/jsonl")},
+            )
+        upload.raise_for_status()
+        file_id = upload.json()["id"]
+
+        response = await client.post(
+            f"{self.base_url}/batches",
+            headers=self.headers,
+            json={
+                "input_file_id": file_id,
+                "endpoint": BATCH_ENDPOINT,
+                "completion_window": self.completion_window,
+            },
+        )
+        response.raise_for_status()
+        batch_id = response.json()["id"]
+        logger.info(f"Submitted batch {batch_id} (input file {file_id})")
+        return batch_id
+
+    async def wait(
+        self,
+        client: httpx.AsyncClient,
+        batch_id: str,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Poll the batch until it reaches a terminal status."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        while True:
+            response = await client.get(
+                f"{self.base_url}/batches/{batch_id}", headers=self.headers
+            )
+            response.raise_for_status()
+            batch = response.json()
+            status = batch.get("status")
+            counts = batch.get("request_counts") or {}
+            logger.info(
+                f"Batch {batch_id} status: {status} "
+                f"({counts.get('completed', 0)}/{counts.get('total', 0)})"
+            )
+            if status in TERMINAL_STATUSES:
+                if status != "completed":
+                    raise BatchJobError(f"Batch {batch_id} ended with status {status}")
+                return batch
+            if deadline is not None and loop.time() >= deadline:
+                raise BatchJobError(f"Timed out waiting for batch {batch_id}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _download(self, client: httpx.AsyncClient, file_id: str) -> str:
+        response = await client.get(
+            f"{self.base_url}/files/{file_id}/content", headers=self.headers
+        )
+        response.raise_for_status()
+        return response.text
+
+    async def download_results(
+        self,
+        client: httpx.AsyncClient,
+        batch: Dict[str, Any],
+        conversations: Dict[str, ExtractInfoRequest],
+    ) -> Dict[str, Dict[str, Any]]:
+        """Download output/error files and normalize each extraction."""
+        results: Dict[str, Dict[str, Any]] = {}
+
+        if batch.get("output_file_id"):
+            output = await self._download(client, batch["output_file_id"])
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                custom_id = item.get("custom_id")
+                response = item.get("response") or {}
+                if item.get("error") or response.get("status_code") != 200:
+                    results[custom_id] = {
+                        "error": str(item.get("error") or response.get("body"))
+                    }
+                    continue
+                try:
+                    text = response["body"]["choices"][0]["message"]["content"]
+                    results[custom_id] = {
+                        "result": parse_extraction(text, conversations[custom_id])
+                    }
+                except Exception as e:
+                    logger.error(f"Failed to post-process {custom_id}: {e}")
+                    results[custom_id] = {"error": str(e)}
+
+        if batch.get("error_file_id"):
+            errors = await self._download(client, batch["error_file_id"])
+            for line in errors.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                results.setdefault(
+                    item.get("custom_id"), {"error": str(item.get("error"))}
+                )
+
+        for custom_id in conversations:
+            results.setdefault(custom_id, {"error": "missing from batch output"})
+        return results
+
+    async def run(
+        self,
+        conversations: Dict[str, ExtractInfoRequest],
+        work_dir: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Full job: write requests, submit, poll, download and normalize."""
+        work_dir = work_dir or tempfile.mkdtemp(prefix="extract_batch_")
+        path = self.write_requests(
+            conversations, os.path.join(work_dir, "requests.jsonl")
+        )
+
+        client = self.client or httpx.AsyncClient(timeout=60)
+        try:
+            batch_id = await self.submit(client, path)
+            batch = await self.wait(client, batch_id, timeout=timeout)
+            return await self.download_results(client, batch, conversations)
+        finally:
+            if self.client is None:
+                await client.aclose()
+
+
+def load_conversations(path: str) -> Dict[str, ExtractInfoRequest]:
+    """Read ``{"id": ..., "messages": [...]}`` lines from a JSONL file."""
+    conversations: Dict[str, ExtractInfoRequest] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            custom_id = str(item.get("id", index))
+            conversations[custom_id] = ExtractInfoRequest(messages=item["messages"])
+    return conversations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk re-extraction via Batch API")
+    parser.add_argument("input", help="JSONL file of conversations")
+    parser.add_argument("output", help="JSONL file to write results to")
+    parser.add_argument("--work-dir", default=None)
+    parser.add_argument("--poll-interval", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    conversations = load_conversations(args.input)
+    runner = BatchExtractionRunner(poll_interval=args.poll_interval)
+    results = asyncio.run(
+        runner.run(conversations, work_dir=args.work_dir, timeout=args.timeout)
+    )
+
+    failed = 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        for custom_id, outcome in results.items():
+            failed += "error" in outcome
+            f.write(json.dumps({"id": custom_id, **outcome}, ensure_ascii=False) + "\n")
+    logger.info(f"Wrote {len(results)} results ({failed} failed) to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
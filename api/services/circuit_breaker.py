@@ -0,0 +1,142 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Error-rate / latency circuit breaker.
+
+    Outcomes of recent calls are kept in a rolling window. The breaker opens
+    when either the error rate or the share of slow calls crosses its
+    threshold. While open, callers should use their fallback; a background
+    thread runs ``probe`` every ``probe_interval`` seconds and closes the
+    breaker again once a probe succeeds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        latency_threshold: float = 15.0,
+        slow_rate_threshold: float = 0.5,
+        probe: Optional[Callable[[], bool]] = None,
+        probe_interval: float = 10.0,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold = latency_threshold
+        self.slow_rate_threshold = slow_rate_threshold
+        self.probe = probe
+        self.probe_interval = probe_interval
+
+        self._outcomes: deque = deque(maxlen=window)  # (ok, slow) tuples
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at: Optional[float] = None
+        self._probe_thread: Optional[threading.Thread] = None
+        self._stats = {"opened": 0, "rejected": 0, "probes": 0, "probe_failures": 0}
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True when the protected call should be attempted."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        self._record(ok=True, slow=latency >= self.latency_threshold)
+
+    def record_failure(self) -> None:
+        self._record(ok=False, slow=False)
+
+    def _record(self, ok: bool, slow: bool) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                return
+            self._outcomes.append((ok, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            total = len(self._outcomes)
+            error_rate = sum(1 for o, _ in self._outcomes if not o) / total
+            slow_rate = sum(1 for _, s in self._outcomes if s) / total
+            if (
+                error_rate >= self.error_rate_threshold
+                or slow_rate >= self.slow_rate_threshold
+            ):
+                logger.warning(
+                    f"[{self.name}] circuit opened "
+                    f"(error_rate={error_rate:.2f}, slow_rate={slow_rate:.2f})"
+                )
+                self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.time()
+        self._stats["opened"] += 1
+        if self.probe and (
+            self._probe_thread is None or not self._probe_thread.is_alive()
+        ):
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, name=f"probe-{self.name}", daemon=True
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                if self._state == CLOSED:
+                    return
+                self._state = HALF_OPEN
+                self._stats["probes"] += 1
+            try:
+                healthy = bool(self.probe())
+            except Exception as e:
+                logger.info(f"[{self.name}] probe failed: {e}")
+                healthy = False
+            with self._lock:
+                if healthy:
+                    logger.info(f"[{self.name}] probe succeeded, circuit closed")
+                    self._state = CLOSED
+                    self._opened_at = None
+                    self._outcomes.clear()
+                    return
+                self._stats["probe_failures"] += 1
+                self._state = OPEN
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._opened_at = None
+            self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = len(self._outcomes)
+            errors = sum(1 for o, _ in self._outcomes if not o)
+            slow = sum(1 for _, s in self._outcomes if s)
+            return {
+                "state": self._state,
+                "opened_at": self._opened_at,
+                "window_calls": total,
+                "error_rate": errors / total if total else 0.0,
+                "slow_rate": slow / total if total else 0.0,
+                **self._stats,
+            }
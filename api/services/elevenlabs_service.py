@@ -1,9 +1,18 @@
 import os
+import asyncio
 import requests
 import logging
+from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from api.config.performance_config import PerformanceConfig
+from api.config.metrics import track_upstream
+from api.services.tts_cache import tts_cache, audio_cache_key, write_atomic
+from api.services.tts_scheduler import tts_scheduler
 
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class ElevenLabsService:
     def __init__(self):
@@ -13,31 +22,105 @@ class ElevenLabsService:
             raise ValueError("ELEVEN_LABS_API_KEY environment variable is not set")
 
         self.voice_id = os.getenv("ELEVENLABS_VOICE_ID")
-        self.base_url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
+        self.model_id = PerformanceConfig.TTS_DEFAULT_MODEL
+        self.base_url = (
+            f"{PerformanceConfig.ELEVENLABS_BASE_URL}/v1/text-to-speech/{self.voice_id}"
+        )
+
+        # Pooled keep-alive connections, sized to the scheduler's concurrency cap
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"xi-api-key": self.api_key, "Content-Type": "application/json"}
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=PerformanceConfig.TTS_MAX_CONCURRENCY
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         logger.info("ElevenLabs service initialized successfully")
 
+    def _download(self, payload: Dict, file_name: str) -> str:
+        """Stream the audio straight to ``file_name``; never held in memory whole."""
+        with track_upstream("elevenlabs", payload["model_id"]), self.session.post(
+            self.base_url,
+            json=payload,
+            stream=True,
+            timeout=PerformanceConfig.ELEVENLABS_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            size = write_atomic(
+                file_name, response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            )
+        logger.info(f"Downloaded {size} bytes to {file_name}")
+        return file_name
+
     def text_to_speech(self, text: str, file_name: str):
         try:
-            logger.info(f"Converting text to speech: {text[:50]}...")
+            logger.info(
+                "Converting text to speech", extra={"payload": text, "verbose": True}
+            )
             logger.info(f"Output file: {file_name}")
 
-            headers = {
-                "xi-api-key": self.api_key,
-                "Content-Type": "application/json",
-            }
             payload = {
                 "text": text,
+                "model_id": self.model_id,
                 "voice_settings": {"stability": 0.5, "similarity_boost": 0.5},
             }
 
-            response = requests.post(self.base_url, headers=headers, json=payload)
-            response.raise_for_status()
-
-            with open(file_name, "wb") as f:
-                f.write(response.content)
+            cache_key = audio_cache_key(
+                text, self.voice_id, self.model_id, payload["voice_settings"]
+            )
+            if PerformanceConfig.TTS_CACHE_ENABLED and tts_cache.copy_to(
+                cache_key, file_name
+            ):
+                logger.info(f"Audio served from TTS cache: {cache_key}")
+            else:
+                # Shared concurrency cap; identical concurrent requests share one download
+                source = tts_scheduler.run_sync(
+                    cache_key,
+                    self.voice_id,
+                    lambda: self._download(payload, file_name),
+                )
+                if source != file_name:
+                    with open(source, "rb") as src:
+                        write_atomic(
+                            file_name,
+                            iter(lambda: src.read(DOWNLOAD_CHUNK_SIZE), b""),
+                        )
+                elif PerformanceConfig.TTS_CACHE_ENABLED:
+                    tts_cache.put_file(cache_key, file_name)
 
             logger.info(f"Audio file created successfully: {file_name}")
 
         except Exception as e:
             logger.error(f"Error in ElevenLabs text-to-speech: {e}")
             raise
+
+    async def batch_text_to_speech(
+        self,
+        items: List[Tuple[str, str]],
+        concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        Generate many (text, file_name) pairs with bounded concurrency.
+        Each job runs the blocking ``text_to_speech`` in a worker thread via
+        ``asyncio.to_thread``, so ``concurrency`` is also the number of threads
+        in use. Jobs stream to disk, so memory stays at roughly one download
+        chunk per running job regardless of batch size.
+        """
+        semaphore = asyncio.Semaphore(
+            concurrency or PerformanceConfig.TTS_PER_VOICE_CONCURRENCY
+        )
+
+        async def run(text: str, file_name: str) -> Dict[str, Optional[str]]:
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(self.text_to_speech, text, file_name)
+                    return {"file": file_name, "error": None}
+                except Exception as e:
+                    return {"file": file_name, "error": str(e)}
+
+        results = await asyncio.gather(*[run(text, name) for text, name in items])
+        failed = sum(1 for r in results if r["error"])
+        logger.info(f"Batch TTS finished: {len(results) - failed} ok, {failed} failed")
+        return results
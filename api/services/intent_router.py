@@ -0,0 +1,386 @@
+import re
+import json
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Any
+from api.config.performance_config import PerformanceConfig
+from api.services.text_normalization import normalize_chars
+
+logger = logging.getLogger(__name__)
+# Dedicated logger so routing decisions can be shipped/audited separately
+audit_logger = logging.getLogger("api.routing.audit")
+
+ALL_SECTIONS = [
+    "identity",
+    "responsibilities",
+    "required_fields",
+    "how_you_work",
+    "anti_repetition",
+    "validation",
+    "response_format",
+    "important_rules",
+    "booking_rules",
+    "location_rule",
+    "finalization",
+    "travel_guide",
+    "state",
+    "knowledge_base",
+]
+
+# Bullet-only sections that continue "# Important Rules:"; profiles that use
+# them also include important_rules
+RULE_SECTIONS = {"booking_rules", "location_rule"}
+
+# Sections every profile keeps while a booking is in progress, so a side
+# question mid-booking still carries the checklist
+BOOKING_SECTIONS = ["anti_repetition", "state"]
+
+# Each profile lists the system prompt sections it needs plus its own
+# generation settings. "full" is the original all-in-one prompt and is used
+# whenever the router is not confident.
+PROMPT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "booking": {
+        "sections": [
+            "identity",
+            "responsibilities",
+            "required_fields",
+            "how_you_work",
+            "anti_repetition",
+            "validation",
+            "response_format",
+            "important_rules",
+            "booking_rules",
+            "finalization",
+            "state",
+            "knowledge_base",
+        ],
+        "max_tokens": 500,
+        "temperature": 0.3,
+        "expects_next_field": True,
+    },
+    "kb_faq": {
+        "sections": [
+            "identity",
+            "response_format",
+            "important_rules",
+            "location_rule",
+            "knowledge_base",
+        ],
+        "max_tokens": 800,
+        "temperature": 0.5,
+        "expects_next_field": False,
+    },
+    "travel_guide": {
+        "sections": ["identity", "response_format", "travel_guide"],
+        "max_tokens": 2000,
+        "temperature": 0.8,
+        "expects_next_field": False,
+    },
+    "small_talk": {
+        "sections": ["identity", "response_format", "important_rules"],
+        "max_tokens": 300,
+        "temperature": 0.8,
+        "expects_next_field": False,
+    },
+    "full": {
+        "sections": ALL_SECTIONS,
+        "max_tokens": PerformanceConfig.OPENAI_MAX_TOKENS,
+        "temperature": PerformanceConfig.OPENAI_TEMPERATURE,
+        "expects_next_field": True,
+    },
+}
+
+# (keyword, weight) per intent; Persian and English share one automaton
+INTENT_KEYWORDS: Dict[str, List[Tuple[str, float]]] = {
+    "booking": [
+        ("رزرو", 2),
+        ("بلیط", 2),
+        ("بلیت", 2),
+        ("پرواز", 1),
+        ("مسافر", 1),
+        ("گذرنامه", 2),
+        ("پاسپورت", 2),
+        ("کد ملی", 2),
+        ("کدملی", 2),
+        ("چمدان", 1),
+        ("ورودی", 2),
+        ("خروجی", 2),
+        ("بزرگسال", 2),
+        ("نوزاد", 2),
+        ("نفر", 1),
+        ("ملیت", 1),
+        ("ایرانی", 1),
+        ("جنسیت", 1),
+        ("مرد", 1),
+        ("زن", 1),
+        ("book", 2),
+        ("booking", 2),
+        ("ticket", 2),
+        ("reserve", 2),
+        ("reservation", 2),
+        ("flight", 1),
+        ("passenger", 1),
+        ("passport", 2),
+        ("national id", 2),
+        ("luggage", 1),
+        ("baggage", 1),
+        ("arrival", 2),
+        ("departure", 2),
+        ("adult", 2),
+        ("infant", 2),
+        ("male", 1),
+        ("female", 1),
+        ("nationality", 1),
+        ("iranian", 1),
+    ],
+    "kb_faq": [
+        ("cip", 2),
+        ("vip", 2),
+        ("سی آی پی", 2),
+        ("سالن", 1),
+        ("خدمات", 1),
+        ("قیمت", 2),
+        ("هزینه", 2),
+        ("تعرفه", 2),
+        ("ویلچر", 2),
+        ("ترانسفر", 2),
+        ("کنسلی", 2),
+        ("لغو", 1),
+        ("نمازخانه", 2),
+        ("سرویس بهداشتی", 2),
+        ("دستشویی", 2),
+        ("فروشگاه", 2),
+        ("سیگار", 2),
+        ("کال سنتر", 2),
+        ("پشتیبانی", 1),
+        ("پذیرایی", 1),
+        ("باربری", 2),
+        ("lounge", 2),
+        ("service", 1),
+        ("price", 2),
+        ("cost", 2),
+        ("tariff", 2),
+        ("fee", 2),
+        ("wheelchair", 2),
+        ("transfer", 2),
+        ("cancel", 2),
+        ("refund", 2),
+        ("prayer room", 2),
+        ("restroom", 2),
+        ("toilet", 2),
+        ("shop", 2),
+        ("smoking", 2),
+        ("call center", 2),
+        ("porter", 2),
+    ],
+    "travel_guide": [
+        ("دیدنی", 3),
+        ("گردشگری", 3),
+        ("جاذبه", 3),
+        ("تفریح", 2),
+        ("موزه", 3),
+        ("فرهنگ", 2),
+        ("رستوران", 2),
+        ("غذای محلی", 3),
+        ("برنامه سفر", 3),
+        ("آب و هوا", 2),
+        ("بهترین زمان", 3),
+        ("سوغات", 3),
+        ("تاریخی", 2),
+        ("بازار", 2),
+        ("attraction", 3),
+        ("sightseeing", 3),
+        ("things to do", 3),
+        ("places to visit", 3),
+        ("museum", 3),
+        ("culture", 2),
+        ("restaurant", 2),
+        ("local food", 3),
+        ("itinerary", 3),
+        ("weather", 2),
+        ("best time", 3),
+        ("souvenir", 3),
+        ("historic", 2),
+        ("bazaar", 2),
+        ("tour", 2),
+    ],
+    "small_talk": [
+        ("سلام", 1),
+        ("ممنون", 1),
+        ("مرسی", 1),
+        ("متشکرم", 1),
+        ("چطوری", 2),
+        ("خوبی", 2),
+        ("کی هستی", 2),
+        ("اسمت", 2),
+        ("جوک", 3),
+        ("شوخی", 3),
+        ("خداحافظ", 2),
+        ("hello", 1),
+        ("hi", 1),
+        ("hey", 1),
+        ("thanks", 1),
+        ("thank you", 1),
+        ("how are you", 2),
+        ("who are you", 2),
+        ("your name", 2),
+        ("joke", 3),
+        ("bye", 2),
+        ("goodbye", 2),
+    ],
+}
+
+
+def profile_sections(profile: Dict[str, Any], booking_active: bool) -> List[str]:
+    """Section names to send for a profile, in prompt order."""
+    names = set(profile["sections"])
+    if booking_active:
+        names.update(BOOKING_SECTIONS)
+    return [name for name in ALL_SECTIONS if name in names]
+
+
+_DIGIT_MAP = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: all keyword hits in one pass over the text"""
+
+    def __init__(self, keywords: Dict[str, List[Tuple[str, float]]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str, float]]] = [[]]
+        for intent, entries in keywords.items():
+            for keyword, weight in entries:
+                self._add(self._normalize(keyword), intent, weight)
+        self._build()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return normalize_chars(text).lower()
+
+    def _add(self, keyword: str, intent: str, weight: float) -> None:
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append((keyword, intent, weight))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> List[Tuple[str, str, float]]:
+        """Return (keyword, intent, weight) for every whole-word hit."""
+        text = self._normalize(text)
+        hits = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword, intent, weight in self._out[state]:
+                start = index - len(keyword) + 1
+                # Keywords must start on a word boundary; short ones must also
+                # end on one ("hi" must not match "this", "زن" not "زنگ")
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                end = index + 1
+                if len(keyword) <= 3 and end < len(text) and text[end].isalnum():
+                    continue
+                hits.append((keyword, intent, weight))
+        return hits
+
+
+class IntentRouter:
+    """Local (no network) classifier mapping each turn to a prompt profile"""
+
+    def __init__(self):
+        self.automaton = KeywordAutomaton(INTENT_KEYWORDS)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {name: 0 for name in PROMPT_PROFILES}
+
+    def _features(
+        self,
+        text: str,
+        booking_active: bool,
+        detected_field: Optional[str],
+        selected_location: Optional[str],
+    ) -> Dict[str, float]:
+        scores = {intent: 0.0 for intent in INTENT_KEYWORDS}
+        # Mostly digits (IDs, passport/phone numbers, dates, counts) → booking answer
+        compact = re.sub(r"\s", "", text.translate(_DIGIT_MAP))
+        if compact and sum(c.isdigit() for c in compact) / len(compact) >= 0.5:
+            scores["booking"] += 3
+        if detected_field:
+            scores["booking"] += 2
+        if selected_location:
+            scores["kb_faq"] += 3
+        # Short answers in the middle of a booking usually answer the last question
+        if booking_active and len(text.split()) <= 3:
+            scores["booking"] += 2
+        return scores
+
+    def route(
+        self,
+        text: str,
+        language: str,
+        session_id: Optional[str] = None,
+        booking_active: bool = False,
+        detected_field: Optional[str] = None,
+        selected_location: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Pick a prompt profile for the turn and log the decision."""
+        scores = self._features(text, booking_active, detected_field, selected_location)
+        matched = []
+        for keyword, intent, weight in self.automaton.search(text):
+            scores[intent] += weight
+            matched.append(keyword)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+        if not PerformanceConfig.INTENT_ROUTING_ENABLED:
+            intent, reason = "full", "disabled"
+        elif best_score == 0:
+            intent = "booking" if booking_active else "full"
+            reason = "no_signal"
+        elif best_score - runner_up < PerformanceConfig.INTENT_ROUTING_MARGIN:
+            intent, reason = "full", "ambiguous"
+        else:
+            intent, reason = best, "scored"
+
+        with self._lock:
+            self._counts[intent] += 1
+
+        decision = {
+            "session_id": session_id,
+            "language": language,
+            "intent": intent,
+            "reason": reason,
+            "scores": scores,
+            "matched": matched,
+            "message_length": len(text),
+            "booking_active": booking_active,
+        }
+        audit_logger.info(f"route_decision {json.dumps(decision, ensure_ascii=False)}")
+        return {**decision, "profile": {"name": intent, **PROMPT_PROFILES[intent]}}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+# Global instance for reuse
+intent_router = IntentRouter()
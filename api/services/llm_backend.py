@@ -0,0 +1,383 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+import httpx
+from api.config.performance_config import PerformanceConfig
+from api.config.metrics import track_upstream, track_upstream_stream
+from api.services.upstream_client import get_upstream_client
+from api.services.ollamaService import OllamaService
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownBackendError(ValueError):
+    """Raised when a route or request names a backend that is not configured"""
+
+
+class LLMResult(NamedTuple):
+    content: str
+    model: str
+    # prompt_tokens / completion_tokens / total_tokens and, when the provider
+    # reports it, cached_tokens (empty when not reported)
+    usage: Dict[str, int]
+
+
+class LLMChunk(NamedTuple):
+    """One streamed piece; the final chunk carries usage when the backend reports it"""
+
+    content: str
+    usage: Optional[Dict[str, int]] = None
+
+
+def _usage(
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    cached_tokens: Optional[int] = None,
+):
+    if prompt_tokens is None and completion_tokens is None:
+        return {}
+    prompt_tokens = prompt_tokens or 0
+    completion_tokens = completion_tokens or 0
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+    # Prompt tokens served from the provider's prompt cache (part of prompt_tokens)
+    if cached_tokens is not None:
+        usage["cached_tokens"] = cached_tokens
+    return usage
+
+
+def _openai_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    details = usage.get("prompt_tokens_details") or {}
+    return _usage(
+        usage.get("prompt_tokens"),
+        usage.get("completion_tokens"),
+        details.get("cached_tokens"),
+    )
+
+
+class LLMBackend:
+    """
+    Chat completion backend. ``chat`` and ``stream`` are async; ``chat_sync``
+    serves the threadpool routes. ``route`` names the caller so upstream
+    latency profiles (timeouts, hedging) are kept per route and model.
+    """
+
+    kind = "base"
+
+    def __init__(self, name: str, default_model: str):
+        self.name = name
+        self.default_model = default_model
+
+    async def chat(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        json_mode: bool = False,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        route: str = "default",
+    ) -> LLMResult:
+        raise NotImplementedError
+
+    def chat_sync(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        json_mode: bool = False,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        route: str = "default",
+    ) -> LLMResult:
+        raise NotImplementedError
+
+    def stream(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        json_mode: bool = False,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        route: str = "default",
+    ) -> AsyncIterator[LLMChunk]:
+        raise NotImplementedError
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """OpenAI chat completions API (also vLLM, LiteLLM and similar servers)"""
+
+    kind = "openai"
+
+    def __init__(
+        self,
+        name: str,
+        default_model: str,
+        base_url: str,
+        api_key: Optional[str] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+        api_key_env: Optional[str] = None,
+    ):
+        super().__init__(name, default_model)
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.api_key = api_key
+        # Environment variable the key is read from; None for keyless servers
+        self.api_key_env = api_key_env
+        self.async_transport = async_transport
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _payload(
+        self, messages, model, json_mode, max_tokens, temperature
+    ) -> Dict[str, Any]:
+        payload = {"model": model or self.default_model, "messages": messages}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if temperature is not None:
+            payload["temperature"] = temperature
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def _upstream(self, route: str, model: str):
+        return get_upstream_client(f"{self.name}_{route}:{model}")
+
+    @staticmethod
+    def _result(result: Dict[str, Any], model: str) -> LLMResult:
+        usage = result.get("usage") or {}
+        return LLMResult(
+            content=result["choices"][0]["message"]["content"],
+            model=result.get("model", model),
+            usage=_openai_usage(usage),
+        )
+
+    async def chat(
+        self,
+        messages,
+        model=None,
+        json_mode=False,
+        max_tokens=None,
+        temperature=None,
+        route="default",
+    ) -> LLMResult:
+        payload = self._payload(messages, model, json_mode, max_tokens, temperature)
+        with track_upstream(self.name, payload["model"]):
+            result = await self._upstream(route, payload["model"]).post_json(
+                self.url, self._headers(), payload
+            )
+        return self._result(result, payload["model"])
+
+    def chat_sync(
+        self,
+        messages,
+        model=None,
+        json_mode=False,
+        max_tokens=None,
+        temperature=None,
+        route="default",
+    ) -> LLMResult:
+        payload = self._payload(messages, model, json_mode, max_tokens, temperature)
+        with track_upstream(self.name, payload["model"]):
+            result = self._upstream(route, payload["model"]).post_json_sync(
+                self.url, self._headers(), payload
+            )
+        return self._result(result, payload["model"])
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(transport=self.async_transport)
+            self._async_loop = loop
+        return self._async_client
+
+    async def stream(
+        self,
+        messages,
+        model=None,
+        json_mode=False,
+        max_tokens=None,
+        temperature=None,
+        route="default",
+    ) -> AsyncIterator[LLMChunk]:
+        """Server-sent ``data:`` lines; usage arrives in the last chunk."""
+        payload = self._payload(messages, model, json_mode, max_tokens, temperature)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        async for chunk in track_upstream_stream(
+            self.name, payload["model"], self._stream_chunks(payload)
+        ):
+            yield chunk
+
+    async def _stream_chunks(self, payload: Dict[str, Any]) -> AsyncIterator[LLMChunk]:
+        async with self._get_async_client().stream(
+            "POST",
+            self.url,
+            headers=self._headers(),
+            json=payload,
+            timeout=PerformanceConfig.OPENAI_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                for choice in event.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield LLMChunk(content)
+                usage = event.get("usage")
+                if usage:
+                    yield LLMChunk("", _openai_usage(usage))
+
+
+class OllamaBackend(LLMBackend):
+    """Local Ollama server over its NDJSON /api/chat stream (see ``OllamaService``)"""
+
+    kind = "ollama"
+
+    def __init__(
+        self,
+        name: str,
+        default_model: str,
+        service: Optional[OllamaService] = None,
+        timeout: float = 120,
+    ):
+        super().__init__(name, default_model)
+        self.service = service or OllamaService()
+        self.timeout = timeout
+
+    @staticmethod
+    def _options(max_tokens, temperature) -> Dict[str, Any]:
+        options = {}
+        if max_tokens is not None:
+            options["num_predict"] = max_tokens
+        if temperature is not None:
+            options["temperature"] = temperature
+        return options
+
+    @staticmethod
+    def _event_usage(event: Dict) -> Dict[str, int]:
+        return _usage(event.get("prompt_eval_count"), event.get("eval_count"))
+
+    async def stream(
+        self,
+        messages,
+        model=None,
+        json_mode=False,
+        max_tokens=None,
+        temperature=None,
+        route="default",
+    ) -> AsyncIterator[LLMChunk]:
+        model = model or self.default_model
+        events = self.service.stream_events(
+            messages,
+            self.timeout,
+            json_mode,
+            model,
+            self._options(max_tokens, temperature),
+        )
+        async for event in track_upstream_stream(self.name, model, events):
+            content = self.service.content_of(event)
+            if content:
+                yield LLMChunk(content)
+            if event.get("done"):
+                yield LLMChunk("", self._event_usage(event))
+
+    async def chat(
+        self,
+        messages,
+        model=None,
+        json_mode=False,
+        max_tokens=None,
+        temperature=None,
+        route="default",
+    ) -> LLMResult:
+        parts, usage = [], {}
+        async for chunk in self.stream(
+            messages, model, json_mode, max_tokens, temperature, route
+        ):
+            parts.append(chunk.content)
+            usage = chunk.usage or usage
+        return LLMResult("".join(parts), model or self.default_model, usage)
+
+    def chat_sync(
+        self,
+        messages,
+        model=None,
+        json_mode=False,
+        max_tokens=None,
+        temperature=None,
+        route="default",
+    ) -> LLMResult:
+        parts, usage = [], {}
+        model = model or self.default_model
+        with track_upstream(self.name, model):
+            for event in self.service.events_sync(
+                messages,
+                self.timeout,
+                json_mode,
+                model,
+                self._options(max_tokens, temperature),
+            ):
+                parts.append(self.service.content_of(event))
+                if event.get("done"):
+                    usage = self._event_usage(event)
+        return LLMResult("".join(parts), model, usage)
+
+
+_backends: Dict[str, LLMBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def _create_backend(name: str) -> LLMBackend:
+    config = PerformanceConfig.LLM_BACKENDS.get(name)
+    if config is None:
+        raise UnknownBackendError(f"Unknown LLM backend: {name}")
+    if config["type"] == OpenAICompatibleBackend.kind:
+        return OpenAICompatibleBackend(
+            name,
+            config["model"],
+            config["base_url"],
+            api_key=os.getenv(config.get("api_key_env", "")),
+            api_key_env=config.get("api_key_env"),
+        )
+    if config["type"] == OllamaBackend.kind:
+        return OllamaBackend(name, config["model"])
+    raise UnknownBackendError(f"Unknown LLM backend type: {config['type']}")
+
+
+def get_llm_backend(name: str) -> LLMBackend:
+    """Shared backend instance per configured name"""
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = _create_backend(name)
+        return _backends[name]
+
+
+def is_openai_backend(backend: LLMBackend) -> bool:
+    """
+    True only for the configured ``openai`` backend. Other OpenAI-compatible
+    servers share its API but not its model names, cascade or breaker.
+    """
+    return backend.kind == OpenAICompatibleBackend.kind and backend.name == "openai"
+
+
+def backend_for(route: str, requested: Optional[str] = None) -> LLMBackend:
+    """Backend named by the request, else the route's configured default"""
+    name = requested or PerformanceConfig.LLM_ROUTE_BACKENDS.get(
+        route, PerformanceConfig.LLM_DEFAULT_BACKEND
+    )
+    return get_llm_backend(name)
@@ -0,0 +1,81 @@
+import re
+import json
+import threading
+from typing import Dict, List, Optional, Any
+from api.services.upstream_client import LatencyTracker
+from api.services.text_normalization import normalize_chars
+
+
+def extract_reply_texts(content: str) -> Optional[List[str]]:
+    """
+    Return the message texts of a model reply, or None when the JSON shape
+    is not the ``{"messages": [{"text": ...}]}`` (or bare list) we expect.
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    if isinstance(data, dict):
+        data = data.get("messages")
+    if not isinstance(data, list) or not data:
+        return None
+    texts = []
+    for msg in data:
+        if not isinstance(msg, dict):
+            return None
+        text = msg.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return None
+        texts.append(text)
+    return texts
+
+
+def _normalize_reply(text: str) -> str:
+    # ZWNJ becomes a space so suffixes like چمدان‌ها keep a word boundary
+    return normalize_chars(text.replace("\u200c", " ")).lower()
+
+
+def reply_asks_for(texts: List[str], keywords: List[str]) -> bool:
+    """True when any message contains one of the expected field phrases as whole words."""
+    joined = _normalize_reply(" ".join(texts))
+    return any(
+        re.search(rf"(?<!\w){re.escape(_normalize_reply(kw))}(?!\w)", joined)
+        for kw in keywords
+    )
+
+
+class CascadeStats:
+    """Per-tier hit rates and latency for the model cascade"""
+
+    def __init__(self, tiers: List[str], window: int = 200):
+        self._lock = threading.Lock()
+        self._counts = {
+            tier: {"attempts": 0, "accepted": 0, "rejected": 0, "errors": 0}
+            for tier in tiers
+        }
+        self._latency = {tier: LatencyTracker(window) for tier in tiers}
+        self._reasons: Dict[str, int] = {}
+
+    def record(
+        self, tier: str, outcome: str, latency: float, reason: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            self._counts[tier]["attempts"] += 1
+            self._counts[tier][outcome] += 1
+            if reason:
+                self._reasons[reason] = self._reasons.get(reason, 0) + 1
+        self._latency[tier].record(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {tier: dict(c) for tier, c in self._counts.items()}
+            reasons = dict(self._reasons)
+        tiers = {}
+        for tier, c in counts.items():
+            tiers[tier] = {
+                **c,
+                "hit_rate": c["accepted"] / c["attempts"] if c["attempts"] else 0.0,
+                "p50": self._latency[tier].percentile(0.5),
+                "p90": self._latency[tier].percentile(0.9),
+            }
+        return {"tiers": tiers, "escalation_reasons": reasons}
@@ -1,14 +1,44 @@
 import os
 import json
+import asyncio
 import logging
-import requests
 import uuid
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 from datetime import datetime
-import re
+import httpx
+from api.config.performance_config import cache_manager, PerformanceConfig
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT_CACHE_KEY = "ollama_system_prompt"
+
+SYSTEM_PROMPT_TEMPLATE = """
+تو یک دستیار هوش مصنوعی به نام «نکسا» هستی که خدمات فرودگاهی در فرودگاه امام خمینی را ارائه می‌دهی. 
+تو فقط به زبان فارسی صحبت می‌کنی، حتی اگر کاربر به زبان انگلیسی پیام بدهد. پاسخ‌ها باید همیشه فارسی باشند.
+
+# قوانین مهم:
+- همیشه در نقش بمون، فقط درباره موضوعات تعریف‌شده در دانش‌نامه حرف بزن
+- در هر بار فقط یک سوال را بپرس و هرگز پیام های غیر مربوط به سوال را نپرس
+
+- پاسخ‌ها باید مرحله‌به‌مرحله، با لحن محاوره‌ای، مهربان و حداکثر ۳ جمله‌ای باشن
+- اگر اطلاعاتی ناقص بود، فقط یک بار با احترام تکرارش کن
+ - اگر کاربر جوک خواست یا خودش جوک گفت، پاسخ کوتاه بده و «facialExpression» را «funnyFace» و در صورت مناسب «animation» را «Laughing» قرار بده.
+
+# مثال پاسخ:
+{{
+  "messages": [
+    {{
+      "text": "سلام، به فرودگاه امام خوش اومدی!",
+      "facialExpression": "smile",
+      "animation": "Talking_0"
+    }}
+  ]
+}}
+
+# دانش‌نامه:
+{knowledge_base}
+"""
+
 
 class AgentMemory:
     """Memory system for the agent to maintain conversation history"""
@@ -54,88 +84,186 @@ class OllamaService:
 
     def __init__(self):
         if not hasattr(self, "initialized"):
-            self.api_url = "http://localhost:11434/api/chat"
-            self.model_name = "llama3"  # یا هر مدلی که اجرا کردید
+            self.api_url = os.getenv(
+                "OLLAMA_API_URL", f"{PerformanceConfig.OLLAMA_BASE_URL}/api/chat"
+            )
+            # یا هر مدلی که اجرا کردید
+            self.model_name = os.getenv("OLLAMA_MODEL", "llama3")
             self.memory = OllamaService._memory
+            # برای تست می‌توان یک Ollama محلی جایگزین (httpx transport) قرار داد
+            self.transport: Optional[httpx.BaseTransport] = None
+            self.async_transport: Optional[httpx.AsyncBaseTransport] = None
+            self._sync_client: Optional[httpx.Client] = None
+            self._async_client: Optional[httpx.AsyncClient] = None
+            self._async_loop = None
             self.initialized = True
 
-    def get_assistant_response(
-        self, user_message: str, session_id: Optional[str] = None
-    ):
-        if session_id is None:
-            session_id = str(uuid.uuid4())
+    # --------------------
+    # Prompt
+    # --------------------
+    def _system_prompt(self) -> str:
+        """System prompt with the knowledge base, built once and cached"""
+        system_prompt = cache_manager.get(SYSTEM_PROMPT_CACHE_KEY)
+        if system_prompt is None:
+            try:
+                with open(
+                    "api/constants/knowledge_base.txt", "r", encoding="utf-8"
+                ) as f:
+                    knowledge_base = f.read()
+            except FileNotFoundError:
+                logger.error("Knowledge base file not found for Ollama prompt")
+                knowledge_base = ""
+            system_prompt = SYSTEM_PROMPT_TEMPLATE.format(knowledge_base=knowledge_base)
+            cache_manager.set(
+                SYSTEM_PROMPT_CACHE_KEY,
+                system_prompt,
+                PerformanceConfig.KNOWLEDGE_BASE_CACHE_TTL,
+            )
+        return system_prompt
 
-        with open("api/constants/knowledge_base.txt", "r", encoding="utf-8") as f:
-            knowledge_base = f.read()
+    # --------------------
+    # Upstream
+    # --------------------
+    def _payload(
+        self,
+        messages: List[Dict],
+        json_mode: bool,
+        model: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ) -> Dict:
+        payload = {
+            "model": model or self.model_name,
+            "messages": [
+                {"role": m["role"], "content": m["content"]} for m in messages
+            ],
+            "stream": True,
+            # مدل بین درخواست‌ها در حافظه Ollama بارگذاری‌شده می‌ماند
+            "keep_alive": PerformanceConfig.OLLAMA_KEEP_ALIVE,
+        }
+        if json_mode:
+            payload["format"] = "json"
+        if options:
+            payload["options"] = options
+        return payload
 
-        system_prompt = f"""
-تو یک دستیار هوش مصنوعی به نام «نکسا» هستی که خدمات فرودگاهی در فرودگاه امام خمینی را ارائه می‌دهی. 
-تو فقط به زبان فارسی صحبت می‌کنی، حتی اگر کاربر به زبان انگلیسی پیام بدهد. پاسخ‌ها باید همیشه فارسی باشند.
+    @staticmethod
+    def _parse_line(line: str) -> Optional[Dict]:
+        """One NDJSON object; raises when Ollama reports an error"""
+        if not line.strip():
+            return None
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed Ollama line ({e}): {line[:200]}")
+            return None
+        if data.get("error"):
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        return data
 
-# قوانین مهم:
-- همیشه در نقش بمون، فقط درباره موضوعات تعریف‌شده در دانش‌نامه حرف بزن
-- در هر بار فقط یک سوال را بپرس و هرگز پیام های غیر مربوط به سوال را نپرس
+    @staticmethod
+    def content_of(event: Dict) -> str:
+        return event.get("message", {}).get("content") or ""
 
-- پاسخ‌ها باید مرحله‌به‌مرحله، با لحن محاوره‌ای، مهربان و حداکثر ۳ جمله‌ای باشن
-- اگر اطلاعاتی ناقص بود، فقط یک بار با احترام تکرارش کن
- - اگر کاربر جوک خواست یا خودش جوک گفت، پاسخ کوتاه بده و «facialExpression» را «funnyFace» و در صورت مناسب «animation» را «Laughing» قرار بده.
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(transport=self.async_transport)
+            self._async_loop = loop
+        return self._async_client
 
-# مثال پاسخ:
-[
-  {{
-    "text": "سلام، به فرودگاه امام خوش اومدی!",
-    "facialExpression": "smile",
-    "animation": "Talking_0"
-  }}
-]
+    def _get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(transport=self.transport)
+        return self._sync_client
 
-# دانش‌نامه:
-{knowledge_base}
-"""
+    async def stream_events(
+        self,
+        messages: List[Dict],
+        timeout: float = 120,
+        json_mode: bool = False,
+        model: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ) -> AsyncIterator[Dict]:
+        """Yield Ollama's NDJSON objects as they arrive; the last has ``done``."""
+        async with self._get_async_client().stream(
+            "POST",
+            self.api_url,
+            json=self._payload(messages, json_mode, model, options),
+            timeout=timeout,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                event = self._parse_line(line)
+                if event is not None:
+                    yield event
 
-        messages = [{"role": "system", "content": system_prompt}]
-        messages += self.memory.get_conversation_history(session_id)
-        messages.append({"role": "user", "content": user_message})
+    def events_sync(
+        self,
+        messages: List[Dict],
+        timeout: float = 120,
+        json_mode: bool = False,
+        model: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ) -> Iterator[Dict]:
+        """Blocking variant of ``stream_events`` for threadpool callers."""
+        with self._get_sync_client().stream(
+            "POST",
+            self.api_url,
+            json=self._payload(messages, json_mode, model, options),
+            timeout=timeout,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                event = self._parse_line(line)
+                if event is not None:
+                    yield event
 
-        payload = {
-            "model": self.model_name,
-            "messages": messages,
-        }
+    async def stream_chat(
+        self, messages: List[Dict], timeout: float = 120, json_mode: bool = False
+    ) -> AsyncIterator[str]:
+        """Yield content pieces as Ollama streams them (NDJSON, one object per line)."""
+        async for event in self.stream_events(messages, timeout, json_mode):
+            content = self.content_of(event)
+            if content:
+                yield content
 
-        try:
-            response = requests.post(
-                self.api_url,
-                json=payload,
-                timeout=120,
-            )
-            response.raise_for_status()
+    async def acomplete(
+        self, messages: List[Dict], timeout: float = 120, json_mode: bool = False
+    ) -> str:
+        return "".join(
+            [part async for part in self.stream_chat(messages, timeout, json_mode)]
+        )
+
+    def complete(
+        self, messages: List[Dict], timeout: float = 120, json_mode: bool = False
+    ) -> str:
+        """Blocking variant for threadpool callers (OpenAI failover)."""
+        return "".join(
+            self.content_of(event)
+            for event in self.events_sync(messages, timeout, json_mode)
+        )
+
+    # --------------------
+    # Conversation
+    # --------------------
+    async def get_assistant_response(
+        self, user_message: str, session_id: Optional[str] = None
+    ):
+        if session_id is None:
+            session_id = str(uuid.uuid4())
 
-            response_text = response.text
-            print("🔍 Ollama raw response:\n", response_text)
+        messages = [{"role": "system", "content": self._system_prompt()}]
+        messages += self.memory.get_conversation_history(session_id)
+        messages.append({"role": "user", "content": user_message})
 
-            # استخراج خطوط JSON و چسباندن بخش content
-            final_content = ""
-            for line in response_text.strip().splitlines():
-                try:
-                    data = json.loads(line)
-                    content_part = data.get("message", {}).get("content")
-                    if content_part:
-                        final_content += content_part
-                except json.JSONDecodeError as e:
-                    print("⛔ خطای JSON در خط:", line, " ➜ ", e)
+        try:
+            final_content = await self.acomplete(messages, json_mode=True)
 
             # ذخیره در حافظه
             self.memory.add_message(session_id, "user", user_message)
             self.memory.add_message(session_id, "assistant", final_content)
 
-            # بازگشت متن نهایی به صورت ساده برای تست
-            return [
-                {
-                    "text": final_content,
-                    "facialExpression": "default",
-                    "animation": "Idle",
-                }
-            ], session_id
+            return self._to_messages(final_content), session_id
 
         except Exception as e:
             logger.error(f"Error in Ollama service: {e}")
@@ -147,6 +275,29 @@ class OllamaService:
                 }
             ], session_id
 
+    @staticmethod
+    def _to_messages(content: str) -> List[Dict]:
+        """Messages from the JSON reply; plain text becomes a single message"""
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            data = data.get("messages", [data])
+        if isinstance(data, list):
+            messages = [
+                {
+                    "text": str(m["text"]),
+                    "facialExpression": m.get("facialExpression", "default"),
+                    "animation": m.get("animation", "Idle"),
+                }
+                for m in data
+                if isinstance(m, dict) and m.get("text")
+            ]
+            if messages:
+                return messages
+        return [{"text": content, "facialExpression": "default", "animation": "Idle"}]
+
     def clear_memory(self, session_id: str = "default"):
         self.memory.clear_conversation(session_id)
 
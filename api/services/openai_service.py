@@ -1,17 +1,56 @@
 import os
 import json
 import logging
-import requests
 import uuid
 import re
+import time
+import httpx
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from api.config.performance_config import cache_manager, PerformanceConfig
 from api.services.animation_service import animation_selector
+from api.services.llm_backend import (
+    LLMBackend,
+    OllamaBackend,
+    backend_for,
+    is_openai_backend,
+)
+from api.services.circuit_breaker import CircuitBreaker, CLOSED
+from api.services.model_cascade import (
+    CascadeStats,
+    extract_reply_texts,
+    reply_asks_for,
+)
+from api.services.text_normalization import normalize_chars
+from api.services.intent_router import intent_router, profile_sections, RULE_SECTIONS
+from api.services.request_timing import phase
+from api.services.token_usage import token_usage
+from api.constants.phrases import ERROR_MESSAGES, FIELD_QUESTIONS, phrases_for
 
 logger = logging.getLogger(__name__)
 
 
+# Location keywords for wayfinding questions (canonical name -> phrasings)
+LOCATION_KEYWORDS = {
+    "en": {
+        "call center": ["call center", "contact center", "help desk"],
+        "prayer room": ["prayer room", "chapel", "mosque"],
+        "restroom": ["restroom", "bathroom", "toilet", "washroom"],
+        "shop": ["shop", "store", "retail", "gift shop"],
+        "smoking room": ["smoking room", "smoking area", "smoking lounge"],
+        "transit lounge": ["transit lounge", "lounge", "waiting area"],
+    },
+    "fa": {
+        "کال سنتر": ["کال سنتر", "مرکز تماس", "پشتیبانی"],
+        "نمازخانه": ["نمازخانه", "محل عبادت"],
+        "سرویس بهداشتی": ["سرویس بهداشتی", "دستشویی", "توالت"],
+        "فروشگاه": ["فروشگاه", "مغازه"],
+        "اتاق سیگار": ["اتاق سیگار", "محل سیگار", "اتاق کشیدن سیگار"],
+        "سالن ترانزیت": ["سالن ترانزیت", "سالن انتظار", "لانج ترانزیت"],
+    },
+}
+
+
 class AgentMemory:
     """Memory system for the agent to maintain conversation history"""
 
@@ -61,11 +100,193 @@ class OpenAIService:
                 logger.error("OPENAI_API_KEY not set")
                 raise ValueError("OPENAI_API_KEY environment variable is not set")
 
-            self.api_url = "https://api.openai.com/v1/chat/completions"
+            self.api_url = f"{PerformanceConfig.OPENAI_BASE_URL}/chat/completions"
             self.memory = OpenAIService._memory
             self.booking_states: Dict[str, dict] = {}
+            self.breaker = CircuitBreaker(
+                "openai_chat",
+                window=PerformanceConfig.OPENAI_BREAKER_WINDOW,
+                min_calls=PerformanceConfig.OPENAI_BREAKER_MIN_CALLS,
+                error_rate_threshold=PerformanceConfig.OPENAI_BREAKER_ERROR_RATE,
+                latency_threshold=PerformanceConfig.OPENAI_BREAKER_LATENCY,
+                slow_rate_threshold=PerformanceConfig.OPENAI_BREAKER_SLOW_RATE,
+                probe=self._probe_openai,
+                probe_interval=PerformanceConfig.OPENAI_BREAKER_PROBE_INTERVAL,
+            )
+            # Failover uses the configured Ollama model with a shorter timeout
+            self.failover_backend = OllamaBackend(
+                "ollama",
+                PerformanceConfig.LLM_BACKENDS["ollama"]["model"],
+                timeout=PerformanceConfig.OLLAMA_FAILOVER_TIMEOUT,
+            )
+            self.failover_stats = {"ollama_turns": 0, "ollama_errors": 0}
+            self.cascade_stats = CascadeStats(["cheap", "strong"])
             self.initialized = True
 
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    # --------------------
+    # Upstream call with circuit breaker / Ollama failover
+    # --------------------
+    def _probe_openai(self) -> bool:
+        """Tiny completion used by the breaker to check OpenAI recovered."""
+        response = httpx.post(
+            self.api_url,
+            headers=self._headers(),
+            json={
+                "model": PerformanceConfig.OPENAI_CHAT_MODEL,
+                "max_tokens": 1,
+                "messages": [{"role": "user", "content": "ping"}],
+            },
+            timeout=PerformanceConfig.OPENAI_BREAKER_LATENCY,
+        )
+        response.raise_for_status()
+        return True
+
+    def _complete_with_ollama(
+        self, payload: Dict, session_id: Optional[str] = None
+    ) -> str:
+        """Run the same prompt, history and reply limits on the local Ollama backend."""
+        try:
+            result = self.failover_backend.chat_sync(
+                payload["messages"],
+                json_mode=True,
+                max_tokens=payload.get("max_tokens"),
+                temperature=payload.get("temperature"),
+                route="chat",
+            )
+        except Exception:
+            self.failover_stats["ollama_errors"] += 1
+            raise
+        self.failover_stats["ollama_turns"] += 1
+        token_usage.record("chat", result.model, result.usage, session_id)
+        content = result.content
+        try:
+            json.loads(content)
+        except json.JSONDecodeError:
+            # Local models do not always honour the JSON format; wrap plain text
+            content = json.dumps(
+                {"messages": [{"text": content.strip()}]}, ensure_ascii=False
+            )
+        return content
+
+    @staticmethod
+    def _is_upstream_failure(error: Exception) -> bool:
+        """Timeouts, transport errors, 429 and 5xx; not bad requests."""
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            return status == 429 or status >= 500
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    def _complete(
+        self,
+        payload: Dict,
+        backend: LLMBackend,
+        allow_failover: bool = True,
+        session_id: Optional[str] = None,
+        record_breaker: bool = True,
+    ) -> str:
+        """
+        Chat completion content, failing over to Ollama when OpenAI degrades.
+        ``record_breaker=False`` keeps the call out of the breaker, which only
+        tracks the main chat model. Client errors (4xx, malformed responses)
+        are re-raised as-is: they are not outages and Ollama would not help.
+        """
+        failover = allow_failover and PerformanceConfig.OLLAMA_FAILOVER_ENABLED
+        if failover and not self.breaker.allow_request():
+            logger.warning("OpenAI circuit is open, routing turn to Ollama")
+            return self._complete_with_ollama(payload, session_id)
+
+        started = time.perf_counter()
+        try:
+            result = backend.chat_sync(
+                payload["messages"],
+                model=payload["model"],
+                json_mode="response_format" in payload,
+                max_tokens=payload.get("max_tokens"),
+                temperature=payload.get("temperature"),
+                route="chat",
+            )
+        except Exception as e:
+            if not self._is_upstream_failure(e):
+                raise
+            if record_breaker:
+                self.breaker.record_failure()
+            if not failover:
+                raise
+            logger.warning(f"OpenAI call failed ({e}), falling back to Ollama")
+            try:
+                return self._complete_with_ollama(payload, session_id)
+            except Exception as fallback_error:
+                logger.error(f"Ollama fallback failed: {fallback_error}")
+                raise e
+        if record_breaker:
+            self.breaker.record_success(time.perf_counter() - started)
+        token_usage.record("chat", result.model, result.usage, session_id)
+        return result.content
+
+    def _complete_cascade(
+        self,
+        payload: Dict,
+        backend: LLMBackend,
+        expected_keywords: Optional[List[str]],
+        session_id: Optional[str] = None,
+    ) -> str:
+        """
+        Try the cheap model first and escalate to the strong model only when
+        its reply has the wrong JSON shape or does not ask for the next field.
+        """
+        if (
+            not PerformanceConfig.CASCADE_ENABLED
+            or self.breaker.state != CLOSED
+            or payload["model"] == PerformanceConfig.OPENAI_CHEAP_MODEL
+        ):
+            return self._complete(payload, backend, session_id=session_id)
+
+        cheap_payload = dict(payload, model=PerformanceConfig.OPENAI_CHEAP_MODEL)
+        started = time.perf_counter()
+        reason = None
+        try:
+            content = self._complete(
+                cheap_payload,
+                backend,
+                allow_failover=False,
+                session_id=session_id,
+                record_breaker=False,
+            )
+            texts = extract_reply_texts(content)
+            if texts is None:
+                reason = "invalid_json_shape"
+            elif expected_keywords and not reply_asks_for(texts, expected_keywords):
+                reason = "missed_next_field"
+        except Exception as e:
+            logger.warning(f"Cheap model call failed, escalating: {e}")
+            self.cascade_stats.record(
+                "cheap", "errors", time.perf_counter() - started, "cheap_error"
+            )
+            content = None
+        else:
+            outcome = "rejected" if reason else "accepted"
+            self.cascade_stats.record(
+                "cheap", outcome, time.perf_counter() - started, reason
+            )
+            if not reason:
+                return content
+            logger.info(f"Cascade escalating to {payload['model']}: {reason}")
+
+        started = time.perf_counter()
+        try:
+            content = self._complete(payload, backend, session_id=session_id)
+        except Exception:
+            self.cascade_stats.record("strong", "errors", time.perf_counter() - started)
+            raise
+        self.cascade_stats.record("strong", "accepted", time.perf_counter() - started)
+        return content
+
     # --------------------
     # Booking flow helpers
     # --------------------
@@ -119,6 +340,111 @@ class OpenAIService:
             ("nationality", "ملیت مسافر"),
         ]
 
+    def _field_keywords(self, language: str) -> Dict[str, List[str]]:
+        """
+        Phrases a question for each field is expected to contain, matched as
+        whole words. Generic words (name, when, passengers) are left out since
+        they show up in replies about other fields.
+        """
+        if language == "en":
+            return {
+                "origin": [
+                    "origin",
+                    "which airport",
+                    "what airport",
+                    "flying from",
+                    "departing from",
+                ],
+                "travel_type": [
+                    "arrival or departure",
+                    "departure or arrival",
+                    "arrival flight",
+                    "departure flight",
+                    "arriving or departing",
+                    "flight type",
+                    "type of flight",
+                ],
+                "travel_date": [
+                    "travel date",
+                    "date of travel",
+                    "flight date",
+                    "what date",
+                    "which date",
+                    "when are you",
+                    "when is your",
+                    "when will you",
+                ],
+                "flight_number": ["flight number", "flight no"],
+                "num_passengers": [
+                    "how many passengers",
+                    "how many people",
+                    "how many travelers",
+                    "number of passengers",
+                    "number of travelers",
+                ],
+                "contact_phone": ["phone", "contact number", "mobile number"],
+                "first_name": ["first name", "given name", "full name"],
+                "last_name": ["last name", "surname", "family name", "full name"],
+                "national_id": ["national id", "national code", "id number"],
+                "passport_number": ["passport"],
+                "luggage_count": [
+                    "luggage",
+                    "baggage",
+                    "bags",
+                    "suitcase",
+                    "suitcases",
+                ],
+                "passenger_type": [
+                    "adult or infant",
+                    "infant or adult",
+                    "an adult or",
+                    "passenger type",
+                    "type of passenger",
+                ],
+                "gender": ["gender", "male or female", "female or male"],
+                "nationality": ["nationality", "citizenship"],
+            }
+        return {
+            "origin": ["فرودگاه مبدأ", "مبدأ", "کدام فرودگاه", "چه فرودگاهی"],
+            "travel_type": [
+                "ورودی یا خروجی",
+                "خروجی یا ورودی",
+                "پرواز ورودی",
+                "پرواز خروجی",
+                "نوع پرواز",
+            ],
+            "travel_date": [
+                "تاریخ سفر",
+                "تاریخ پرواز",
+                "تاریخ حرکت",
+                "چه تاریخی",
+                "چه روزی",
+            ],
+            "flight_number": ["شماره پرواز"],
+            "num_passengers": [
+                "تعداد مسافران",
+                "تعداد مسافر",
+                "تعداد نفرات",
+                "چند نفر",
+                "چند مسافر",
+            ],
+            "contact_phone": ["شماره تماس", "شماره تلفن", "شماره همراه", "موبایل"],
+            "first_name": [
+                "نام کوچک",
+                "اسم کوچک",
+                "نام مسافر",
+                "اسم مسافر",
+                "نام و نام خانوادگی",
+            ],
+            "last_name": ["نام خانوادگی", "فامیلی", "فامیل"],
+            "national_id": ["کد ملی", "کدملی", "شماره ملی"],
+            "passport_number": ["گذرنامه", "پاسپورت"],
+            "luggage_count": ["چمدان", "تعداد بار", "بار همراه"],
+            "passenger_type": ["بزرگسال یا نوزاد", "نوزاد یا بزرگسال", "نوع مسافر"],
+            "gender": ["جنسیت", "آقا یا خانم", "خانم یا آقا", "مرد یا زن", "زن یا مرد"],
+            "nationality": ["ملیت", "تابعیت"],
+        }
+
     def _get_or_init_state(self, session_id: str, language: str) -> Dict:
         state = self.booking_states.get(session_id)
         if not state:
@@ -174,7 +500,27 @@ class OpenAIService:
                 return "origin"
         return None
 
-    def _build_state_guidance(self, language: str, state: Dict) -> str:
+    def _detect_location(self, user_message: str, language: str) -> Optional[str]:
+        """Canonical location named in the message (robust normalization for FA)."""
+        if language == "en":
+            user_message_norm = user_message.lower()
+        else:
+            user_message_norm = normalize_chars(user_message)
+
+        user_message_no_space = user_message_norm.replace(" ", "")
+
+        for location, keywords in LOCATION_KEYWORDS[language].items():
+            for kw in keywords:
+                kw_norm = kw.lower() if language == "en" else normalize_chars(kw)
+                kw_no_space = kw_norm.replace(" ", "")
+                if kw_norm in user_message_norm or kw_no_space in user_message_no_space:
+                    return location
+        return None
+
+    def _next_required_field(
+        self, language: str, state: Dict
+    ) -> Tuple[Optional[str], Optional[Tuple[int, str]]]:
+        """Return (next base field key, (passenger number, passenger field key))."""
         ordered = self._ordered_fields(language)
         completed = state.get("completed", set())
         # Compute next required field
@@ -212,6 +558,22 @@ class OpenAIService:
                     state["completed"].add("passenger_info")
             else:
                 next_key = "num_passengers"
+        return next_key, next_passenger_prompt
+
+    def _booking_active(self, state: Dict) -> bool:
+        """A booking has started and is not finished yet."""
+        completed = state.get("completed", set())
+        return bool(completed) and "passenger_info" not in completed
+
+    def _build_state_guidance(self, language: str, state: Dict) -> str:
+        ordered = self._ordered_fields(language)
+        completed = state.get("completed", set())
+        passenger_fields = self._passenger_fields(language)
+        next_key, next_passenger_prompt = self._next_required_field(language, state)
+        questions = FIELD_QUESTIONS["en" if language == "en" else "fa"]
+        # Fixed wording keeps questions identical across turns (and TTS-cacheable)
+        next_field = next_passenger_prompt[1] if next_passenger_prompt else next_key
+        suggested = questions.get(next_field) if next_field else None
 
         # Checklist text
         def label_for(key: str) -> str:
@@ -255,6 +617,8 @@ class OpenAIService:
                     if next_key
                     else "All base fields collected."
                 )
+            if suggested:
+                next_line += f'\nSuggested wording: "{suggested}"'
             header = "# STATE ENFORCEMENT (Do not violate)"
             rules = (
                 "- Ask strictly ONE question at a time\n"
@@ -274,6 +638,8 @@ class OpenAIService:
                 if next_key
                 else "همه موارد پایه تکمیل شده‌اند."
             )
+        if suggested:
+            next_line += f'\nعبارت پیشنهادی: "{suggested}"'
         header = "# اجرای وضعیت (لطفاً نقض نکن)"
         rules = (
             "- در هر نوبت فقط یک سوال بپرس\n"
@@ -283,174 +649,64 @@ class OpenAIService:
         )
         return f"{header}\n{rules}\n\nچک‌لیست:\n{checklist_text}\n\n{next_line}"
 
-    def get_assistant_response(
-        self, user_message: str, session_id: Optional[str] = None, language: str = "fa"
-    ):
-        if session_id is None:
-            session_id = str(uuid.uuid4())
-            logger.info(f"Generated new session_id: {session_id}")
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
-        # Load knowledge base based on language with caching
-        knowledge_base_file = (
-            "api/constants/knowledge_base_en.txt"
-            if language == "en"
-            else "api/constants/knowledge_base.txt"
-        )
-
-        cache_key = f"knowledge_base_{language}"
-        knowledge_base = cache_manager.get(cache_key)
-
-        if knowledge_base is None:
-            try:
-                with open(knowledge_base_file, "r", encoding="utf-8") as f:
-                    knowledge_base = f.read()
-                    cache_manager.set(
-                        cache_key,
-                        knowledge_base,
-                        PerformanceConfig.KNOWLEDGE_BASE_CACHE_TTL,
-                    )
-            except FileNotFoundError:
-                logger.error(f"Knowledge base file not found: {knowledge_base_file}")
-                knowledge_base = ""
-                cache_manager.set(
-                    cache_key,
-                    knowledge_base,
-                    PerformanceConfig.KNOWLEDGE_BASE_CACHE_TTL,
-                )
-
-        # Define location keywords for detection
-        location_keywords = {
-            "en": {
-                "call center": ["call center", "contact center", "help desk"],
-                "prayer room": ["prayer room", "chapel", "mosque"],
-                "restroom": ["restroom", "bathroom", "toilet", "washroom"],
-                "shop": ["shop", "store", "retail", "gift shop"],
-                "smoking room": ["smoking room", "smoking area", "smoking lounge"],
-                "transit lounge": ["transit lounge", "lounge", "waiting area"],
-            },
-            "fa": {
-                "کال سنتر": ["کال سنتر", "مرکز تماس", "پشتیبانی"],
-                "نمازخانه": ["نمازخانه", "محل عبادت"],
-                "سرویس بهداشتی": ["سرویس بهداشتی", "دستشویی", "توالت"],
-                "فروشگاه": ["فروشگاه", "مغازه"],
-                "اتاق سیگار": ["اتاق سیگار", "محل سیگار", "اتاق کشیدن سیگار"],
-                "سالن ترانزیت": ["سالن ترانزیت", "سالن انتظار", "لانج ترانزیت"],
-            },
-        }
-
-        # Detect location in user message (robust normalization for FA)
-        def normalize_chars(text: str) -> str:
-            # Normalize Arabic/Persian variants and whitespace
-            replacements = {
-                "ي": "ی",
-                "ك": "ک",
-                "ۀ": "ه",
-                "ة": "ه",
-                "ؤ": "و",
-                "إ": "ا",
-                "أ": "ا",
-                "آ": "ا",
-                "‌": "",  # ZWNJ
-                "‏": "",  # RTL mark
-                "\u200c": "",  # explicit ZWNJ
-            }
-            for src, dst in replacements.items():
-                text = text.replace(src, dst)
-            # Collapse multiple spaces
-            return " ".join(text.strip().split())
-
-        if language == "en":
-            user_message_norm = user_message.lower()
-        else:
-            user_message_norm = normalize_chars(user_message)
-
-        user_message_no_space = user_message_norm.replace(" ", "")
-
-        selected_location = None
-        for location, keywords in location_keywords[language].items():
-            for kw in keywords:
-                kw_norm = kw.lower() if language == "en" else normalize_chars(kw)
-                kw_no_space = kw_norm.replace(" ", "")
-                if kw_norm in user_message_norm or kw_no_space in user_message_no_space:
-                    selected_location = location
-                    break
-            if selected_location:
-                break
-
-        # Update booking state and build dynamic guidance
-        state = self._get_or_init_state(session_id, language)
-        detected = self._detect_completed_field(user_message, language)
-        if detected:
-            if detected == "num_passengers":
-                m = re.search(r"(\d{1,2})\s*(passenger|people|نفر)", user_message, re.I)
-                if m:
-                    try:
-                        count = int(m.group(1))
-                        state["num_passengers"] = count
-                        state["completed"].add("num_passengers")
-                    except Exception:
-                        pass
-            else:
-                state["completed"].add(detected)
-        state_guidance = self._build_state_guidance(language, state)
-
-        # Create intelligent system prompt that lets AI handle everything
+    def _prompt_sections(
+        self,
+        language: str,
+        state_guidance: str,
+        knowledge_base: str,
+        selected_location: Optional[str],
+    ) -> Dict[str, str]:
+        """
+        System prompt sections; prompt profiles pick which ones are sent.
+        Sections in RULE_SECTIONS are bullets under "# Important Rules:" so
+        the full profile assembles to the original single prompt.
+        """
+        phrases = phrases_for("en" if language == "en" else "fa")
         if language == "en":
-            system_prompt = f"""
-You are an AI assistant named "Binad" who provides airport services at Imam Khomeini and Mashhad airports.
+            location = selected_location if selected_location else "requested location"
+            return {
+                "identity": """You are an AI assistant named "Binad" who provides airport services at Imam Khomeini and Mashhad airports.
 
 # Your Intelligence:
-You are INTELLIGENT and can handle complex conversations on your own. You don't need step-by-step instructions - you understand the logic and can make decisions.
-
-# Core Responsibilities:
+You are INTELLIGENT and can handle complex conversations on your own. You don't need step-by-step instructions - you understand the logic and can make decisions.""",
+                "responsibilities": """# Core Responsibilities:
 - Handle flight ticket bookings with multiple passengers
 - Collect and validate all required information
 - Manage conversation flow intelligently
 - Provide helpful error messages and guidance
 - Generate QR codes for final confirmation
 - Ask for and validate a contact phone number for the booking
-- Ask for and validate passenger nationality
-
-# Required Fields (Collect ALL before finalizing):
+- Ask for and validate passenger nationality""",
+                "required_fields": """# Required Fields (Collect ALL before finalizing):
 Collect these 13 fields, in order, and confirm each:
-1) origin airport, 2) travel type (arrival/departure), 3) travel date in Gregorian (YYYY-MM-DD), 4) flight number, 5) passenger first name, 6) passenger last name, 7) national ID, 8) passport number, 9) passenger type (adult/infant), 10) passenger gender, 11) passenger nationality, 12) luggage count per passenger, 13) contact phone number, and also 14) additional info (optional). For multiple passengers, repeat per-passenger fields for each passenger.
-
-# How You Work:
+1) origin airport, 2) travel type (arrival/departure), 3) travel date in Gregorian (YYYY-MM-DD), 4) flight number, 5) passenger first name, 6) passenger last name, 7) national ID, 8) passport number, 9) passenger type (adult/infant), 10) passenger gender, 11) passenger nationality, 12) luggage count per passenger, 13) contact phone number, and also 14) additional info (optional). For multiple passengers, repeat per-passenger fields for each passenger.""",
+                "how_you_work": """# How You Work:
 1. **Understand the context** from the knowledge base
 2. **Make intelligent decisions** about what to ask next
 3. **Validate responses** yourself using common sense
 4. **Handle multiple passengers** by tracking conversation state
 5. **Provide helpful feedback** for invalid inputs
-6. **Progress naturally** through the conversation
-
-# Anti-Repetition & State Rules (CRITICAL):
+6. **Progress naturally** through the conversation""",
+                "anti_repetition": """# Anti-Repetition & State Rules (CRITICAL):
 - Maintain a clear checklist of collected fields in memory; NEVER ask for a field again once validly collected.
 - NEVER restart the flow or reset previously collected fields unless the user explicitly asks to change something.
-- For invalid answers: give at most 2 attempts. If still invalid, say: "No problem, you can correct it in the final form" and proceed to the next field.
-
-# Validation Rules:
+- For invalid answers: give at most 2 attempts. If still invalid, say: "No problem, you can correct it in the final form" and proceed to the next field.""",
+                "validation": """# Validation Rules:
 - Travel date must be Gregorian in format YYYY-MM-DD (e.g., 2025-10-01)
 - Normalize flight number to uppercase without spaces/hyphens
-- Accept spaces in numeric IDs and phone numbers; do not force re-entry due to spaces
-
-# Response Format:
+- Accept spaces in numeric IDs and phone numbers; do not force re-entry due to spaces""",
+                "response_format": """# Response Format:
 Always respond with a JSON array of messages. If your reply has multiple sentences with different tones, split them into separate message objects and set an appropriate facialExpression for each sentence (use default only when neutral):
-{{
+{
   "messages": [
-    {{
+    {
       "text": "Your message here",
       "facialExpression": "smile|sad|angry|surprised|funnyFace|default",
       "animation": "Talking_0|Talking_1|Talking_2|Crying|Laughing|Rumba|Idle|Terrified|Angry"
-    }}
+    }
   ]
-}}
-
-# Important Rules:
+}""",
+                "important_rules": """# Important Rules:
 - You are INTELLIGENT - handle everything yourself
 - Validate responses before accepting them
 - Track conversation state in your memory
@@ -458,86 +714,73 @@ Always respond with a JSON array of messages. If your reply has multiple sentenc
 - Provide clear error messages
 - Be conversational and helpful
 - Maximum 3 sentences per response
-- Choose facialExpression contextually: e.g., smile for greetings/thanks/good news, sad for apologies/errors, angry only for severe policy violations, surprised for unexpected events, funnyFace for light humor; use default when neutral. If multiple sentences differ in tone, split into multiple messages and set expressions per sentence.
-- Always collect a valid contact phone number before finalizing the booking, and prefer asking for it early (after base info or when starting passenger details). If not provided yet, explicitly ask before final summary.
+- Choose facialExpression contextually: e.g., smile for greetings/thanks/good news, sad for apologies/errors, angry only for severe policy violations, surprised for unexpected events, funnyFace for light humor; use default when neutral. If multiple sentences differ in tone, split into multiple messages and set expressions per sentence.""",
+                "booking_rules": f"""- Always collect a valid contact phone number before finalizing the booking, and prefer asking for it early (after base info or when starting passenger details). If not provided yet, explicitly ask before final summary.
 - Ignore spaces in national ID, phone numbers, and passport numbers - they are acceptable
 - Do not ask users to re-enter numbers if they contain spaces
 - NEVER ask the same question more than 2 times
-- If answer is incorrect after 2 attempts, say "No problem, you can correct it in the final form"
-- ALWAYS end conversations by asking: "If you have any additional information, please provide it"
+- If answer is incorrect after 2 attempts, say "{phrases['correct_later']}"
+- ALWAYS end conversations by asking: "{phrases['additional_info']}"
 - Record any additional information provided by the user
-- ALWAYS inform users: "A QR code will be displayed to you, and by scanning it you can edit your information and proceed to the next steps"
-- If user asks about the location of the call center, prayer room, restroom, shop, smoking room, or transit lounge: Show QR code and say "To access the {selected_location if selected_location else 'requested location'}, scan the QR code and after installing the app as a guest or by registering, log in, then scan the QR code again and reach your destination according to the specified route"
-
-# Finalization Behavior:
+- ALWAYS inform users: "{phrases['qr_displayed']}\"""",
+                "location_rule": f"""- If user asks about the location of the call center, prayer room, restroom, shop, smoking room, or transit lounge: Show QR code and say "To access the {location}, scan the QR code and after installing the app as a guest or by registering, log in, then scan the QR code again and reach your destination according to the specified route\"""",
+                "finalization": f"""# Finalization Behavior:
 When and only when all required fields are collected and confirmed, your last message before showing the QR code must tell the user that all information has been saved successfully and that they can view and confirm via QR code.
-Also clearly inform: "You can edit any of your entered information by scanning the QR code."
-
-# Travel Guide Mode (General Questions):
+Also clearly inform: "{phrases['edit_via_qr']}\"""",
+                "travel_guide": """# Travel Guide Mode (General Questions):
 If the user asks about city/country attractions, culture, itineraries, food, transport, or best times to visit, switch to Travel Guide Mode:
 - Provide long, detailed, structured answers (headings, bullet points, suggested itineraries, logistics, costs if relevant)
 - Keep a friendly, lightly humorous tone; avoid ultra-short replies
 - Include safety tips, local etiquette, and accessibility notes when relevant
 - Offer 1–3 alternative options per recommendation and practical next steps
-- Answer in the user’s current language
-
-# Booking Flow State:
-{state_guidance}
-
-# Knowledge Base:
-{knowledge_base}
-            """
-        else:
-            system_prompt = f"""
-تو یک دستیار هوش مصنوعی به نام نکسا هستی که خدمات فرودگاهی در فرودگاه امام خمینی و مشهد را ارائه می‌دهی.
+- Answer in the user’s current language""",
+                "state": f"# Booking Flow State:\n{state_guidance}",
+                "knowledge_base": f"# Knowledge Base:\n{knowledge_base}",
+            }
+        location = selected_location if selected_location else "مکان مورد نظر"
+        return {
+            "identity": """تو یک دستیار هوش مصنوعی به نام نکسا هستی که خدمات فرودگاهی در فرودگاه امام خمینی و مشهد را ارائه می‌دهی.
 
 # هوش تو:
-تو **هوشمند** هستی و می‌توانی مکالمات پیچیده را خودت هندل کنی. نیازی به دستورالعمل‌های مرحله‌به‌مرحله نیست - تو منطق را درک می‌کنی و می‌توانی تصمیم‌گیری کنی.
-
-# مسئولیت‌های اصلی:
+تو **هوشمند** هستی و می‌توانی مکالمات پیچیده را خودت هندل کنی. نیازی به دستورالعمل‌های مرحله‌به‌مرحله نیست - تو منطق را درک می‌کنی و می‌توانی تصمیم‌گیری کنی.""",
+            "responsibilities": """# مسئولیت‌های اصلی:
 - هندل کردن رزرو بلیط هواپیما با مسافران متعدد
 - جمع‌آوری و اعتبارسنجی همه اطلاعات مورد نیاز
 - مدیریت هوشمند جریان مکالمه
 - ارائه پیام‌های خطای مفید و راهنمایی
 - تولید کیو آر کد برای تأیید نهایی
 - شماره تماس مسافر را بپرس و آن را اعتبارسنجی کن
-- ملیت مسافر را بپرس و آن را اعتبارسنجی کن
-
-# اقلام الزامی (همه را تا قبل از پایان بپرس):
+- ملیت مسافر را بپرس و آن را اعتبارسنجی کن""",
+            "required_fields": """# اقلام الزامی (همه را تا قبل از پایان بپرس):
 این ۱۳ مورد را به ترتیب جمع‌آوری و تأیید کن:
-1) فرودگاه مبدأ، 2) نوع پرواز (خروجی/ورودی)، 3) تاریخ سفر به میلادی با فرمت YYYY-MM-DD، 4) شماره پرواز، 5) نام، 6) نام خانوادگی، 7) کد ملی، 8) شماره گذرنامه، 9) نوع مسافر (بزرگسال/نوزاد)، 10) جنسیت مسافر، 11) ملیت، 12) تعداد چمدان هر مسافر، 13) شماره تماس. همچنین 14) توضیحات اضافه (اختیاری). برای مسافران متعدد موارد مربوط به هر مسافر را تکرار کن.
-
-# چطور کار می‌کنی:
+1) فرودگاه مبدأ، 2) نوع پرواز (خروجی/ورودی)، 3) تاریخ سفر به میلادی با فرمت YYYY-MM-DD، 4) شماره پرواز، 5) نام، 6) نام خانوادگی، 7) کد ملی، 8) شماره گذرنامه، 9) نوع مسافر (بزرگسال/نوزاد)، 10) جنسیت مسافر، 11) ملیت، 12) تعداد چمدان هر مسافر، 13) شماره تماس. همچنین 14) توضیحات اضافه (اختیاری). برای مسافران متعدد موارد مربوط به هر مسافر را تکرار کن.""",
+            "how_you_work": """# چطور کار می‌کنی:
 1. **درک زمینه** از دانش‌نامه
 2. **تصمیم‌گیری هوشمند** درباره اینکه چه سوالی بپرسی
 3. **اعتبارسنجی پاسخ‌ها** خودت با استفاده از عقل سلیم
 4. **هندل کردن مسافران متعدد** با پیگیری وضعیت مکالمه
 5. **ارائه بازخورد مفید** برای ورودی‌های نامعتبر
-6. **پیشرفت طبیعی** در مکالمه
-
-# قوانین ضد تکرار و حفظ وضعیت (خیلی مهم):
+6. **پیشرفت طبیعی** در مکالمه""",
+            "anti_repetition": """# قوانین ضد تکرار و حفظ وضعیت (خیلی مهم):
 - یک چک‌لیست واضح از اقلام جمع‌آوری‌شده در حافظه نگه دار؛ پس از ثبت معتبر هر مورد، به هیچ وجه دوباره همان مورد را نپرس.
 - هرگز جریان را از اول شروع نکن و اقلام ثبت‌شده را ریست نکن مگر کاربر صراحتاً بخواهد تغییری بدهد.
-- برای پاسخ‌های نامعتبر حداکثر ۲ تلاش بده؛ اگر بعد از دو تلاش هنوز نامعتبر بود، بگو: «اشکال ندارد، می‌توانی آن را در فرم نهایی اصلاح کنی» و به مورد بعدی برو.
-
-# قوانین اعتبارسنجی:
+- برای پاسخ‌های نامعتبر حداکثر ۲ تلاش بده؛ اگر بعد از دو تلاش هنوز نامعتبر بود، بگو: «اشکال ندارد، می‌توانی آن را در فرم نهایی اصلاح کنی» و به مورد بعدی برو.""",
+            "validation": """# قوانین اعتبارسنجی:
 - تاریخ سفر حتماً به میلادی و با فرمت YYYY-MM-DD باشد (مثل 2025-10-01)
 - شماره پرواز را به حروف بزرگ و بدون فاصله/خط تیره نرمال کن
-- وجود فاصله در اعداد (کد ملی/تلفن/گذرنامه) اشکالی ندارد و مجبور به ورود مجدد نکن
-
-# فرمت پاسخ:
+- وجود فاصله در اعداد (کد ملی/تلفن/گذرنامه) اشکالی ندارد و مجبور به ورود مجدد نکن""",
+            "response_format": """# فرمت پاسخ:
 همیشه با آرایه JSON پیام‌ها پاسخ بده. اگر پاسخ چند جمله با لحن‌های متفاوت دارد، آن را به چند پیام جدا تقسیم کن و برای هر جمله "facialExpression" متناسب تنظیم کن (فقط وقتی خنثی است از default استفاده کن):
-{{
+{
   "messages": [
-    {{
+    {
       "text": "پیام تو اینجا",
       "facialExpression": "smile|sad|angry|surprised|funnyFace|default",
       "animation": "StandingIdle | StandingGreeting | ThumbsUp | Pointing | Talking | Clapping | ThoughtfulHead | Bow | Laughing | Thankful | Thinking"
-    }}
+    }
   ]
-}}
-
-# قوانین مهم:
+}""",
+            "important_rules": """# قوانین مهم:
 - تو **هوشمند** هستی - همه چیز را خودت هندل کن
 - پاسخ‌ها را قبل از پذیرش اعتبارسنجی کن
 - وضعیت مکالمه را در حافظه‌ات پیگیری کن
@@ -545,66 +788,202 @@ If the user asks about city/country attractions, culture, itineraries, food, tra
 - پیام‌های خطای واضح ارائه بده
 - محاوره‌ای و مفید باش
 - حداکثر ۳ جمله در هر پاسخ
-- «facialExpression» را متناسب با لحن هر جمله انتخاب کن: لبخند برای خوش‌آمد/قدردانی/خبر خوب، ناراحت برای عذرخواهی/خطا، عصبانی فقط برای نقض شدید قوانین، متعجب برای موارد غیرمنتظره، و «funnyFace» برای شوخی سبک؛ در حالت خنثی «default». اگر چند جمله با لحن متفاوت داری، آن‌ها را به چند پیام جدا تقسیم کن و برای هر پیام «facialExpression» مناسب بگذار.
-- قبل از نهایی‌سازی رزرو، حتماً شماره تماس معتبر دریافت کن و ترجیحاً زودهنگام (بعد از اطلاعات پایه یا ابتدای ورود به اطلاعات مسافر) بپرس. اگر هنوز دریافت نشده، قبل از نمایش خلاصه نهایی به‌طور صریح سؤال کن.
+- «facialExpression» را متناسب با لحن هر جمله انتخاب کن: لبخند برای خوش‌آمد/قدردانی/خبر خوب، ناراحت برای عذرخواهی/خطا، عصبانی فقط برای نقض شدید قوانین، متعجب برای موارد غیرمنتظره، و «funnyFace» برای شوخی سبک؛ در حالت خنثی «default». اگر چند جمله با لحن متفاوت داری، آن‌ها را به چند پیام جدا تقسیم کن و برای هر پیام «facialExpression» مناسب بگذار.""",
+            "booking_rules": f"""- قبل از نهایی‌سازی رزرو، حتماً شماره تماس معتبر دریافت کن و ترجیحاً زودهنگام (بعد از اطلاعات پایه یا ابتدای ورود به اطلاعات مسافر) بپرس. اگر هنوز دریافت نشده، قبل از نمایش خلاصه نهایی به‌طور صریح سؤال کن.
 - فاصله در کد ملی، شماره تلفن و شماره گذرنامه قابل قبول است - از آن چشم‌پوشی کن
 - اگر شماره‌ها فاصله دارند، از کاربر نخواه دوباره وارد کند
 - هیچ سوالی را بیش از دوبار نپرس
-- اگر پاسخ بعد از ۲ بار نادرست بود، بگو "اشکال ندارد، می‌توانی آن را در فرم نهایی اصلاح کنی"
-- همیشه پایان گفتگو را با این سوال تمام کن: "اگر توضیح اضافه‌ای دارید بفرمایید"
+- اگر پاسخ بعد از ۲ بار نادرست بود، بگو "{phrases['correct_later']}"
+- همیشه پایان گفتگو را با این سوال تمام کن: "{phrases['additional_info']}"
 - هر توضیح اضافی که کاربر ارائه داد را ثبت کن
-- همیشه به کاربر بگو: "کیو آر کد به شما نمایش داده می‌شود و با اسکن آن می‌توانید اطلاعات خود را ویرایش کنید و به مراحل بعدی بروید"
-- اگر کاربر از مکان کال سنتر، نمازخانه، سرویس بهداشتی، فروشگاه، اتاق سیگار یا سالن ترانزیت پرسید: کیو آر کد نشان بده و بگو "برای دسترسی به {selected_location if selected_location else 'مکان مورد نظر'}، کیو آر کد را اسکن کرده و پس از نصب برنامه بصورت میهمان یا با ثبت نام، ورود کنید، سپس مجدد کیو آر کد را اسکن کرده و باتوجه به مسیر مشخص شده به مقصد برسید"
-
-# رفتار نهایی:
+- همیشه به کاربر بگو: "{phrases['qr_displayed']}\"""",
+            "location_rule": f"""- اگر کاربر از مکان کال سنتر، نمازخانه، سرویس بهداشتی، فروشگاه، اتاق سیگار یا سالن ترانزیت پرسید: کیو آر کد نشان بده و بگو "برای دسترسی به {location}، کیو آر کد را اسکن کرده و پس از نصب برنامه بصورت میهمان یا با ثبت نام، ورود کنید، سپس مجدد کیو آر کد را اسکن کرده و باتوجه به مسیر مشخص شده به مقصد برسید\"""",
+            "finalization": f"""# رفتار نهایی:
 وقتی و فقط وقتی همه اقلام الزامی جمع‌آوری و تأیید شد، در آخرین پیام قبل از نمایش کیو آر کد، حتماً این جمله را دقیقاً بگو:
-"عالی! همه اطلاعات شما با موفقیت ثبت شد. حالا می‌توانید از طریق کیو آر کد اطلاعات را مشاهده و تأیید کنید."
-همچنین به‌طور واضح بگو: «می‌توانید با اسکن کیوآرکد هرکدام از اطلاعات واردشده را اصلاح کنید.»
-
-# حالت راهنمای سفر (سوالات عمومی):
+"{phrases['booking_success']}"
+همچنین به‌طور واضح بگو: «{phrases['edit_via_qr']}»""",
+            "travel_guide": """# حالت راهنمای سفر (سوالات عمومی):
 اگر کاربر درباره جاهای دیدنی شهر/کشور، فرهنگ، برنامه سفر، غذا، حمل‌ونقل یا بهترین زمان سفر سؤال کرد، به حالت راهنمای سفر برو:
 - پاسخ‌های طولانی، مفصل و ساختارمند بده (سرفصل‌ها، بولت‌ها، برنامه‌های پیشنهادی، لاجستیک، اگر لازم بود حدود هزینه)
 - لحن دوستانه همراه با چاشنی شوخ‌طبعی؛ از پاسخ‌های خیلی کوتاه پرهیز کن
 - در صورت لزوم نکات ایمنی، آداب محلی و دسترسی‌پذیری را ذکر کن
 - برای هر پیشنهاد ۱ تا ۳ گزینه جایگزین و قدم‌های بعدی عملی ارائه بده
-- به زبان فعلی کاربر پاسخ بده
-
-# وضعیت جریان رزرو:
-{state_guidance}
-
-# دانش‌نامه:
-{knowledge_base}
-            """
-
-        # Build messages array
-        messages = [{"role": "system", "content": system_prompt}]
-        messages += self.memory.get_conversation_history(session_id)
-        messages.append({"role": "user", "content": user_message})
-
-        openai_config = PerformanceConfig.get_openai_config()
-        payload = {
-            "model": "gpt-4o",
-            "max_tokens": openai_config["max_tokens"],
-            "temperature": openai_config["temperature"],
-            "response_format": {"type": "json_object"},
-            "messages": messages,
+- به زبان فعلی کاربر پاسخ بده""",
+            "state": f"# وضعیت جریان رزرو:\n{state_guidance}",
+            "knowledge_base": f"# دانش‌نامه:\n{knowledge_base}",
         }
 
-        try:
-            logger.info(f"Sending request to OpenAI: {user_message[:50]}...")
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=openai_config["timeout"],
+    def _assemble_prompt(self, sections: Dict[str, str], names: List[str]) -> str:
+        """Join the chosen sections with the spacing of the original prompt."""
+        parts: List[str] = []
+        for name in names:
+            text = sections.get(name)
+            if not text:
+                continue
+            if name in RULE_SECTIONS and parts:
+                parts[-1] += "\n" + text
+            else:
+                parts.append(text)
+        return "\n" + "\n\n".join(parts) + "\n            "
+
+    def get_assistant_response(
+        self,
+        user_message: str,
+        session_id: Optional[str] = None,
+        language: str = "fa",
+        backend: Optional[str] = None,
+    ):
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+            logger.info(f"Generated new session_id: {session_id}")
+
+        llm = backend_for("chat", backend)
+
+        # Load knowledge base based on language with caching
+        knowledge_base_file = (
+            "api/constants/knowledge_base_en.txt"
+            if language == "en"
+            else "api/constants/knowledge_base.txt"
+        )
+
+        with phase("kb"):
+            cache_key = f"knowledge_base_{language}"
+            knowledge_base = cache_manager.get(cache_key)
+
+            if knowledge_base is None:
+                try:
+                    with open(knowledge_base_file, "r", encoding="utf-8") as f:
+                        knowledge_base = f.read()
+                        cache_manager.set(
+                            cache_key,
+                            knowledge_base,
+                            PerformanceConfig.KNOWLEDGE_BASE_CACHE_TTL,
+                        )
+                except FileNotFoundError:
+                    logger.error(
+                        f"Knowledge base file not found: {knowledge_base_file}"
+                    )
+                    knowledge_base = ""
+                    cache_manager.set(
+                        cache_key,
+                        knowledge_base,
+                        PerformanceConfig.KNOWLEDGE_BASE_CACHE_TTL,
+                    )
+
+        with phase("state"):
+            selected_location = self._detect_location(user_message, language)
+
+            # Update booking state and build dynamic guidance
+            state = self._get_or_init_state(session_id, language)
+            detected = self._detect_completed_field(user_message, language)
+            if detected:
+                if detected == "num_passengers":
+                    m = re.search(
+                        r"(\d{1,2})\s*(passenger|people|نفر)", user_message, re.I
+                    )
+                    if m:
+                        try:
+                            count = int(m.group(1))
+                            state["num_passengers"] = count
+                            state["completed"].add("num_passengers")
+                        except Exception:
+                            pass
+                else:
+                    state["completed"].add(detected)
+            state_guidance = self._build_state_guidance(language, state)
+
+        with phase("prompt"):
+            # Route the turn to a prompt profile and build only the sections it needs
+            decision = intent_router.route(
+                user_message,
+                language,
+                session_id=session_id,
+                booking_active=self._booking_active(state),
+                detected_field=detected,
+                selected_location=selected_location,
+            )
+            profile = decision["profile"]
+            sections = self._prompt_sections(
+                language, state_guidance, knowledge_base, selected_location
+            )
+            # Only booking turns are expected to ask for the next checklist field
+            expected_keywords = None
+            if profile["expects_next_field"]:
+                next_key, next_passenger = self._next_required_field(language, state)
+                expected_field = next_passenger[1] if next_passenger else next_key
+                expected_keywords = self._field_keywords(language).get(expected_field)
+
+            system_prompt = self._assemble_prompt(
+                sections, profile_sections(profile, self._booking_active(state))
             )
-            response.raise_for_status()
 
-            content = response.json()["choices"][0]["message"]["content"]
-            logger.info(f"OpenAI response received: {content[:100]}...")
+            # Build messages array
+            messages = [{"role": "system", "content": system_prompt}]
+            history = self.memory.get_conversation_history(session_id)
+            over_budget = token_usage.over_budget(session_id)
+            budget_actions = PerformanceConfig.SESSION_BUDGET_ACTIONS
+            if over_budget and "trim_context" in budget_actions:
+                # Only the latest turns; the state checklist keeps the booking on track
+                history = history[-PerformanceConfig.SESSION_BUDGET_HISTORY_MESSAGES :]
+            messages += history
+            messages.append({"role": "user", "content": user_message})
+
+            # OPENAI_* model names only apply to OpenAI; other backends use their own
+            openai_backend = is_openai_backend(llm)
+            payload = {
+                "model": (
+                    PerformanceConfig.OPENAI_CHAT_MODEL
+                    if openai_backend
+                    else llm.default_model
+                ),
+                "max_tokens": profile["max_tokens"],
+                "temperature": profile["temperature"],
+                "response_format": {"type": "json_object"},
+                "messages": messages,
+            }
+            if over_budget and "cheap_model" in budget_actions:
+                # Shorter reply everywhere; only OpenAI also switches to the cheap
+                # model (the cascade then skips escalation)
+                if openai_backend:
+                    payload["model"] = PerformanceConfig.OPENAI_CHEAP_MODEL
+                payload["max_tokens"] = min(
+                    payload["max_tokens"], PerformanceConfig.SESSION_BUDGET_MAX_TOKENS
+                )
+            if over_budget:
+                logger.info(
+                    f"Session {session_id} is over its token budget: {sorted(budget_actions)}"
+                )
+
+        try:
+            logger.info(
+                "Sending request to OpenAI",
+                extra={"payload": user_message, "verbose": True},
+            )
+            with phase("upstream"):
+                if openai_backend:
+                    # Cascade, circuit breaker and Ollama failover guard the OpenAI path
+                    content = self._complete_cascade(
+                        payload, llm, expected_keywords, session_id
+                    )
+                else:
+                    result = llm.chat_sync(
+                        messages,
+                        model=payload["model"],
+                        json_mode=True,
+                        max_tokens=payload["max_tokens"],
+                        temperature=payload["temperature"],
+                        route="chat",
+                    )
+                    token_usage.record("chat", result.model, result.usage, session_id)
+                    content = result.content
+            logger.info(
+                "OpenAI response received",
+                extra={"payload": content, "verbose": True},
+            )
 
             try:
-                response_data = json.loads(content)
+                with phase("parse"):
+                    response_data = json.loads(content)
                 logger.info(f"Parsed response data: {type(response_data)}")
 
                 # Add messages to memory
@@ -663,13 +1042,11 @@ If the user asks about city/country attractions, culture, itineraries, food, tra
 
             except json.JSONDecodeError as e:
                 logger.error(f"JSON decode error: {e}")
-                logger.warning(f"Raw response content: {content[:200]}...")
+                logger.warning("Raw response content", extra={"payload": content})
                 self.memory.add_message(session_id, "assistant", content)
-                error_message = (
-                    "Unfortunately, there was a problem processing the response. Please try again."
-                    if language == "en"
-                    else "متأسفانه مشکلی در پردازش پاسخ پیش آمد. لطفاً دوباره تلاش کنید."
-                )
+                error_message = ERROR_MESSAGES["parse_error"][
+                    "en" if language == "en" else "fa"
+                ]
                 return [
                     {
                         "text": error_message,
@@ -682,11 +1059,9 @@ If the user asks about city/country attractions, culture, itineraries, food, tra
             except Exception as e:
                 logger.error(f"Error processing response: {e}")
                 self.memory.add_message(session_id, "assistant", str(e))
-                error_message = (
-                    "An error occurred while processing the response. Please try again."
-                    if language == "en"
-                    else "خطایی در پردازش پاسخ رخ داد. لطفاً دوباره تلاش کنید."
-                )
+                error_message = ERROR_MESSAGES["processing_error"][
+                    "en" if language == "en" else "fa"
+                ]
                 return [
                     {
                         "text": error_message,
@@ -0,0 +1,133 @@
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger("api.timing")
+
+_current: contextvars.ContextVar[Optional["PhaseTimer"]] = contextvars.ContextVar(
+    "request_phase_timer", default=None
+)
+
+
+class PhaseTimer:
+    """
+    Wall time per named phase of one request. Repeated phases accumulate,
+    so a retried upstream call shows up as a single ``upstream`` entry.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def phases_ms(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """``Server-Timing`` header value, phases in the order they first ran."""
+        entries = [f"{name};dur={ms}" for name, ms in self.phases_ms().items()]
+        total = self.elapsed() if total is None else total
+        entries.append(f"total;dur={round(total * 1000, 2)}")
+        return ", ".join(entries)
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block against the current request; a no-op outside one."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: starts a ``PhaseTimer`` per HTTP request, adds the
+    phases as a ``Server-Timing`` header when the response starts and logs
+    one structured record (``extra={"timing": ...}``) after the last body
+    chunk, so streamed responses report both first byte and total time.
+
+    The timer lives in a contextvar; ``asyncio.to_thread`` and the threadpool
+    used for sync endpoints copy the context, so services can call ``phase``
+    from any of them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = PhaseTimer()
+        token = _current.set(timer)
+        status = {"code": 500, "first_byte": None, "logged": False}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["first_byte"] = timer.elapsed()
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (
+                        b"server-timing",
+                        timer.server_timing(status["first_byte"]).encode("latin-1"),
+                    )
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                self._log(scope, timer, status)
+                status["logged"] = True
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except BaseException:
+            if not status["logged"]:
+                self._log(scope, timer, status)
+            raise
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def _log(scope, timer: PhaseTimer, status: Dict) -> None:
+        total = timer.elapsed()
+        first_byte = status["first_byte"]
+        record = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status["code"],
+            "first_byte_ms": round(first_byte * 1000, 2) if first_byte else None,
+            "total_ms": round(total * 1000, 2),
+            "phases_ms": timer.phases_ms(),
+        }
+        breakdown = " ".join(f"{k}={v}" for k, v in record["phases_ms"].items())
+        logger.info(
+            f"{record['method']} {record['path']} {record['status']} "
+            f"{record['total_ms']}ms {breakdown}".rstrip(),
+            extra={"timing": record},
+        )
@@ -0,0 +1,53 @@
+"""
+Text normalization helpers shared by the chat and TTS services
+"""
+
+import re
+from typing import List
+
+# A sentence ends at . ! ? ؟ (or a line break) followed by whitespace, so
+# decimals like 2.5 and times like 10.30 stay intact
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?؟…])\s+|\n+")
+
+
+def normalize_chars(text: str) -> str:
+    """Normalize Arabic/Persian letter variants, ZWNJ/RTL marks and whitespace."""
+    replacements = {
+        "ي": "ی",
+        "ك": "ک",
+        "ۀ": "ه",
+        "ة": "ه",
+        "ؤ": "و",
+        "إ": "ا",
+        "أ": "ا",
+        "آ": "ا",
+        "‌": "",  # ZWNJ
+        "‏": "",  # RTL mark
+        "\u200c": "",  # explicit ZWNJ
+    }
+    for src, dst in replacements.items():
+        text = text.replace(src, dst)
+    # Collapse multiple spaces
+    return " ".join(text.strip().split())
+
+
+def split_sentences(text: str, max_chars: int = 250) -> List[str]:
+    """
+    Split Persian/English text at sentence boundaries, merging neighbours
+    up to ``max_chars`` so very short sentences don't become separate
+    requests. A single sentence longer than ``max_chars`` is kept whole.
+    """
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
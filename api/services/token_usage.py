@@ -0,0 +1,134 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from api.config.metrics import registry
+from api.config.performance_config import PerformanceConfig
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KINDS = ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens")
+
+llm_tokens_total = registry.counter(
+    "llm_tokens_total",
+    "LLM tokens by route, model and kind (prompt, cached, completion)",
+    ("route", "model", "kind"),
+)
+llm_calls_total = registry.counter(
+    "llm_calls_total",
+    "LLM calls with token usage by route and model",
+    ("route", "model"),
+)
+
+
+def _empty() -> Dict[str, int]:
+    return {kind: 0 for kind in TOKEN_KINDS + ("calls",)}
+
+
+def _add(totals: Dict[str, int], usage: Dict[str, int]) -> None:
+    for kind in TOKEN_KINDS:
+        totals[kind] += usage.get(kind, 0)
+    totals["calls"] += 1
+
+
+class TokenUsageLedger:
+    """
+    Token usage per call, aggregated overall by (route, model) and per
+    session. Sessions are kept in an LRU capped at ``max_sessions`` so
+    abandoned kiosk sessions do not grow the ledger forever.
+    """
+
+    def __init__(
+        self,
+        budget: int = PerformanceConfig.SESSION_TOKEN_BUDGET,
+        max_sessions: int = PerformanceConfig.MAX_SESSIONS,
+    ):
+        self.budget = budget
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._sessions: "OrderedDict[str, Dict[Tuple[str, str], Dict[str, int]]]" = (
+            OrderedDict()
+        )
+
+    def record(
+        self,
+        route: str,
+        model: str,
+        usage: Dict[str, int],
+        session_id: Optional[str] = None,
+    ) -> None:
+        """Add one call's ``LLMResult.usage``; calls without usage are ignored."""
+        if not usage:
+            return
+        key = (route, model or "unknown")
+        with self._lock:
+            _add(self._totals.setdefault(key, _empty()), usage)
+            if session_id is not None:
+                session = self._sessions.pop(session_id, None) or {}
+                _add(session.setdefault(key, _empty()), usage)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+        llm_calls_total.labels(*key).inc()
+        for kind in TOKEN_KINDS[:3]:
+            if usage.get(kind):
+                llm_tokens_total.labels(route, key[1], kind).inc(usage[kind])
+
+    def session_total(self, session_id: str) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id) or {}
+            return sum(totals["total_tokens"] for totals in session.values())
+
+    def over_budget(self, session_id: Optional[str]) -> bool:
+        """True once the session has used up its token budget (0 disables it)."""
+        if not self.budget or session_id is None:
+            return False
+        return self.session_total(session_id) >= self.budget
+
+    @staticmethod
+    def _breakdown(entries: Dict[Tuple[str, str], Dict[str, int]]) -> Dict[str, Any]:
+        total = _empty()
+        by_route: Dict[str, Dict[str, int]] = {}
+        by_model: Dict[str, Dict[str, int]] = {}
+        for (route, model), counts in entries.items():
+            for bucket in (
+                total,
+                by_route.setdefault(route, _empty()),
+                by_model.setdefault(model, _empty()),
+            ):
+                for kind, value in counts.items():
+                    bucket[kind] += value
+        return {"total": total, "by_route": by_route, "by_model": by_model}
+
+    def session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            if entries is None:
+                return None
+            entries = {key: dict(counts) for key, counts in entries.items()}
+        report = self._breakdown(entries)
+        report["session_id"] = session_id
+        report["budget"] = self.budget or None
+        report["over_budget"] = bool(
+            self.budget and report["total"]["total_tokens"] >= self.budget
+        )
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = {key: dict(counts) for key, counts in self._totals.items()}
+            sessions = len(self._sessions)
+        report = self._breakdown(entries)
+        report["sessions"] = sessions
+        report["budget"] = self.budget or None
+        return report
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._sessions.clear()
+
+
+# Global instance for reuse
+token_usage = TokenUsageLedger()
@@ -0,0 +1,328 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from api.config.performance_config import PerformanceConfig
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+AUDIO_SUFFIX = ".audio"
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def audio_cache_key(
+    text: str,
+    voice_id: Optional[str],
+    model_id: Optional[str],
+    voice_settings: Dict[str, Any],
+    output_format: Optional[str] = None,
+    optimize_streaming_latency: Optional[int] = None,
+) -> str:
+    """sha256 over everything that changes the synthesized audio."""
+    material = json.dumps(
+        {
+            "text": text,
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "voice_settings": voice_settings,
+            "output_format": output_format,
+            "optimize_streaming_latency": optimize_streaming_latency,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def guess_audio_media_type(data: bytes) -> str:
+    """Media type of cached audio from its leading bytes."""
+    if data.startswith(b"OggS"):
+        return "audio/ogg"
+    if data.startswith(b"ID3") or data[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "application/octet-stream"
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(_KEY_RE.match(key))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end).
+
+    Returns None when the whole body should be served (no header, multiple
+    ranges or syntax we don't understand) and raises ValueError when the
+    range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def write_atomic(path: str, chunks: Iterable[bytes]) -> int:
+    """
+    Write chunks to a temp file next to ``path`` and rename it into place,
+    so readers never see a partial file. Returns the number of bytes written.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".part"
+    )
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return size
+
+
+class AudioCacheWriter:
+    """
+    Streams one entry into the disk tier: chunks go to a temp file that
+    ``commit`` renames into place, so readers never see partial audio and
+    the whole response never has to be held in memory.
+    """
+
+    def __init__(self, cache: "TTSAudioCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> None:
+        self._file.close()
+        if not self.size:
+            self.abort()
+            return
+        os.replace(self._tmp_path, self.cache._path(self.key))
+        self.cache._index(self.key, self.size)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class TTSAudioCache:
+    """
+    Content-addressed audio cache: an in-memory LRU in front of a
+    size-capped disk store. Disk I/O is blocking, so async callers should
+    go through ``asyncio.to_thread``.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = PerformanceConfig.TTS_CACHE_DIR,
+        memory_max_bytes: int = PerformanceConfig.TTS_CACHE_MEMORY_MAX_BYTES,
+        disk_max_bytes: int = PerformanceConfig.TTS_CACHE_DISK_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + AUDIO_SUFFIX)
+
+    def _load_index(self) -> None:
+        """Rebuild the disk LRU from files left by earlier runs (oldest first)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key = name[: -len(AUDIO_SUFFIX)]
+            if not name.endswith(AUDIO_SUFFIX) or not is_valid_key(key):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._remove_files(self._evict_disk())
+        logger.info(
+            f"TTS cache loaded {len(self._disk)} files ({self._disk_bytes} bytes) from {self.cache_dir}"
+        )
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """Put into the memory LRU; caller holds the lock."""
+        if len(data) > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> List[str]:
+        """Drop least recently used files over the cap; caller holds the lock."""
+        paths = []
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            paths.append(self._path(key))
+        return paths
+
+    def _remove_files(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return data
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                data = None
+
+        with self._lock:
+            if data is None:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+                self._counts["misses"] += 1
+                return None
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, data)
+            self._counts["disk_hits"] += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not data:
+            return
+        write_atomic(self._path(key), [data])
+        self._index(key, len(data), data)
+
+    def writer(self, key: str) -> AudioCacheWriter:
+        """Incremental writer for audio that is still being streamed."""
+        return AudioCacheWriter(self, key)
+
+    def put_file(self, key: str, path: str) -> None:
+        """Copy an audio file into the disk tier without reading it into memory."""
+        size = os.path.getsize(path)
+        if not size:
+            return
+        with open(path, "rb") as src:
+            write_atomic(self._path(key), iter(lambda: src.read(COPY_CHUNK_SIZE), b""))
+        self._index(key, size)
+
+    def copy_to(self, key: str, dest: str) -> bool:
+        """Write cached audio to ``dest`` (atomically); False on a miss."""
+        with self._lock:
+            on_disk = key in self._disk and key not in self._memory
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as src:
+                    write_atomic(dest, iter(lambda: src.read(COPY_CHUNK_SIZE), b""))
+            except FileNotFoundError:
+                pass  # evicted meanwhile; get() below drops the index entry
+            else:
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._counts["disk_hits"] += 1
+                return True
+
+        data = self.get(key)
+        if data is None:
+            return False
+        write_atomic(dest, [data])
+        return True
+
+    def _index(self, key: str, size: int, data: Optional[bytes] = None) -> None:
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old
+            self._disk[key] = size
+            self._disk_bytes += size
+            if data is not None:
+                self._remember(key, data)
+            self._counts["writes"] += 1
+            evicted = self._evict_disk()
+        self._remove_files(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = (
+                self._counts["memory_hits"]
+                + self._counts["disk_hits"]
+                + self._counts["misses"]
+            )
+            hits = self._counts["memory_hits"] + self._counts["disk_hits"]
+            return {
+                **self._counts,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+# Global instance for reuse
+tts_cache = TTSAudioCache()
@@ -0,0 +1,266 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from api.config.performance_config import PerformanceConfig
+from api.services.upstream_client import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _Waiter:
+    __slots__ = ("voice_id", "wake", "granted")
+
+    def __init__(self, voice_id: str, wake: Callable[[], None]):
+        self.voice_id = voice_id
+        self.wake = wake
+        self.granted = False
+
+
+class _Flight:
+    """One upstream stream shared by every identical in-flight request."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class _SyncFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTSScheduler:
+    """
+    Admission control in front of ElevenLabs: a global and a per-voice
+    concurrency cap with one FIFO queue shared by threads and asyncio tasks.
+    A waiter whose voice is at its cap doesn't block waiters for other voices
+    behind it. Identical in-flight requests are coalesced into one upstream
+    call (async streams per event loop, sync calls per key).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = PerformanceConfig.TTS_MAX_CONCURRENCY,
+        per_voice_concurrency: int = PerformanceConfig.TTS_PER_VOICE_CONCURRENCY,
+        window: int = PerformanceConfig.OPENAI_LATENCY_WINDOW,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_voice_concurrency = per_voice_concurrency
+        self._lock = threading.Lock()
+        self._queue: deque = deque()
+        self._active: Dict[str, int] = {}
+        self._active_total = 0
+        self._flights: Dict[Tuple[int, str], _Flight] = {}
+        self._sync_flights: Dict[str, _SyncFlight] = {}
+        self._wait = LatencyTracker(window)
+        self._counts = {
+            "admitted": 0,
+            "queued": 0,
+            "coalesced": 0,
+            "max_queue_depth": 0,
+        }
+
+    # --------------------
+    # Admission
+    # --------------------
+    def _dispatch(self) -> None:
+        """Admit queued waiters in FIFO order where capacity allows; caller holds the lock."""
+        for waiter in list(self._queue):
+            if self._active_total >= self.max_concurrency:
+                break
+            if self._active.get(waiter.voice_id, 0) >= self.per_voice_concurrency:
+                continue
+            self._queue.remove(waiter)
+            self._active[waiter.voice_id] = self._active.get(waiter.voice_id, 0) + 1
+            self._active_total += 1
+            self._counts["admitted"] += 1
+            waiter.granted = True
+            waiter.wake()
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._lock:
+            self._queue.append(waiter)
+            self._dispatch()
+            if not waiter.granted:
+                self._counts["queued"] += 1
+                self._counts["max_queue_depth"] = max(
+                    self._counts["max_queue_depth"], len(self._queue)
+                )
+
+    def release(self, voice_id: str) -> None:
+        with self._lock:
+            self._active[voice_id] -= 1
+            if not self._active[voice_id]:
+                del self._active[voice_id]
+            self._active_total -= 1
+            self._dispatch()
+
+    def acquire(self, voice_id: str) -> None:
+        """Block the calling thread until a slot for ``voice_id`` is free."""
+        start = time.monotonic()
+        event = threading.Event()
+        self._enqueue(_Waiter(voice_id, event.set))
+        event.wait()
+        self._wait.record(time.monotonic() - start)
+
+    async def acquire_async(self, voice_id: str) -> None:
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = _Waiter(voice_id, wake)
+        self._enqueue(waiter)
+        try:
+            if not waiter.granted:
+                await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._queue.remove(waiter)
+            if granted:
+                self.release(voice_id)
+            raise
+        self._wait.record(time.monotonic() - start)
+
+    @contextmanager
+    def slot(self, voice_id: str):
+        self.acquire(voice_id)
+        try:
+            yield
+        finally:
+            self.release(voice_id)
+
+    @asynccontextmanager
+    async def slot_async(self, voice_id: str):
+        await self.acquire_async(voice_id)
+        try:
+            yield
+        finally:
+            self.release(voice_id)
+
+    # --------------------
+    # Coalescing
+    # --------------------
+    async def _produce(
+        self,
+        flight_key: Tuple[int, str],
+        flight: _Flight,
+        voice_id: str,
+        factory: Callable[[], AsyncIterator[bytes]],
+    ) -> None:
+        try:
+            async with self.slot_async(voice_id):
+                async for chunk in factory():
+                    flight.chunks.append(chunk)
+                    for queue in flight.subscribers:
+                        queue.put_nowait(chunk)
+        except asyncio.CancelledError as e:
+            flight.error = e
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._flights.pop(flight_key, None)
+            for queue in flight.subscribers:
+                queue.put_nowait(_END)
+
+    async def stream(
+        self,
+        key: str,
+        voice_id: str,
+        factory: Callable[[], AsyncIterator[bytes]],
+    ) -> AsyncIterator[bytes]:
+        """
+        Run ``factory()`` once per ``key`` at a time. Late joiners get the
+        chunks produced so far and then follow the live stream.
+        """
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[flight_key] = flight
+            flight.task = asyncio.create_task(
+                self._produce(flight_key, flight, voice_id, factory)
+            )
+        else:
+            with self._lock:
+                self._counts["coalesced"] += 1
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for chunk in flight.chunks:
+            queue.put_nowait(chunk)
+        flight.subscribers.append(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                yield item
+        finally:
+            flight.subscribers.remove(queue)
+            # Nobody is listening anymore; stop the upstream call
+            if not flight.subscribers and not flight.task.done():
+                flight.task.cancel()
+
+    def run_sync(self, key: str, voice_id: str, fn: Callable[[], Any]) -> Any:
+        """Blocking variant: identical concurrent calls share one ``fn()`` result."""
+        with self._lock:
+            flight = self._sync_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _SyncFlight()
+                self._sync_flights[key] = flight
+            else:
+                self._counts["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            with self.slot(voice_id):
+                flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._sync_flights.pop(key, None)
+            flight.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counts,
+                "queue_depth": len(self._queue),
+                "active": self._active_total,
+                "active_per_voice": dict(self._active),
+                "in_flight": len(self._flights) + len(self._sync_flights),
+                "max_concurrency": self.max_concurrency,
+                "per_voice_concurrency": self.per_voice_concurrency,
+                "wait_p50": self._wait.percentile(0.5),
+                "wait_p95": self._wait.percentile(0.95),
+            }
+
+
+# Global instance shared by every TTS caller
+tts_scheduler = TTSScheduler()
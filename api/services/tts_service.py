@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from elevenlabs import AsyncElevenLabs, VoiceSettings
+from api.config.performance_config import PerformanceConfig
+from api.config.metrics import track_upstream_stream
+from api.services.tts_cache import tts_cache, audio_cache_key
+from api.services.tts_scheduler import tts_scheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_ID = PerformanceConfig.TTS_DEFAULT_MODEL
+DEFAULT_OUTPUT_FORMAT = PerformanceConfig.TTS_DEFAULT_OUTPUT_FORMAT
+
+
+class SynthesisOptions(NamedTuple):
+    """Request-level synthesis parameters; all of them are part of the cache key"""
+
+    model_id: str = DEFAULT_MODEL_ID
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    optimize_streaming_latency: Optional[int] = None
+
+
+DEFAULT_OPTIONS = SynthesisOptions()
+
+
+class CachedVoiceList:
+    """Voice list with a TTL and stale-while-revalidate background refresh"""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[List[Dict[str, str]]]],
+        ttl: float = PerformanceConfig.VOICES_CACHE_TTL,
+        retry_interval: float = PerformanceConfig.VOICES_RETRY_INTERVAL,
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._lock = asyncio.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self._voices: Optional[List[Dict[str, str]]] = None
+        self.etag: Optional[str] = None
+        self._fetched_at = 0.0
+        self._retry_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    async def _refresh(self) -> None:
+        voices = await self._fetch()
+        body = json.dumps(voices, sort_keys=True, ensure_ascii=False)
+        self._voices = voices
+        self.etag = f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"'
+        self._fetched_at = time.monotonic()
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self._refresh()
+        except Exception as e:
+            # Keep serving the stale list; don't retry on every request
+            self._retry_at = time.monotonic() + self.retry_interval
+            logger.warning(f"Voice list refresh failed, serving cached list: {e}")
+
+    async def get(self) -> Tuple[List[Dict[str, str]], str]:
+        """
+        The cached list and its ETag. Only the very first call waits for
+        ElevenLabs; after that a stale list is returned immediately while
+        a single background task refreshes it.
+        """
+        if self._voices is None:
+            async with self._lock:
+                if self._voices is None:
+                    await self._refresh()
+        elif (
+            self.is_stale()
+            and time.monotonic() >= self._retry_at
+            and (self._refresh_task is None or self._refresh_task.done())
+        ):
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+        return self._voices, self.etag
+
+
+class TTSService:
+    """Async ElevenLabs text-to-speech shared by the HTTP endpoints"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TTSService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "initialized"):
+            self.api_key = os.getenv("ELEVENLABS_API_KEY")
+            if not self.api_key:
+                logger.error("ELEVENLABS_API_KEY not set")
+                raise ValueError(
+                    "ELEVENLABS_API_KEY is not set in environment variables"
+                )
+
+            self.default_voice_id = os.getenv("ELEVENLABS_VOICE_ID")
+            self.client = AsyncElevenLabs(
+                api_key=self.api_key, base_url=PerformanceConfig.ELEVENLABS_BASE_URL
+            )
+            self.cache = tts_cache
+            self.voices = CachedVoiceList(self._fetch_voices)
+            self.initialized = True
+
+    def resolve_voice_id(self, voice_id: Optional[str] = None) -> str:
+        voice_id = voice_id or self.default_voice_id
+        if not voice_id:
+            raise ValueError("ELEVENLABS_VOICE_ID is not set in environment variables")
+        return voice_id
+
+    def cache_key(
+        self,
+        text: str,
+        voice_settings: VoiceSettings,
+        voice_id: Optional[str] = None,
+        options: SynthesisOptions = DEFAULT_OPTIONS,
+    ) -> str:
+        return audio_cache_key(
+            text,
+            self.resolve_voice_id(voice_id),
+            options.model_id,
+            voice_settings.dict(exclude_none=True),
+            output_format=options.output_format,
+            optimize_streaming_latency=options.optimize_streaming_latency,
+        )
+
+    def stream(
+        self,
+        text: str,
+        voice_settings: VoiceSettings,
+        voice_id: Optional[str] = None,
+        options: SynthesisOptions = DEFAULT_OPTIONS,
+    ) -> AsyncIterator[bytes]:
+        """
+        Audio chunks as ElevenLabs produces them (streaming endpoint). Calls
+        go through the shared scheduler, so identical in-flight requests
+        share one upstream stream.
+        """
+        voice_id = self.resolve_voice_id(voice_id)
+        return tts_scheduler.stream(
+            self.cache_key(text, voice_settings, voice_id, options),
+            voice_id,
+            lambda: track_upstream_stream(
+                "elevenlabs",
+                options.model_id,
+                self.client.text_to_speech.stream(
+                    voice_id=voice_id,
+                    text=text,
+                    model_id=options.model_id,
+                    voice_settings=voice_settings,
+                    output_format=options.output_format,
+                    optimize_streaming_latency=options.optimize_streaming_latency,
+                ),
+            ),
+        )
+
+    async def open_stream(
+        self,
+        text: str,
+        voice_settings: VoiceSettings,
+        voice_id: Optional[str] = None,
+        options: SynthesisOptions = DEFAULT_OPTIONS,
+    ) -> AsyncIterator[bytes]:
+        """Start a stream and wait for its first chunk (see ``prime``)."""
+        return await prime(self.stream(text, voice_settings, voice_id, options))
+
+    async def stream_sentences(
+        self,
+        sentences: List[str],
+        voice_settings: VoiceSettings,
+        voice_id: Optional[str] = None,
+        options: SynthesisOptions = DEFAULT_OPTIONS,
+        concurrency: int = PerformanceConfig.TTS_CHUNK_CONCURRENCY,
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize sentences concurrently and yield their audio in order.
+        The earliest unfinished sentence is forwarded live; later ones are
+        buffered until everything before them has been sent. Each sentence
+        is cached on its own, so repeated sentences are reused across texts.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        queues = [asyncio.Queue() for _ in sentences]
+
+        async def produce(sentence: str, queue: asyncio.Queue) -> None:
+            try:
+                async with semaphore:
+                    key = self.cache_key(sentence, voice_settings, voice_id, options)
+                    cached = None
+                    if PerformanceConfig.TTS_CACHE_ENABLED:
+                        cached = await asyncio.to_thread(self.cache.get, key)
+                    if cached is not None:
+                        queue.put_nowait(cached)
+                    else:
+                        chunks = []
+                        async for chunk in self.stream(
+                            sentence, voice_settings, voice_id, options
+                        ):
+                            chunks.append(chunk)
+                            queue.put_nowait(chunk)
+                        if PerformanceConfig.TTS_CACHE_ENABLED:
+                            await asyncio.to_thread(
+                                self.cache.put, key, b"".join(chunks)
+                            )
+                queue.put_nowait(None)
+            except Exception as e:
+                queue.put_nowait(e)
+
+        tasks = [
+            asyncio.create_task(produce(sentence, queue))
+            for sentence, queue in zip(sentences, queues)
+        ]
+        try:
+            for queue in queues:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_voices(self) -> List[Dict[str, str]]:
+        response = await self.client.voices.get_all()
+        return [{"id": voice.voice_id, "name": voice.name} for voice in response.voices]
+
+    async def synthesize(
+        self,
+        text: str,
+        voice_settings: VoiceSettings,
+        voice_id: Optional[str] = None,
+        options: SynthesisOptions = DEFAULT_OPTIONS,
+    ) -> bytes:
+        """Complete audio for ``text``, from the cache when possible."""
+        key = self.cache_key(text, voice_settings, voice_id, options)
+        if PerformanceConfig.TTS_CACHE_ENABLED:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        audio = b"".join(
+            [
+                chunk
+                async for chunk in self.stream(text, voice_settings, voice_id, options)
+            ]
+        )
+        if PerformanceConfig.TTS_CACHE_ENABLED:
+            await asyncio.to_thread(self.cache.put, key, audio)
+        return audio
+
+
+async def prime(audio_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Wait for the first chunk of a stream, so upstream failures surface
+    before any response headers are sent. The returned iterator replays
+    that first chunk.
+    """
+    try:
+        first_chunk = await audio_stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+
+    async def replay() -> AsyncIterator[bytes]:
+        try:
+            if first_chunk:
+                yield first_chunk
+            async for chunk in audio_stream:
+                yield chunk
+        finally:
+            aclose = getattr(audio_stream, "aclose", None)
+            if aclose:
+                await aclose()
+
+    return replay()
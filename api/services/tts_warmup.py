@@ -0,0 +1,92 @@
+import os
+import asyncio
+import logging
+import argparse
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from elevenlabs import VoiceSettings
+from api.config.performance_config import PerformanceConfig
+from api.constants.phrases import warmup_phrases
+from api.services.tts_service import TTSService
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ["fa", "en"]
+
+
+def warmup_voice_ids(tts_service: TTSService) -> List[str]:
+    """Voices from TTS_WARMUP_VOICE_IDS (comma separated), else the default voice"""
+    configured = os.getenv("TTS_WARMUP_VOICE_IDS", "")
+    voice_ids = [v.strip() for v in configured.split(",") if v.strip()]
+    return voice_ids or [tts_service.resolve_voice_id()]
+
+
+async def warmup_tts_cache(
+    languages: Optional[List[str]] = None,
+    voice_ids: Optional[List[str]] = None,
+    concurrency: int = PerformanceConfig.TTS_WARMUP_CONCURRENCY,
+    tts_service: Optional[TTSService] = None,
+) -> Dict[str, int]:
+    """
+    Synthesize every fixed phrase for each language and voice into the TTS
+    cache. Phrases already cached are skipped, so re-running is cheap.
+    """
+    tts_service = tts_service or TTSService()
+    voice_ids = voice_ids or warmup_voice_ids(tts_service)
+    voice_settings = VoiceSettings(
+        stability=PerformanceConfig.TTS_DEFAULT_STABILITY,
+        similarity_boost=PerformanceConfig.TTS_DEFAULT_SIMILARITY_BOOST,
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"synthesized": 0, "cached": 0, "failed": 0}
+
+    async def synthesize(text: str, voice_id: str) -> None:
+        key = tts_service.cache_key(text, voice_settings, voice_id)
+        if key in tts_service.cache:
+            counts["cached"] += 1
+            return
+        async with semaphore:
+            try:
+                chunks = [
+                    chunk
+                    async for chunk in tts_service.stream(
+                        text, voice_settings, voice_id
+                    )
+                ]
+                await asyncio.to_thread(tts_service.cache.put, key, b"".join(chunks))
+                counts["synthesized"] += 1
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning(f"TTS warmup failed for {text[:30]!r}: {e}")
+
+    await asyncio.gather(
+        *[
+            synthesize(text, voice_id)
+            for language in languages or LANGUAGES
+            for text in warmup_phrases(language)
+            for voice_id in voice_ids
+        ]
+    )
+    logger.info(f"TTS warmup finished: {counts}")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pre-synthesize fixed assistant phrases"
+    )
+    parser.add_argument("--language", action="append", choices=LANGUAGES)
+    parser.add_argument("--voice", action="append", dest="voices")
+    parser.add_argument(
+        "--concurrency", type=int, default=PerformanceConfig.TTS_WARMUP_CONCURRENCY
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    counts = asyncio.run(warmup_tts_cache(args.language, args.voices, args.concurrency))
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
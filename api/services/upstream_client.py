@@ -0,0 +1,378 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait as wait_futures,
+)
+from typing import Dict, Optional, Any
+import httpx
+from api.config.performance_config import PerformanceConfig
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LatencyTracker:
+    """Rolling window of recent upstream latencies (seconds)"""
+
+    def __init__(self, window: int):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class HedgedUpstreamClient:
+    """
+    Upstream HTTP wrapper with adaptive timeouts, hedged requests and retries.
+
+    The per-call timeout follows the observed p99 latency, a duplicate request
+    is fired once the primary exceeds the hedge quantile (p90 by default), and
+    429/5xx responses are retried with full-jitter exponential backoff.
+    Timed-out and slow calls raise a timeout floor that only decays gradually,
+    so a run of fast replies cannot shrink the timeout below what slow calls need.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        min_timeout: float = PerformanceConfig.OPENAI_MIN_TIMEOUT,
+        max_timeout: float = PerformanceConfig.OPENAI_TIMEOUT,
+        timeout_multiplier: float = PerformanceConfig.OPENAI_TIMEOUT_MULTIPLIER,
+        hedge_quantile: float = PerformanceConfig.OPENAI_HEDGE_QUANTILE,
+        hedge_budget: float = PerformanceConfig.OPENAI_HEDGE_BUDGET,
+        max_retries: int = PerformanceConfig.OPENAI_MAX_RETRIES,
+        backoff_base: float = PerformanceConfig.OPENAI_BACKOFF_BASE,
+        backoff_max: float = PerformanceConfig.OPENAI_BACKOFF_MAX,
+        window: int = PerformanceConfig.OPENAI_LATENCY_WINDOW,
+        min_samples: int = PerformanceConfig.OPENAI_LATENCY_MIN_SAMPLES,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge_quantile = hedge_quantile
+        self.hedge_budget = hedge_budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_samples = min_samples
+        self.latency = LatencyTracker(window)
+        self.transport = transport
+        self.async_transport = async_transport
+
+        self._lock = threading.Lock()
+        # Hedge tokens: every request earns `hedge_budget`, every hedge spends 1
+        self._hedge_tokens = 1.0
+        self._timeout_floor = 0.0
+        self._floor_decay = 1.0 - 1.0 / max(window, 1)
+        self._stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "retries": 0}
+
+        self._sync_client: Optional[httpx.Client] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
+
+    # --------------------
+    # Policy
+    # --------------------
+    def timeout_for(self) -> float:
+        """Timeout for the next call, derived from the rolling p99."""
+        if self.latency.count() < self.min_samples:
+            return self.max_timeout
+        p99 = self.latency.percentile(0.99)
+        with self._lock:
+            floor = self._timeout_floor
+        return max(
+            self.min_timeout,
+            min(self.max_timeout, max(p99 * self.timeout_multiplier, floor)),
+        )
+
+    def _record_latency(self, seconds: float) -> None:
+        self.latency.record(seconds)
+        with self._lock:
+            self._timeout_floor = min(
+                self.max_timeout,
+                max(
+                    self._timeout_floor * self._floor_decay,
+                    seconds * self.timeout_multiplier,
+                ),
+            )
+
+    def _record_timeout(self, timeout: float) -> None:
+        """A timed-out call needed at least ``timeout``; the retry gets more room."""
+        self._record_latency(timeout)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Delay after which a hedged duplicate is sent (None disables hedging)."""
+        if self.hedge_budget <= 0 or self.latency.count() < self.min_samples:
+            return None
+        return self.latency.percentile(self.hedge_quantile)
+
+    def _start_request(self) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._hedge_tokens = min(
+                self._hedge_tokens + self.hedge_budget, 1.0 + self.hedge_budget * 10
+            )
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1.0:
+                return False
+            self._hedge_tokens -= 1.0
+            self._stats["hedges"] += 1
+            return True
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present."""
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            {
+                "samples": self.latency.count(),
+                "p50": self.latency.percentile(0.5),
+                "p90": self.latency.percentile(0.9),
+                "p99": self.latency.percentile(0.99),
+                "timeout": self.timeout_for(),
+            }
+        )
+        return stats
+
+    # --------------------
+    # Async path
+    # --------------------
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(transport=self.async_transport)
+            self._async_loop = loop
+        return self._async_client
+
+    async def _send(self, url, headers, payload, timeout) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self._get_async_client().post(
+                url, headers=headers, json=payload, timeout=timeout
+            )
+        except httpx.TimeoutException:
+            self._record_timeout(timeout)
+            raise
+        response.raise_for_status()
+        self._record_latency(time.perf_counter() - started)
+        return response
+
+    async def _hedged_attempt(self, url, headers, payload) -> httpx.Response:
+        timeout = self.timeout_for()
+        primary = asyncio.create_task(self._send(url, headers, payload, timeout))
+        pending = {primary}
+        delay = self.hedge_delay()
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self._take_hedge_token():
+                    logger.info(f"[{self.name}] hedging request after {delay:.2f}s")
+                    pending.add(
+                        asyncio.create_task(self._send(url, headers, payload, timeout))
+                    )
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def post_json(
+        self, url: str, headers: Dict[str, str], payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """POST a JSON payload and return the decoded JSON response."""
+        self._start_request()
+        attempt = 0
+        while True:
+            try:
+                response = await self._hedged_attempt(url, headers, payload)
+                return response.json()
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(
+                    f"[{self.name}] retrying in {delay:.2f}s after error: {e}"
+                )
+                self._count("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    # --------------------
+    # Sync path (used from threadpool routes)
+    # --------------------
+    def _get_sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(transport=self.transport)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=PerformanceConfig.OPENAI_HEDGE_WORKERS,
+                    thread_name_prefix=f"hedge-{self.name}",
+                )
+            return self._sync_client
+
+    def _send_sync(
+        self,
+        url,
+        headers,
+        payload,
+        timeout,
+        cancelled: Optional[threading.Event] = None,
+    ) -> httpx.Response:
+        client = self._get_sync_client()
+        if cancelled is not None and cancelled.is_set():
+            raise httpx.RequestError("hedged attempt cancelled")
+        started = time.perf_counter()
+        request = client.build_request(
+            "POST", url, headers=headers, json=payload, timeout=timeout
+        )
+        try:
+            response = client.send(request, stream=True)
+        except httpx.TimeoutException:
+            self._record_timeout(timeout)
+            raise
+        try:
+            if cancelled is not None and cancelled.is_set():
+                # The other attempt already won: release the connection unread
+                raise httpx.RequestError("hedged attempt cancelled", request=request)
+            response.read()
+        except httpx.TimeoutException:
+            self._record_timeout(timeout)
+            raise
+        finally:
+            response.close()
+        response.raise_for_status()
+        self._record_latency(time.perf_counter() - started)
+        return response
+
+    def _hedged_attempt_sync(self, url, headers, payload) -> httpx.Response:
+        timeout = self.timeout_for()
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._send_sync(url, headers, payload, timeout)
+
+        self._get_sync_client()
+        cancelled = threading.Event()
+        primary = self._executor.submit(
+            self._send_sync, url, headers, payload, timeout, cancelled
+        )
+        pending = {primary}
+        try:
+            done, _ = wait_futures(pending, timeout=delay)
+            if not done and self._take_hedge_token():
+                logger.info(f"[{self.name}] hedging request after {delay:.2f}s")
+                pending.add(
+                    self._executor.submit(
+                        self._send_sync, url, headers, payload, timeout, cancelled
+                    )
+                )
+            error = None
+            while pending:
+                done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            # A blocking request cannot be interrupted mid-read: queued losers are
+            # dropped and a running one closes its response as soon as it returns
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+    def post_json_sync(
+        self, url: str, headers: Dict[str, str], payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Blocking variant of ``post_json`` for synchronous callers."""
+        self._start_request()
+        attempt = 0
+        while True:
+            try:
+                response = self._hedged_attempt_sync(url, headers, payload)
+                return response.json()
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(
+                    f"[{self.name}] retrying in {delay:.2f}s after error: {e}"
+                )
+                self._count("retries")
+                attempt += 1
+                time.sleep(delay)
+
+
+_clients: Dict[str, HedgedUpstreamClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_upstream_client(name: str) -> HedgedUpstreamClient:
+    """Shared client per upstream route so each keeps its own latency profile."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = HedgedUpstreamClient(name)
+        return _clients[name]
+
+
+def get_upstream_stats() -> Dict[str, Dict[str, Any]]:
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in clients.items()}
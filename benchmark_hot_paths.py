@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the pure-Python work done on every request
+Booking state guidance and field detection, location detection, animation
+selection and the extract-info normalizers, with Persian/English fixtures and
+1-9 passenger states. Results are JSON so runs can be compared.
+
+    python benchmark_hot_paths.py --output bench.json
+    python benchmark_hot_paths.py --compare bench.json --tolerance 0.15   # exit 1 on regression
+    python benchmark_hot_paths.py --filter guidance --number 2000
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from api.schemas.extract_info_schema import ExtractInfoRequest
+from api.services.animation_service import animation_selector
+from api.services.extract_info_service import normalize_extracted
+from api.services.openai_service import OpenAIService
+
+PASSENGER_COUNTS = (1, 3, 9)
+
+# User messages per language: booking answers, location questions and small talk
+MESSAGES = {
+    "fa": [
+        "سلام",
+        "فرودگاه امام خمینی",
+        "خروجی",
+        "2024-08-15",
+        "۲ نفر",
+        "IR123",
+        "09123456789",
+        "نمازخانه کجاست؟",
+        "ببخشید سرویس بهداشتی کجاست",
+        "میخواهم بلیط برای سفر به استانبول رزرو کنم و چمدان اضافه دارم",
+    ],
+    "en": [
+        "Hello",
+        "Imam Khomeini airport",
+        "departure",
+        "2024-08-15",
+        "2 passengers",
+        "IR705",
+        "+98 912 345 6789",
+        "Where is the prayer room?",
+        "Is there a gift shop near the transit lounge",
+        "I would like to book a ticket to Istanbul and I have extra luggage",
+    ],
+}
+
+# Assistant replies the animation selector runs on
+REPLIES = {
+    "fa": [
+        "سلام، خوش آمدید! چطور می‌توانم کمکتان کنم؟",
+        "عالی، اطلاعات شما ثبت شد. ممنون از صبر شما",
+        "متأسفانه پرواز مورد نظر پیدا نشد، لطفاً دوباره بررسی کنید",
+        "نام کوچک مسافر اول را بفرمایید",
+    ],
+    "en": [
+        "Hello, welcome! How can I help you today?",
+        "Excellent, your booking is confirmed. Thank you very much",
+        "Unfortunately the flight could not be found, please check again",
+        "Please tell me the first name of passenger 1",
+    ],
+}
+
+PASSENGER_FIELDS = (
+    "first_name",
+    "last_name",
+    "national_id",
+    "passport_number",
+    "luggage_count",
+    "passenger_type",
+    "gender",
+    "nationality",
+)
+
+
+def booking_state(language: str, passengers: int) -> Dict[str, Any]:
+    """Booking halfway through the last passenger's details"""
+    return {
+        "language": language,
+        "completed": {
+            "origin",
+            "travel_type",
+            "travel_date",
+            "flight_number",
+            "num_passengers",
+            "contact_phone",
+        },
+        "attempts": {},
+        "num_passengers": passengers,
+        "passengers": [
+            {
+                "completed": set(
+                    PASSENGER_FIELDS if i < passengers - 1 else PASSENGER_FIELDS[:3]
+                )
+            }
+            for i in range(passengers)
+        ],
+    }
+
+
+def extraction(passengers: int) -> Tuple[Dict[str, Any], ExtractInfoRequest]:
+    """Raw model output plus the conversation it came from"""
+    names = [("علی", "احمدی"), ("مریم", "رضایی"), ("حسین", "کریمی")]
+    extracted = {
+        "airportName": "Imam Khomeini",
+        "travelType": "departure",
+        "travelDate": "2024-08-15",
+        "passengerCount": passengers,
+        "flightNumber": "ir ۱۲۳",
+        "buyer_Phone": "",
+        "passengers": [
+            {
+                "name": names[i % len(names)][0],
+                "lastName": names[i % len(names)][1],
+                "nationalId": "۱۲۳ ۴۵۶ ۷۸۹۰",
+                "passportNumber": "A 1234 5678",
+                "luggageCount": 1,
+                "passengerType": "adult",
+                "gender": "male",
+                "nationality": "ایرانی",
+            }
+            for i in range(passengers)
+        ],
+    }
+    texts = MESSAGES["fa"] + ["شماره تماس من ۰۹۱۲ ۳۴۵ ۶۷۸۹ است"]
+    conversation = ExtractInfoRequest(
+        messages=[
+            {"id": str(i), "text": text, "sender": "CLIENT"}
+            for i, text in enumerate(texts * passengers)
+        ]
+    )
+    return extracted, conversation
+
+
+def build_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    service = OpenAIService()
+    cases = []
+    for language in ("fa", "en"):
+        messages = MESSAGES[language]
+        replies = REPLIES[language]
+        for passengers in PASSENGER_COUNTS:
+            state = booking_state(language, passengers)
+            cases.append(
+                (
+                    f"build_state_guidance[{language},{passengers}p]",
+                    lambda l=language, s=state: service._build_state_guidance(l, s),
+                )
+            )
+        cases.append(
+            (
+                f"detect_completed_field[{language}]",
+                lambda l=language, m=messages: [
+                    service._detect_completed_field(text, l) for text in m
+                ],
+            )
+        )
+        cases.append(
+            (
+                f"detect_location[{language}]",
+                lambda l=language, m=messages: [
+                    service._detect_location(text, l) for text in m
+                ],
+            )
+        )
+        cases.append(
+            (
+                f"select_animation[{language}]",
+                lambda l=language, r=replies: [
+                    animation_selector.select_animation(text, l) for text in r
+                ],
+            )
+        )
+    for passengers in PASSENGER_COUNTS:
+        extracted, conversation = extraction(passengers)
+        # Normalizers rewrite in place, so each call gets a fresh copy
+        cases.append(
+            (
+                f"normalize_extracted[{passengers}p]",
+                lambda e=extracted, c=conversation: normalize_extracted(
+                    json.loads(json.dumps(e)), c
+                ),
+            )
+        )
+    return cases
+
+
+def measure(fn: Callable[[], Any], number: int, repeat: int) -> Dict[str, float]:
+    """Microseconds per call over ``repeat`` rounds of ``number`` calls"""
+    fn()  # warm caches and lazy state
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number * 1e6)
+    return {
+        "min_us": min(rounds),
+        "median_us": statistics.median(rounds),
+        "mean_us": statistics.fmean(rounds),
+        "stdev_us": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+    }
+
+
+def run_benchmarks(
+    number: int, repeat: int, name_filter: Optional[str] = None
+) -> Dict[str, Any]:
+    results = {}
+    for name, fn in build_cases():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(fn, number, repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "number": number,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> Tuple[List[str], List[str]]:
+    """(regressions, improvements) on the min time, which is the least noisy"""
+    regressions, improvements = [], []
+    for name, current in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = current["min_us"] / base["min_us"] if base["min_us"] else 1.0
+        line = f"{name}: {base['min_us']:.2f}us -> {current['min_us']:.2f}us ({ratio:.2f}x)"
+        if ratio > 1 + tolerance:
+            regressions.append(line)
+        elif ratio < 1 - tolerance:
+            improvements.append(line)
+    return regressions, improvements
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CPU hot path microbenchmarks")
+    parser.add_argument("--number", type=int, default=500, help="calls per round")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per case")
+    parser.add_argument("--filter", help="only cases whose name contains this")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    options = parser.parse_args(argv)
+
+    report = run_benchmarks(options.number, options.repeat, options.filter)
+    width = max((len(name) for name in report["results"]), default=10)
+    print(f"{'case':<{width}}  {'min us':>10}  {'median us':>10}  {'stdev':>8}")
+    for name, stats in report["results"].items():
+        print(
+            f"{name:<{width}}  {stats['min_us']:>10.2f}  {stats['median_us']:>10.2f}"
+            f"  {stats['stdev_us']:>8.2f}"
+        )
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if options.compare:
+        with open(options.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, improvements = compare(report, baseline, options.tolerance)
+        for line in improvements:
+            print(f"✅ {line}")
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
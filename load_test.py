@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Async load generator for the kiosk backend
+Many concurrent simulated kiosk sessions walk through multi-turn booking
+scripts (taken from test_multiple_passengers.py and test_extract_info_en.py)
+against /assistant/chat, /text-to-speech and /extractInfo/extract-info, then
+report throughput, latency percentiles and error rates per endpoint.
+
+    python load_test.py --sessions 20 --iterations 2 --output results.json
+    python load_test.py --sessions 20 --save-baseline load_baseline.json
+    python load_test.py --sessions 20 --baseline load_baseline.json   # exit 1 on regression
+    python load_test.py --in-process --sessions 5                   # no server needed
+
+Pair it with mock_upstream_server.py to load test without paid upstreams.
+"""
+
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ENDPOINTS = {
+    "chat": "/assistant/chat",
+    "text_to_speech": "/text-to-speech",
+    "extract_info": "/extractInfo/extract-info",
+}
+
+# Multi-turn booking conversations, one user message per turn
+BOOKING_SCRIPTS: Dict[str, Dict[str, Any]] = {
+    "fa_two_passengers": {
+        "language": "fa",
+        "turns": [
+            "سلام",
+            "فرودگاه امام خمینی",
+            "خروجی",
+            "۱۵ آگوست ۲۰۲۴",
+            "۲ نفر",
+            "احمد محمدی",
+            "۱۲۳۴۵۶۷۸۹۰",
+            "IR123",
+            "A12345678",
+            "۲",
+            "بزرگسال",
+            "مرد",
+            "علی احمدی",
+            "۰۹۸۷۶۵۴۳۲۱",
+            "IR123",
+            "B87654321",
+            "۱",
+            "بزرگسال",
+            "مرد",
+            "هیچ توضیح اضافه‌ای ندارم",
+        ],
+    },
+    "en_single_passenger": {
+        "language": "en",
+        "turns": [
+            "Hello, I want to book a flight ticket",
+            "Imam Khomeini",
+            "departure",
+            "August 15, 2024",
+            "1 person",
+            "Ali Ahmadi",
+            "1234567890",
+            "IR705",
+            "A12345678",
+            "2 bags",
+            "adult",
+            "male",
+            "No additional information",
+        ],
+    },
+}
+
+# Percentiles and rates compared against the baseline
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..1)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.error_kinds: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str]) -> None:
+        self.latencies[endpoint].append(seconds)
+        if error:
+            self.errors[endpoint] += 1
+            self.error_kinds[error] = self.error_kinds.get(error, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name, samples in self.latencies.items():
+            if not samples:
+                continue
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": self.errors[name],
+                "error_rate": self.errors[name] / len(samples),
+                "throughput": len(samples) / elapsed if elapsed else 0.0,
+                "mean": sum(samples) / len(samples),
+                "p50": percentile(samples, 0.5),
+                "p90": percentile(samples, 0.9),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+                "max": max(samples),
+            }
+        total = sum(len(s) for s in self.latencies.values())
+        return {
+            "elapsed": elapsed,
+            "requests": total,
+            "throughput": total / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+            "error_kinds": dict(self.error_kinds),
+        }
+
+
+async def timed_post(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    endpoint: str,
+    payload: Dict[str, Any],
+) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    response, error = None, None
+    try:
+        response = await client.post(ENDPOINTS[endpoint], json=payload)
+        # Read the whole body so streamed audio is timed to the last byte
+        await response.aread()
+        if response.status_code >= 400:
+            error = f"{endpoint}:{response.status_code}"
+    except httpx.HTTPError as e:
+        error = f"{endpoint}:{type(e).__name__}"
+    recorder.record(endpoint, time.perf_counter() - started, error)
+    return response if error is None else None
+
+
+async def kiosk_session(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    script_name: str,
+    options: argparse.Namespace,
+) -> None:
+    """One kiosk walking through a booking script turn by turn"""
+    script = BOOKING_SCRIPTS[script_name]
+    session_id = f"load-{script_name}-{uuid.uuid4().hex[:8]}"
+    conversation = []
+    turns = script["turns"][: options.turns] if options.turns else script["turns"]
+
+    for turn in turns:
+        conversation.append({"sender": "CLIENT", "text": turn})
+        response = await timed_post(
+            client,
+            recorder,
+            "chat",
+            {"message": turn, "session_id": session_id, "language": script["language"]},
+        )
+        reply = None
+        if response is not None:
+            try:
+                reply = response.json()["messages"]["text"]
+            except (ValueError, KeyError, TypeError):
+                reply = None
+        if reply:
+            conversation.append({"sender": "AVATAR", "text": reply})
+            if options.tts:
+                await timed_post(client, recorder, "text_to_speech", {"text": reply})
+        if options.think_time:
+            await asyncio.sleep(random.uniform(0, options.think_time))
+
+    if options.extract:
+        messages = [
+            {"id": str(index), **message}
+            for index, message in enumerate(conversation, 1)
+        ]
+        await timed_post(client, recorder, "extract_info", {"messages": messages})
+
+
+async def run_load(
+    options: argparse.Namespace,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> Dict[str, Any]:
+    """Run ``sessions`` concurrent kiosks for ``iterations`` scripts each"""
+    recorder = Recorder()
+    script_names = [
+        name
+        for name in BOOKING_SCRIPTS
+        if not options.scripts or name in options.scripts
+    ]
+    limits = httpx.Limits(
+        max_connections=options.sessions, max_keepalive_connections=options.sessions
+    )
+    async with httpx.AsyncClient(
+        base_url=options.base_url,
+        timeout=options.timeout,
+        limits=limits,
+        transport=transport,
+    ) as client:
+
+        async def kiosk(index: int) -> None:
+            for iteration in range(options.iterations):
+                name = script_names[(index + iteration) % len(script_names)]
+                await kiosk_session(client, recorder, name, options)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[kiosk(i) for i in range(options.sessions)])
+        elapsed = time.perf_counter() - started
+
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "sessions": options.sessions,
+        "iterations": options.iterations,
+        "scripts": script_names,
+        "tts": options.tts,
+        "extract": options.extract,
+    }
+    return report
+
+
+def compare_to_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    error_tolerance: float,
+) -> List[str]:
+    """Regressions as readable lines; empty when the run is within the thresholds"""
+    regressions = []
+    for name, base in baseline.get("endpoints", {}).items():
+        current = report["endpoints"].get(name)
+        if current is None:
+            regressions.append(f"{name}: no requests in this run")
+            continue
+        for key in LATENCY_KEYS:
+            if base.get(key) and current[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {current[key]:.3f}s > baseline {base[key]:.3f}s "
+                    f"(+{tolerance:.0%})"
+                )
+        if current["error_rate"] > base.get("error_rate", 0.0) + error_tolerance:
+            regressions.append(
+                f"{name}: error rate {current['error_rate']:.2%} > baseline "
+                f"{base.get('error_rate', 0.0):.2%} (+{error_tolerance:.2%})"
+            )
+        if base.get("throughput") and current["throughput"] < base["throughput"] * (
+            1 - tolerance
+        ):
+            regressions.append(
+                f"{name}: throughput {current['throughput']:.2f}/s < baseline "
+                f"{base['throughput']:.2f}/s (-{tolerance:.0%})"
+            )
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 78)
+    print(
+        f"{report['requests']} requests in {report['elapsed']:.2f}s "
+        f"({report['throughput']:.2f} req/s)"
+    )
+    print("=" * 78)
+    print(
+        f"{'endpoint':<16}{'reqs':>7}{'err%':>8}{'rps':>8}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    )
+    for name, stats in report["endpoints"].items():
+        print(
+            f"{name:<16}{stats['requests']:>7}{stats['error_rate']:>8.1%}"
+            f"{stats['throughput']:>8.2f}{stats['p50']:>9.3f}{stats['p95']:>9.3f}"
+            f"{stats['p99']:>9.3f}{stats['max']:>9.3f}"
+        )
+    if report["error_kinds"]:
+        print(f"errors: {report['error_kinds']}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Kiosk backend load generator")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent kiosks")
+    parser.add_argument("--iterations", type=int, default=1, help="scripts per kiosk")
+    parser.add_argument("--turns", type=int, default=0, help="limit turns per script")
+    parser.add_argument(
+        "--scripts", nargs="*", choices=sorted(BOOKING_SCRIPTS), help="scripts to use"
+    )
+    parser.add_argument("--think-time", type=float, default=0.0, help="max seconds")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--no-tts", dest="tts", action="store_false")
+    parser.add_argument("--no-extract", dest="extract", action="store_false")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="drive api.app in this process instead of --base-url",
+    )
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--baseline", help="baseline report to compare against")
+    parser.add_argument("--save-baseline", help="store this run as the new baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed latency/throughput drift"
+    )
+    parser.add_argument(
+        "--error-tolerance",
+        type=float,
+        default=0.01,
+        help="allowed error rate increase",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = build_parser().parse_args(argv)
+    transport = None
+    if options.in_process:
+        from api.app import app
+
+        transport = httpx.ASGITransport(app=app)
+    report = asyncio.run(run_load(options, transport))
+    print_report(report)
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if options.save_baseline:
+        with open(options.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Baseline saved to {options.save_baseline}")
+
+    if options.baseline:
+        with open(options.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(
+            report, baseline, options.tolerance, options.error_tolerance
+        )
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("✅ Within baseline thresholds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI, ElevenLabs and Ollama APIs
+Serves chat completions (with streaming), TTS streaming and Ollama chat with
+configurable latency, error rates and canned or scripted replies, so the app
+can be load tested and benchmarked with no network access.
+
+    python mock_upstream_server.py --port 8900 --latency lognormal:-1.2,0.4 --error-rate 0.02
+
+    OPENAI_BASE_URL=http://localhost:8900/v1 \
+    ELEVENLABS_BASE_URL=http://localhost:8900 \
+    OLLAMA_BASE_URL=http://localhost:8900 \
+    uvicorn api.app:app
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+PROVIDERS = ("openai", "elevenlabs", "ollama")
+
+DEFAULT_CHAT_REPLY = {
+    "messages": [
+        {
+            "text": "سلام! به فرودگاه امام خوش آمدید. لطفاً فرودگاه مبدأ را بفرمایید.",
+            "facialExpression": "smile",
+            "animation": "Talking_0",
+        }
+    ]
+}
+
+DEFAULT_EXTRACTION_REPLY = {
+    "airportName": "Imam Khomeini",
+    "travelType": "departure",
+    "travelDate": "1403/05/01",
+    "buyer_Phone": "09120000000",
+    "passengerCount": 1,
+    "flightNumber": "IR123",
+    "passengers": [
+        {
+            "name": "Ali",
+            "lastName": "Ahmadi",
+            "nationalId": "0012345678",
+            "passportNumber": "",
+            "nationality": "Iranian",
+            "luggageCount": 1,
+            "passengerType": "adult",
+            "gender": "male",
+        }
+    ],
+    "additionalInfo": "",
+}
+
+# Matched in order against the last user message; the first match wins
+DEFAULT_SCRIPT = {
+    "rules": [
+        {"match": r"Extract all passenger", "reply": DEFAULT_EXTRACTION_REPLY},
+    ],
+    "default": DEFAULT_CHAT_REPLY,
+}
+
+AUDIO_HEADERS = {"mp3": b"ID3\x04\x00\x00\x00\x00\x00\x00", "opus": b"OggS"}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Latency distribution in seconds: ``0.2`` / ``fixed:0.2``,
+    ``uniform:0.1,0.5``, ``normal:0.3,0.05``, ``lognormal:-1.2,0.4``
+    or ``exp:0.3`` (mean). Samples are never negative.
+    """
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    values = [float(v) for v in args.split(",")]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+        "exp": lambda: random.expovariate(1 / values[0]) if values[0] else 0.0,
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+class ProviderConfig:
+    """Behaviour of one mocked provider; every field can be changed at runtime"""
+
+    FIELDS = ("latency", "chunk_delay", "chunks", "error_rate", "error_status")
+
+    def __init__(
+        self,
+        latency: str = "0",
+        chunk_delay: str = "0",
+        chunks: int = 4,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+    ):
+        self.update(
+            latency=latency,
+            chunk_delay=chunk_delay,
+            chunks=chunks,
+            error_rate=error_rate,
+            error_status=error_status,
+        )
+
+    def update(self, **values: Any) -> None:
+        for name, value in values.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+        self._latency = parse_latency(self.latency)
+        self._chunk_delay = parse_latency(self.chunk_delay)
+
+    def first_byte_delay(self) -> float:
+        return self._latency()
+
+    def next_chunk_delay(self) -> float:
+        return self._chunk_delay()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class MockUpstream:
+    """Shared state of the stand-in server: settings, scripts and counters"""
+
+    def __init__(
+        self,
+        configs: Optional[Dict[str, ProviderConfig]] = None,
+        script: Optional[Dict[str, Any]] = None,
+    ):
+        self.configs = {name: ProviderConfig() for name in PROVIDERS}
+        self.configs.update(configs or {})
+        self.script = script or DEFAULT_SCRIPT
+        self._rules = [
+            (re.compile(rule["match"]), rule["reply"])
+            for rule in self.script.get("rules", [])
+        ]
+        self._lock = threading.Lock()
+        self._counts = {
+            name: {"requests": 0, "errors": 0, "bytes": 0} for name in PROVIDERS
+        }
+
+    def count(self, provider: str, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[provider][key] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {name: dict(c) for name, c in self._counts.items()}
+        return {
+            "counts": counts,
+            "config": {name: c.as_dict() for name, c in self.configs.items()},
+        }
+
+    async def admit(self, provider: str) -> Optional[Response]:
+        """Wait the time-to-first-byte; an error response when this call should fail"""
+        config = self.configs[provider]
+        self.count(provider, "requests")
+        await asyncio.sleep(config.first_byte_delay())
+        if random.random() >= config.error_rate:
+            return None
+        self.count(provider, "errors")
+        headers = {"Retry-After": "1"} if config.error_status == 429 else {}
+        return JSONResponse(
+            {"error": {"message": "Injected failure", "type": "mock_error"}},
+            status_code=config.error_status,
+            headers=headers,
+        )
+
+    def reply_for(self, messages: List[Dict[str, Any]]) -> str:
+        last_user = next(
+            (
+                m.get("content", "")
+                for m in reversed(messages)
+                if m.get("role") == "user"
+            ),
+            "",
+        )
+        reply = self.script.get("default", DEFAULT_CHAT_REPLY)
+        for pattern, scripted in self._rules:
+            if pattern.search(str(last_user)):
+                reply = scripted
+                break
+        if not isinstance(reply, str):
+            reply = json.dumps(reply, ensure_ascii=False)
+        return reply
+
+    async def pieces(self, provider: str, items: List[Any]):
+        config = self.configs[provider]
+        for index, item in enumerate(items):
+            if index:
+                await asyncio.sleep(config.next_chunk_delay())
+            yield item
+
+
+def split_text(text: str, parts: int) -> List[str]:
+    size = max(1, -(-len(text) // max(1, parts)))
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+def count_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(str(m.get("content", "")).split()) for m in messages)
+
+
+def fake_audio(text: str, output_format: Optional[str], parts: int) -> List[bytes]:
+    """Audio-looking bytes: roughly 1 KB per 10 characters, with a real header"""
+    codec = (output_format or "mp3").split("_")[0]
+    body = AUDIO_HEADERS.get(codec, b"") + b"\x00" * (100 * max(len(text), 1))
+    size = max(1, -(-len(body) // max(1, parts)))
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+def create_app(mock: Optional[MockUpstream] = None) -> FastAPI:
+    mock = mock or MockUpstream()
+    app = FastAPI(title="Mock upstreams")
+    app.state.mock = mock
+
+    # --------------------
+    # OpenAI
+    # --------------------
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = await mock.admit("openai")
+        if failure is not None:
+            return failure
+
+        model = body.get("model", "mock-model")
+        content = mock.reply_for(body.get("messages", []))
+        usage = {
+            "prompt_tokens": count_tokens(body.get("messages", [])),
+            "completion_tokens": len(content.split()),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            mock.count("openai", "bytes", len(content.encode("utf-8")))
+            return {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        parts = split_text(content, mock.configs["openai"].chunks)
+
+        async def events():
+            async for part in mock.pieces("openai", parts):
+                mock.count("openai", "bytes", len(part.encode("utf-8")))
+                chunk = {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": part}}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            if include_usage:
+                final = {"id": "chatcmpl-mock", "choices": [], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # --------------------
+    # ElevenLabs
+    # --------------------
+    async def speech(voice_id: str, request: Request):
+        body = await request.json()
+        failure = await mock.admit("elevenlabs")
+        if failure is not None:
+            return failure
+        output_format = request.query_params.get("output_format")
+        chunks = fake_audio(
+            body.get("text", ""), output_format, mock.configs["elevenlabs"].chunks
+        )
+
+        async def audio():
+            async for chunk in mock.pieces("elevenlabs", chunks):
+                mock.count("elevenlabs", "bytes", len(chunk))
+                yield chunk
+
+        media_type = (
+            "audio/ogg" if (output_format or "").startswith("opus") else "audio/mpeg"
+        )
+        return StreamingResponse(audio(), media_type=media_type)
+
+    app.add_api_route("/v1/text-to-speech/{voice_id}", speech, methods=["POST"])
+    app.add_api_route("/v1/text-to-speech/{voice_id}/stream", speech, methods=["POST"])
+
+    @app.get("/v1/voices")
+    async def voices():
+        failure = await mock.admit("elevenlabs")
+        if failure is not None:
+            return failure
+        return {
+            "voices": [
+                {"voice_id": "mock-voice-fa", "name": "Mock Persian"},
+                {"voice_id": "mock-voice-en", "name": "Mock English"},
+            ]
+        }
+
+    # --------------------
+    # Ollama
+    # --------------------
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        failure = await mock.admit("ollama")
+        if failure is not None:
+            return failure
+
+        model = body.get("model", "mock-model")
+        content = mock.reply_for(body.get("messages", []))
+        done = {
+            "model": model,
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "prompt_eval_count": count_tokens(body.get("messages", [])),
+            "eval_count": len(content.split()),
+        }
+        if body.get("stream") is False:
+            done["message"]["content"] = content
+            return done
+
+        parts = split_text(content, mock.configs["ollama"].chunks)
+
+        async def lines():
+            async for part in mock.pieces("ollama", parts):
+                mock.count("ollama", "bytes", len(part.encode("utf-8")))
+                line = {
+                    "model": model,
+                    "message": {"role": "assistant", "content": part},
+                    "done": False,
+                }
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            yield json.dumps(done) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    # --------------------
+    # Control
+    # --------------------
+    @app.get("/__mock__/stats")
+    async def stats():
+        return mock.stats()
+
+    @app.post("/__mock__/config")
+    async def configure(request: Request):
+        """Change provider settings at runtime, e.g. {"openai": {"error_rate": 0.5}}"""
+        updates = await request.json()
+        try:
+            for provider, values in updates.items():
+                mock.configs[provider].update(**values)
+        except (KeyError, ValueError) as e:
+            return JSONResponse({"detail": str(e)}, status_code=400)
+        return mock.stats()["config"]
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="0", help="time to first byte")
+    parser.add_argument("--chunk-delay", default="0", help="delay between chunks")
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument(
+        "--config", help='JSON file with per-provider overrides: {"openai": {...}}'
+    )
+    parser.add_argument(
+        "--script",
+        help='JSON file: {"rules": [{"match": ..., "reply": ...}], "default": ...}',
+    )
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    defaults = dict(
+        latency=args.latency,
+        chunk_delay=args.chunk_delay,
+        chunks=args.chunks,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    overrides = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    configs = {
+        name: ProviderConfig(**{**defaults, **overrides.get(name, {})})
+        for name in PROVIDERS
+    }
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    import uvicorn
+
+    uvicorn.run(
+        create_app(MockUpstream(configs, script)), host=args.host, port=args.port
+    )
+
+
+if __name__ == "__main__":
+    main()
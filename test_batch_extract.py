@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline Batch-API extraction runner
+Runs the whole job against a local stand-in for the Batch endpoints (no network)
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import tempfile
+from email import message_from_bytes
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from api.schemas.extract_info_schema import ExtractInfoRequest
+from api.services.batch_extract_service import BatchExtractionRunner
+from api.services.extract_info_service import parse_extraction
+
+
+def create_batch_stand_in() -> FastAPI:
+    """Minimal stand-in for /v1/files and /v1/batches"""
+    stand_in = FastAPI()
+    files = {}
+    batches = {}
+
+    @stand_in.post("/v1/files")
+    async def upload_file(request: Request):
+        body = await request.body()
+        content_type = request.headers["content-type"].encode()
+        form = message_from_bytes(b"Content-Type: " + content_type + b"\r\n\r\n" + body)
+        content = b""
+        for part in form.walk():
+            if part.get_filename():
+                content = part.get_payload(decode=True)
+        file_id = f"file-{uuid.uuid4().hex[:8]}"
+        files[file_id] = content.decode("utf-8")
+        return {"id": file_id, "object": "file", "purpose": "batch"}
+
+    @stand_in.post("/v1/batches")
+    async def create_batch(request: Request):
+        payload = await request.json()
+        batch_id = f"batch-{uuid.uuid4().hex[:8]}"
+        batches[batch_id] = {
+            "id": batch_id,
+            "status": "validating",
+            "input_file_id": payload["input_file_id"],
+            "polls": 0,
+        }
+        return batches[batch_id]
+
+    @stand_in.get("/v1/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        batch = batches[batch_id]
+        batch["polls"] += 1
+        # Complete on the second poll so the runner has to wait once
+        if batch["polls"] >= 2 and batch["status"] != "completed":
+            output_lines = []
+            for line in files[batch["input_file_id"]].splitlines():
+                item = json.loads(line)
+                conversation = item["body"]["messages"][1]["content"]
+                content = json.dumps(
+                    {
+                        "airportName": "Imam Khomeini",
+                        "travelType": "departure",
+                        "travelDate": "2024-08-15",
+                        "passengerCount": 1,
+                        "flightNumber": "ir ۷۰۵",
+                        "buyer_Phone": "",
+                        "passengers": [
+                            {
+                                "name": "علی",
+                                "lastName": "احمدی",
+                                "nationalId": "123 456 7890",
+                                "passportNumber": "A1234 5678",
+                                "nationality": "ایرانی",
+                                "luggageCount": 2,
+                                "passengerType": "adult",
+                                "gender": "male",
+                            }
+                        ],
+                    },
+                    ensure_ascii=False,
+                )
+                if "BROKEN" in conversation:
+                    content = "not json at all"
+                output_lines.append(
+                    json.dumps(
+                        {
+                            "custom_id": item["custom_id"],
+                            "response": {
+                                "status_code": 200,
+                                "body": {
+                                    "choices": [{"message": {"content": content}}]
+                                },
+                            },
+                            "error": None,
+                        },
+                        ensure_ascii=False,
+                    )
+                )
+            output_id = f"file-{uuid.uuid4().hex[:8]}"
+            files[output_id] = "\n".join(output_lines)
+            batch.update(status="completed", output_file_id=output_id)
+        counts = {"total": 0, "completed": 0}
+        return {**batch, "request_counts": counts}
+
+    @stand_in.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        return PlainTextResponse(files[file_id])
+
+    return stand_in
+
+
+async def run_batch_job():
+    conversations = {
+        "conv-1": ExtractInfoRequest(
+            messages=[
+                {"text": "شماره پرواز رو بفرمایید.", "sender": "AVATAR"},
+                {"text": "IR۷۰۵", "sender": "CLIENT"},
+                {"text": "شماره تماس رو بفرمایید.", "sender": "AVATAR"},
+                {"text": "۰۹۱۲ ۳۴۵ ۶۷۸۹", "sender": "CLIENT"},
+            ]
+        ),
+        "conv-2": ExtractInfoRequest(messages=[{"text": "BROKEN", "sender": "CLIENT"}]),
+    }
+
+    transport = httpx.ASGITransport(app=create_batch_stand_in())
+    async with httpx.AsyncClient(transport=transport) as client:
+        runner = BatchExtractionRunner(
+            base_url="http://stand-in/v1", client=client, poll_interval=0
+        )
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = await runner.run(conversations, work_dir=work_dir, timeout=10)
+            with open(os.path.join(work_dir, "requests.jsonl"), encoding="utf-8") as f:
+                request_lines = [json.loads(line) for line in f]
+    return request_lines, results
+
+
+def test_batch_extract():
+    """Test the full batch job against the local stand-in"""
+    print("🧪 Testing Batch-API extraction runner")
+    print("=" * 50)
+
+    request_lines, results = asyncio.run(run_batch_job())
+
+    print(f"Requests written: {len(request_lines)}")
+    assert [line["custom_id"] for line in request_lines] == ["conv-1", "conv-2"]
+    assert all(line["url"] == "/v1/chat/completions" for line in request_lines)
+
+    result = results["conv-1"]["result"]
+    print(f"conv-1 result: {json.dumps(result, ensure_ascii=False)}")
+    assert result["flightNumber"] == "IR705"
+    assert result["buyer_Phone"] == "09123456789"
+    passenger = result["passengers"][0]
+    assert passenger["nationalId"] == "1234567890"
+    assert passenger["passportNumber"] == "A12345678"
+    assert passenger["nationality"] == "Iranian"
+    assert passenger["name"].isascii()
+
+    print(f"conv-2 result: {results['conv-2']}")
+    assert "error" in results["conv-2"]
+
+    print("✅ Batch extraction runner works against the stand-in")
+
+
+def test_phone_ranking_per_parse_path():
+    """Clean JSON prefers +98; the fallback path keeps prefix-then-length ranking"""
+    print("🧪 Testing buyer phone ranking on both parse paths...")
+    messages = ExtractInfoRequest(
+        messages=[
+            {"text": "+98 912 345 6789", "sender": "CLIENT"},
+            {"text": "091234567890123", "sender": "CLIENT"},
+        ]
+    )
+
+    clean = parse_extraction('{"buyer_Phone": ""}', messages)
+    assert clean["buyer_Phone"] == "+989123456789"
+
+    fallback = parse_extraction('Result: {"buyer_Phone": ""}', messages)
+    assert fallback["buyer_Phone"] == "091234567890123"
+
+    print("✅ Each parse path keeps its own phone ranking")
+
+
+if __name__ == "__main__":
+    test_batch_extract()
+    test_phone_ranking_per_parse_path()
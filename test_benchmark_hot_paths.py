@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the hot path microbenchmarks (benchmark_hot_paths.py)
+Checks the fixtures, the hoisted location detector and the JSON comparison
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from benchmark_hot_paths import (
+    PASSENGER_COUNTS,
+    booking_state,
+    compare,
+    run_benchmarks,
+)
+from api.services.openai_service import OpenAIService
+
+
+def test_detect_location():
+    print("🧪 Testing hot path benchmarks")
+    print("=" * 50)
+    service = OpenAIService()
+    assert service._detect_location("Where is the Prayer Room?", "en") == "prayer room"
+    assert service._detect_location("is there a giftshop", "en") == "shop"
+    assert (
+        service._detect_location("ببخشید سرویس‌بهداشتی کجاست", "fa") == "سرویس بهداشتی"
+    )
+    assert service._detect_location("نمازخانه كجاست", "fa") == "نمازخانه"
+    assert service._detect_location("IR123", "fa") is None
+    print("✅ Location detection matches the inline version it replaced")
+
+
+def test_fixture_states():
+    service = OpenAIService()
+    for passengers in PASSENGER_COUNTS:
+        guidance = service._build_state_guidance("en", booking_state("en", passengers))
+        assert f"Passenger {passengers}" in guidance
+        assert f"Next required field to ask: Passenger {passengers}" in guidance
+    print("✅ Passenger fixtures stop at the last passenger")
+
+
+def test_report_and_compare():
+    report = run_benchmarks(number=5, repeat=2, name_filter="[en")
+    assert report["meta"]["number"] == 5 and report["meta"]["repeat"] == 2
+    assert "build_state_guidance[en,9p]" in report["results"]
+    assert not any("[fa" in name for name in report["results"])
+    for stats in report["results"].values():
+        assert 0 < stats["min_us"] <= stats["median_us"]
+    print(f"✅ {len(report['results'])} cases measured")
+
+    assert compare(report, report, 0.1) == ([], [])
+    slower = {
+        "results": {
+            name: {**stats, "min_us": stats["min_us"] * 3}
+            for name, stats in report["results"].items()
+        }
+    }
+    regressions, improvements = compare(slower, report, 0.1)
+    assert len(regressions) == len(report["results"]) and not improvements
+    regressions, improvements = compare(report, slower, 0.1)
+    assert not regressions and len(improvements) == len(report["results"])
+    print("✅ Regressions and improvements are told apart")
+
+
+if __name__ == "__main__":
+    test_detect_location()
+    test_fixture_states()
+    test_report_and_compare()
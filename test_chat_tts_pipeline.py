@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the pipelined chat + TTS endpoint (/assistant/chat/stream)
+Chat and ElevenLabs are replaced by fakes, so no API key or network is needed
+"""
+
+import os
+import json
+import time
+import base64
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app, tts_service
+from api.services.tts_cache import TTSAudioCache
+
+# Synthesis time per message; the first message is the slowest
+DELAYS = {"پیام اول": 0.3, "پیام دوم": 0.1, "پیام سوم": 0.2}
+
+
+class FakeTextToSpeech:
+    async def stream(self, **kwargs):
+        if kwargs["text"] == "fail":
+            raise RuntimeError("upstream error")
+        await asyncio.sleep(DELAYS.get(kwargs["text"], 0))
+        yield kwargs["text"].encode("utf-8")
+
+
+class FakeClient:
+    def __init__(self):
+        self.text_to_speech = FakeTextToSpeech()
+
+
+def fake_response(texts):
+    def get_assistant_response(self, message, session_id, language, backend=None):
+        return [
+            {"text": t, "facialExpression": "smile", "animation": "Talking"}
+            for t in texts
+        ], session_id
+
+    return get_assistant_response
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def _post(payload):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/assistant/chat/stream", json=payload, timeout=10)
+
+
+def run(texts, payload):
+    tts_service.client = FakeClient()
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+    with patch(
+        "api.services.openai_service.OpenAIService.get_assistant_response",
+        fake_response(texts),
+    ):
+        start = time.perf_counter()
+        response = asyncio.run(_post(payload))
+        elapsed = time.perf_counter() - start
+    return response, elapsed
+
+
+def test_pipeline_order_and_concurrency():
+    print("🧪 Testing chat + TTS pipeline")
+    print("=" * 50)
+
+    texts = list(DELAYS)
+    response, elapsed = run(texts, {"message": "سلام", "session_id": "pipe-1"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    print(f"  events: {[e for e, _ in events]} in {elapsed:.2f}s")
+
+    assert events[0] == ("session", {"session_id": "pipe-1"})
+    messages = [data for event, data in events if event == "message"]
+    assert [m["index"] for m in messages] == [0, 1, 2]
+    for text, message in zip(texts, messages):
+        assert message["text"] == text
+        assert message["facialExpression"] == "smile"
+        assert base64.b64decode(message["audio"]) == text.encode("utf-8")
+    assert events[-1] == ("done", {"count": 3})
+
+    # Concurrent synthesis: roughly the slowest message, not the sum
+    assert elapsed < sum(DELAYS.values())
+    print("✅ Audio is synthesized concurrently and delivered in message order")
+
+
+def test_failed_message_keeps_stream_going():
+    response, _ = run(["پیام اول", "fail", "پیام دوم"], {"message": "سلام"})
+    messages = [d for e, d in parse_sse(response.text) if e == "message"]
+    print(f"  audio per message: {[m['audio'] is not None for m in messages]}")
+    assert [m["audio"] is not None for m in messages] == [True, False, True]
+    print("✅ A failed synthesis leaves that message without audio")
+
+
+if __name__ == "__main__":
+    test_pipeline_order_and_concurrency()
+    test_failed_message_keeps_stream_going()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent chat WebSocket (/assistant/ws/{session_id})
+Chat and ElevenLabs are replaced by fakes, so no API key or network is needed
+"""
+
+import os
+import json
+import asyncio
+import tempfile
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+from api.app import app, tts_service
+from api.config.performance_config import PerformanceConfig
+from api.services.tts_cache import TTSAudioCache
+
+
+class FakeTextToSpeech:
+    def __init__(self, chunks_per_text=2):
+        self.chunks_per_text = chunks_per_text
+        self.texts = []
+
+    async def stream(self, **kwargs):
+        self.texts.append(kwargs["text"])
+        for index in range(self.chunks_per_text):
+            yield f"{kwargs['text']}-{index}|".encode("utf-8")
+
+
+class FakeClient:
+    def __init__(self, chunks_per_text=2):
+        self.text_to_speech = FakeTextToSpeech(chunks_per_text)
+        tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+
+
+calls = []
+
+
+def fake_get_assistant_response(self, message, session_id, language, backend=None):
+    calls.append((message, session_id, language))
+    return [
+        {"text": f"{message} / پاسخ {i}", "facialExpression": "smile"} for i in range(2)
+    ], session_id
+
+
+async def drive(path: str, messages: list, last: str, gate: asyncio.Event = None):
+    """
+    Raw ASGI WebSocket client: sends ``messages`` and collects frames until a
+    frame of type ``last``. Audio isn't read until ``gate`` is set.
+    """
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "scheme": "ws",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+        "subprotocols": [],
+    }
+    incoming = asyncio.Queue()
+    incoming.put_nowait({"type": "websocket.connect"})
+    for message in messages:
+        if isinstance(message, bytes):
+            incoming.put_nowait({"type": "websocket.receive", "bytes": message})
+            continue
+        text = message if isinstance(message, str) else json.dumps(message)
+        incoming.put_nowait({"type": "websocket.receive", "text": text})
+    frames = []
+
+    async def send(event):
+        if event["type"] != "websocket.send":
+            return
+        if event.get("bytes") is not None:
+            if gate is not None:
+                await gate.wait()
+            frames.append(event["bytes"])
+            return
+        frame = json.loads(event["text"])
+        frames.append(frame)
+        if frame["type"] == last:
+            incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    task = asyncio.create_task(app(scope, incoming.get, send))
+    return task, frames
+
+
+def kinds(frames):
+    return [f["type"] if isinstance(f, dict) else "audio" for f in frames]
+
+
+def test_multi_turn_conversation():
+    print("🧪 Testing chat WebSocket")
+    print("=" * 50)
+    tts_service.client = FakeClient()
+    calls.clear()
+
+    async def scenario():
+        task, frames = await drive(
+            "/assistant/ws/kiosk-1",
+            [
+                {"message": "سلام", "language": "en"},
+                {"type": "ping"},
+                # The language chosen in the first turn is kept for the session
+                {"message": "دوباره"},
+                "not json",
+            ],
+            last="error",
+        )
+        await asyncio.wait_for(task, timeout=5)
+        return frames
+
+    with patch(
+        "api.services.openai_service.OpenAIService.get_assistant_response",
+        fake_get_assistant_response,
+    ):
+        frames = asyncio.run(scenario())
+
+    turn = ["message", "audio", "audio", "audio_end"] * 2 + ["done"]
+    print(f"  frames: {kinds(frames)}")
+    assert kinds(frames) == ["session"] + turn + ["pong"] + turn + ["error"]
+    assert frames[0] == {"type": "session", "session_id": "kiosk-1"}
+    assert frames[1]["text"] == "سلام / پاسخ 0"
+    assert frames[1]["facialExpression"] == "smile"
+    assert b"".join(frames[2:4]) == "سلام / پاسخ 0-0|سلام / پاسخ 0-1|".encode()
+    assert frames[4] == {"type": "audio_end", "index": 0, "error": None}
+    assert frames[9] == {"type": "done", "count": 2}
+    assert calls == [("سلام", "kiosk-1", "en"), ("دوباره", "kiosk-1", "en")]
+    print("✅ Several turns share one connection and session state")
+
+
+def test_slow_client_backpressure():
+    client = FakeClient(chunks_per_text=40)
+    tts_service.client = client
+    original = PerformanceConfig.WS_SEND_QUEUE_SIZE
+    PerformanceConfig.WS_SEND_QUEUE_SIZE = 4
+
+    async def scenario():
+        gate = asyncio.Event()
+        task, frames = await drive(
+            "/assistant/ws/kiosk-slow", [{"message": "سلام"}], "done", gate
+        )
+        await asyncio.sleep(0.3)
+        # The client isn't reading audio: the second message must not start yet
+        started_while_blocked = list(client.text_to_speech.texts)
+        gate.set()
+        await asyncio.wait_for(task, timeout=5)
+        return started_while_blocked, frames
+
+    try:
+        with patch(
+            "api.services.openai_service.OpenAIService.get_assistant_response",
+            fake_get_assistant_response,
+        ):
+            started_while_blocked, frames = asyncio.run(scenario())
+    finally:
+        PerformanceConfig.WS_SEND_QUEUE_SIZE = original
+
+    audio = [f for f in frames if isinstance(f, bytes)]
+    print(
+        f"  synthesis started while blocked: {len(started_while_blocked)}, "
+        f"audio frames delivered: {len(audio)}"
+    )
+    assert started_while_blocked == ["سلام / پاسخ 0"]
+    assert len(audio) == 80
+    print("✅ A slow reader pauses the turn instead of buffering it")
+
+
+def test_binary_frame_is_rejected():
+    """A binary frame gets an error frame and the connection stays usable"""
+
+    async def scenario():
+        task, frames = await drive(
+            "/assistant/ws/kiosk-binary", [b"\x00\x01", {"type": "ping"}], "pong"
+        )
+        await asyncio.wait_for(task, timeout=5)
+        return frames
+
+    frames = asyncio.run(scenario())
+    print(f"  frames: {frames}")
+    assert kinds(frames) == ["session", "error", "pong"]
+    assert "Binary" in frames[1]["detail"]
+    print("✅ Binary frames are rejected without closing the socket")
+
+
+if __name__ == "__main__":
+    test_multi_turn_conversation()
+    test_slow_client_backpressure()
+    test_binary_frame_is_rejected()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenAI circuit breaker and Ollama failover
+Upstream calls are patched, so no server, OpenAI key or Ollama is needed
+"""
+
+import os
+import json
+import time
+from unittest.mock import patch
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from api.services.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from api.services.openai_service import OpenAIService
+from api.services.llm_backend import get_llm_backend
+from api.services.token_usage import token_usage
+from api.config.performance_config import PerformanceConfig
+
+
+def test_breaker_opens_and_recovers():
+    """Breaker opens on error rate and closes after a successful probe"""
+    probe_results = [False, True]
+    breaker = CircuitBreaker(
+        "test",
+        window=4,
+        min_calls=4,
+        probe=lambda: probe_results.pop(0),
+        probe_interval=0.05,
+    )
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    print(f"After 3/4 failures: {breaker.stats()}")
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    for _ in range(50):
+        if breaker.state == CLOSED:
+            break
+        time.sleep(0.02)
+    print(f"After probes: {breaker.stats()}")
+    assert breaker.state == CLOSED
+    assert breaker.stats()["probe_failures"] == 1
+    print("✅ Breaker opens on errors and recovers via probe")
+
+
+def test_breaker_opens_on_latency():
+    """Slow successes also open the breaker"""
+    breaker = CircuitBreaker("slow", window=4, min_calls=4, latency_threshold=1.0)
+    for _ in range(2):
+        breaker.record_success(0.2)
+        breaker.record_success(5.0)
+    print(f"Slow calls: {breaker.stats()}")
+    assert breaker.state == OPEN
+    print("✅ Breaker opens on slow calls")
+
+
+def test_failover_to_ollama():
+    """While the breaker is open, turns are answered by Ollama"""
+    service = OpenAIService()
+    service.breaker.reset()
+    session_id = "test_failover_001"
+    service.clear_memory(session_id)
+
+    ollama_reply = json.dumps(
+        {"messages": [{"text": "سلام، از سرور محلی جواب می‌دهم."}]},
+        ensure_ascii=False,
+    )
+    sent = {}
+
+    def fake_ollama(
+        self, messages, timeout=120, json_mode=False, model=None, options=None
+    ):
+        sent.update(messages=messages, timeout=timeout, options=options)
+        yield {"message": {"content": ollama_reply}}
+        yield {"done": True, "prompt_eval_count": 120, "eval_count": 30}
+
+    def failing_openai(*args, **kwargs):
+        raise httpx.ConnectError("OpenAI unreachable")
+
+    with patch(
+        "api.services.ollamaService.OllamaService.events_sync", fake_ollama
+    ), patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json_sync",
+        failing_openai,
+    ), patch.object(
+        service.breaker, "probe", None
+    ):
+        for i in range(service.breaker.min_calls + 1):
+            messages, _ = service.get_assistant_response("سلام", session_id, "fa")
+            print(f"Turn {i + 1}: {messages[0]['text']} ({service.breaker.state})")
+            assert messages[0]["text"] == "سلام، از سرور محلی جواب می‌دهم."
+
+    assert service.breaker.state == OPEN
+    assert sent["messages"][0]["role"] == "system"
+    assert sent["messages"][-1] == {"role": "user", "content": "سلام"}
+    assert sent["timeout"] == PerformanceConfig.OLLAMA_FAILOVER_TIMEOUT
+    assert "num_predict" in sent["options"]
+    usage = token_usage.session(session_id)
+    print(f"Session usage: {usage['total']}")
+    assert usage["total"]["total_tokens"] == 150 * (service.breaker.min_calls + 1)
+    print(f"Failover stats: {service.failover_stats}")
+    assert service.failover_stats["ollama_turns"] >= service.breaker.min_calls + 1
+
+    service.breaker.reset()
+    service.clear_memory(session_id)
+    print("✅ Failover to Ollama works")
+
+
+def test_client_errors_do_not_fail_over():
+    """4xx responses are re-raised; only 429/5xx count against the breaker"""
+    print("🧪 Testing which upstream errors trip the breaker...")
+    service = OpenAIService()
+    service.breaker.reset()
+    payload = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "سلام"}],
+    }
+    ollama_calls = []
+
+    def fake_ollama(
+        self, messages, timeout=120, json_mode=False, model=None, options=None
+    ):
+        ollama_calls.append(messages)
+        reply = json.dumps({"messages": [{"text": "محلی"}]}, ensure_ascii=False)
+        yield {"message": {"content": reply}, "done": True}
+
+    def failing_openai(status):
+        def post(*args, **kwargs):
+            request = httpx.Request(
+                "POST", "https://api.openai.com/v1/chat/completions"
+            )
+            response = httpx.Response(status, request=request)
+            raise httpx.HTTPStatusError(
+                "upstream error", request=request, response=response
+            )
+
+        return post
+
+    with patch(
+        "api.services.ollamaService.OllamaService.events_sync", fake_ollama
+    ), patch.object(service.breaker, "probe", None):
+        with patch(
+            "api.services.upstream_client.HedgedUpstreamClient.post_json_sync",
+            failing_openai(400),
+        ):
+            try:
+                service._complete(payload, get_llm_backend("openai"))
+            except httpx.HTTPStatusError as e:
+                assert e.response.status_code == 400
+            else:
+                raise AssertionError("400 response was swallowed")
+        print(f"After 400: {service.breaker.stats()}")
+        assert service.breaker.stats()["window_calls"] == 0
+        assert ollama_calls == []
+
+        with patch(
+            "api.services.upstream_client.HedgedUpstreamClient.post_json_sync",
+            failing_openai(503),
+        ):
+            content = service._complete(payload, get_llm_backend("openai"))
+        print(f"After 503: {service.breaker.stats()}")
+        assert json.loads(content)["messages"][0]["text"] == "محلی"
+        assert service.breaker.stats()["error_rate"] == 1.0
+        assert len(ollama_calls) == 1
+
+    service.breaker.reset()
+    print("✅ Only upstream outages trip the breaker and fail over")
+
+
+if __name__ == "__main__":
+    test_breaker_opens_and_recovers()
+    test_breaker_opens_on_latency()
+    test_failover_to_ollama()
+    test_client_errors_do_not_fail_over()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for pooled, streaming-to-disk ElevenLabsService
+HTTP is served by a fake requests adapter, so no API key or network is needed
+"""
+
+import os
+import io
+import time
+import asyncio
+import tempfile
+import threading
+
+os.environ.setdefault("ELEVEN_LABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+import api.services.elevenlabs_service as elevenlabs_module
+from api.config import metrics
+from api.config.performance_config import PerformanceConfig
+from api.services.elevenlabs_service import ElevenLabsService
+from api.services.tts_cache import TTSAudioCache
+
+
+class FakeAdapter(BaseAdapter):
+    """Answers TTS posts with a streamed body; fails texts starting with 'fail'"""
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.requests = []
+        self.streamed = []
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, **kwargs):
+        with self._lock:
+            self.requests.append(request.body)
+            self.streamed.append(stream)
+        time.sleep(self.delay)
+        response = Response()
+        response.request = request
+        response.url = request.url
+        if b'"fail' in request.body:
+            response.status_code = 500
+            response.raw = io.BytesIO(b"error")
+        else:
+            response.status_code = 200
+            response.raw = io.BytesIO(b"ID3" + request.body * 1000)
+        return response
+
+    def close(self):
+        pass
+
+
+def make_service(delay=0.0):
+    elevenlabs_module.tts_cache = TTSAudioCache(tempfile.mkdtemp())
+    service = ElevenLabsService()
+    adapter = FakeAdapter(delay)
+    service.session.mount("https://", adapter)
+    return service, adapter
+
+
+def test_stream_to_disk_and_cache():
+    print("🧪 Testing ElevenLabsService streaming download")
+    print("=" * 50)
+
+    service, adapter = make_service()
+    out_dir = tempfile.mkdtemp()
+    first = os.path.join(out_dir, "a.mp3")
+    second = os.path.join(out_dir, "b.mp3")
+
+    service.text_to_speech("سلام", first)
+    service.text_to_speech("سلام", second)
+    print(f"  upstream requests: {len(adapter.requests)}, stream={adapter.streamed}")
+    assert adapter.streamed == [True]
+    with open(first, "rb") as f1, open(second, "rb") as f2:
+        content = f1.read()
+        assert content.startswith(b"ID3") and len(content) > 1000
+        assert f2.read() == content
+    assert sorted(os.listdir(out_dir)) == ["a.mp3", "b.mp3"]
+    model = PerformanceConfig.TTS_DEFAULT_MODEL
+    assert f'"model_id": "{model}"'.encode() in adapter.requests[0]
+    labels = f'provider="elevenlabs",model="{model}",outcome="ok"'
+    assert labels in metrics.registry.render()
+    print("✅ Audio is streamed to disk once and reused from the cache")
+
+
+def test_failure_leaves_no_partial_file():
+    service, _ = make_service()
+    out_dir = tempfile.mkdtemp()
+    target = os.path.join(out_dir, "broken.mp3")
+    try:
+        service.text_to_speech("fail please", target)
+    except Exception as e:
+        print(f"  failed as expected: {e}")
+    else:
+        raise AssertionError("expected an HTTP error")
+    assert os.listdir(out_dir) == []
+    print("✅ Failed downloads leave no partial files")
+
+
+def test_concurrent_identical_requests_share_download():
+    service, adapter = make_service(delay=0.2)
+    out_dir = tempfile.mkdtemp()
+    threads = [
+        threading.Thread(
+            target=service.text_to_speech,
+            args=("همان متن", os.path.join(out_dir, f"{i}.mp3")),
+        )
+        for i in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"  upstream requests for 3 identical calls: {len(adapter.requests)}")
+    assert len(adapter.requests) == 1
+    assert (
+        len(
+            set(
+                open(os.path.join(out_dir, n), "rb").read() for n in os.listdir(out_dir)
+            )
+        )
+        == 1
+    )
+    print("✅ Identical concurrent requests share one download")
+
+
+def test_batch_generation():
+    service, adapter = make_service(delay=0.1)
+    out_dir = tempfile.mkdtemp()
+    items = [(f"پیام شماره {i}", os.path.join(out_dir, f"{i}.mp3")) for i in range(8)]
+    items.append(("fail this one", os.path.join(out_dir, "fail.mp3")))
+
+    start = time.perf_counter()
+    results = asyncio.run(service.batch_text_to_speech(items, concurrency=4))
+    elapsed = time.perf_counter() - start
+    print(f"  {len(results)} jobs in {elapsed:.2f}s")
+
+    errors = [r for r in results if r["error"]]
+    assert len(errors) == 1 and errors[0]["file"].endswith("fail.mp3")
+    assert len(os.listdir(out_dir)) == 8
+    assert elapsed < 0.1 * len(items)
+    print("✅ Batch generation runs concurrently and reports failures per file")
+
+
+if __name__ == "__main__":
+    test_stream_to_disk_and_cache()
+    test_failure_leaves_no_partial_file()
+    test_concurrent_identical_requests_share_download()
+    test_batch_generation()
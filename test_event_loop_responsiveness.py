@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script showing TTS and voice listing don't block the event loop
+ElevenLabs is replaced by a slow async fake, so no API key or network is needed
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app, tts_service
+from api.services.tts_cache import TTSAudioCache
+
+UPSTREAM_SECONDS = 1.0
+
+
+class SlowTextToSpeech:
+    async def stream(self, **kwargs):
+        for _ in range(10):
+            await asyncio.sleep(UPSTREAM_SECONDS / 10)
+            yield b"chunk"
+
+
+class SlowVoices:
+    async def get_all(self):
+        await asyncio.sleep(UPSTREAM_SECONDS)
+        voice = SimpleNamespace(voice_id="v1", name="Nexa")
+        return SimpleNamespace(voices=[voice])
+
+
+class SlowClient:
+    def __init__(self):
+        self.text_to_speech = SlowTextToSpeech()
+        self.voices = SlowVoices()
+
+
+async def health_latencies(client, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/assistant/health")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+async def _run():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        idle = await health_latencies(client, 5)
+
+        busy_start = time.perf_counter()
+        tts_requests = [
+            asyncio.create_task(
+                client.post("/text-to-speech", json={"text": f"متن {i}"})
+            )
+            for i in range(8)
+        ]
+        voices_request = asyncio.create_task(client.get("/voices"))
+        await asyncio.sleep(0.1)
+        busy = await health_latencies(client, 10)
+        busy_window = time.perf_counter() - busy_start
+
+        responses = await asyncio.gather(*tts_requests, voices_request)
+    return idle, busy, busy_window, responses
+
+
+def test_health_latency_stays_flat():
+    print("🧪 Testing event loop responsiveness under TTS load")
+    print("=" * 50)
+
+    tts_service.client = SlowClient()
+    tts_service.voices.clear()
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+    idle, busy, busy_window, responses = asyncio.run(_run())
+
+    idle_max, busy_max = max(idle), max(busy)
+    print(f"  /assistant/health idle max: {idle_max * 1000:.1f}ms")
+    print(f"  /assistant/health during TTS max: {busy_max * 1000:.1f}ms")
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[-1].json() == {"voices": [{"id": "v1", "name": "Nexa"}]}
+    # Health checks ran while upstream calls were still in flight...
+    assert busy_window < UPSTREAM_SECONDS
+    # ...and none of them waited for ElevenLabs
+    assert busy_max < idle_max + 0.1
+    print("✅ Health checks are unaffected by in-flight TTS and voice listing")
+
+
+if __name__ == "__main__":
+    test_health_latency_stays_flat()
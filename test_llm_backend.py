@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Test script for the provider-agnostic LLM backends and per-route/per-request selection
+Upstreams are stand-ins (patched clients or httpx transports), so no server or key is needed
+"""
+
+import os
+import json
+import asyncio
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app
+from api.config.performance_config import PerformanceConfig
+from api.schemas.extract_info_schema import ExtractInfoRequest
+from api.services.extract_info_service import call_openai
+from api.services.llm_backend import (
+    OpenAICompatibleBackend,
+    OllamaBackend,
+    UnknownBackendError,
+    backend_for,
+    get_llm_backend,
+)
+from api.services.ollamaService import OllamaService
+from api.services.openai_service import OpenAIService
+
+MESSAGES = [{"role": "user", "content": "سلام"}]
+
+
+def sse(events):
+    lines = [f"data: {json.dumps(e)}" for e in events] + ["data: [DONE]"]
+    return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def test_openai_compatible_chat_and_stream():
+    print("🧪 Testing LLM backends")
+    print("=" * 50)
+    backend = OpenAICompatibleBackend("local", "small-model", "http://llm.test/v1")
+    posted = []
+
+    async def fake_post(self, url, headers, payload):
+        posted.append((self.name, url, payload))
+        return {
+            "model": payload["model"],
+            "choices": [{"message": {"content": '{"ok": true}'}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3},
+        }
+
+    with patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json", fake_post
+    ):
+        result = asyncio.run(
+            backend.chat(MESSAGES, json_mode=True, max_tokens=50, route="extract_info")
+        )
+    name, url, payload = posted[0]
+    assert name == "local_extract_info:small-model"
+    assert url == "http://llm.test/v1/chat/completions"
+    assert payload["response_format"] == {"type": "json_object"}
+    assert payload["max_tokens"] == 50 and "temperature" not in payload
+    assert result.content == '{"ok": true}'
+    assert result.usage == {
+        "prompt_tokens": 12,
+        "completion_tokens": 3,
+        "total_tokens": 15,
+    }
+
+    def handler(request):
+        body = json.loads(request.content)
+        assert body["stream"] is True
+        assert body["stream_options"] == {"include_usage": True}
+        return httpx.Response(
+            200,
+            content=sse(
+                [
+                    {"choices": [{"delta": {"content": "سلام"}}]},
+                    {"choices": [{"delta": {"content": " دنیا"}}]},
+                    {
+                        "choices": [],
+                        "usage": {"prompt_tokens": 5, "completion_tokens": 2},
+                    },
+                ]
+            ),
+        )
+
+    backend.async_transport = httpx.MockTransport(handler)
+
+    async def consume():
+        return [chunk async for chunk in backend.stream(MESSAGES)]
+
+    chunks = asyncio.run(consume())
+    assert "".join(c.content for c in chunks) == "سلام دنیا"
+    assert chunks[-1].usage["total_tokens"] == 7
+    print("✅ OpenAI-compatible backend: chat, JSON mode, streaming and usage")
+
+
+class OllamaStandIn:
+    def __init__(self, content):
+        self.content = content
+        self.payloads = []
+
+    def _body(self, request):
+        self.payloads.append(json.loads(request.content))
+        lines = [
+            {"message": {"content": self.content[: len(self.content) // 2]}},
+            {"message": {"content": self.content[len(self.content) // 2 :]}},
+            {"done": True, "prompt_eval_count": 20, "eval_count": 8},
+        ]
+        return "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+
+    def handle(self, request):
+        return httpx.Response(200, content=self._body(request))
+
+    async def handle_async(self, request):
+        return httpx.Response(200, content=self._body(request))
+
+
+def ollama_with(stand_in):
+    service = OllamaService()
+    service.transport = httpx.MockTransport(stand_in.handle)
+    service.async_transport = httpx.MockTransport(stand_in.handle_async)
+    service._sync_client = None
+    service._async_client = None
+    return service
+
+
+def test_ollama_backend_usage_and_options():
+    stand_in = OllamaStandIn('{"messages": [{"text": "سلام"}]}')
+    backend = OllamaBackend("ollama-test", "llama3", ollama_with(stand_in))
+
+    result = asyncio.run(backend.chat(MESSAGES, json_mode=True, max_tokens=64))
+    assert result.content == '{"messages": [{"text": "سلام"}]}'
+    assert result.usage == {
+        "prompt_tokens": 20,
+        "completion_tokens": 8,
+        "total_tokens": 28,
+    }
+    payload = stand_in.payloads[0]
+    assert payload["model"] == "llama3"
+    assert payload["format"] == "json"
+    assert payload["options"] == {"num_predict": 64}
+
+    sync_result = backend.chat_sync(MESSAGES, temperature=0)
+    assert sync_result.content == result.content
+    assert sync_result.usage["total_tokens"] == 28
+    assert stand_in.payloads[1]["options"] == {"temperature": 0}
+    print("✅ Ollama backend: async and blocking chat report usage")
+
+
+def test_selection_per_route_and_request():
+    assert backend_for("chat").name == "openai"
+    assert backend_for("extract_info").name == "openai"
+    assert backend_for("chat", "ollama").kind == "ollama"
+    assert get_llm_backend("ollama") is backend_for("extract_info", "ollama")
+    try:
+        backend_for("chat", "missing")
+        raise AssertionError("unknown backend accepted")
+    except UnknownBackendError:
+        pass
+
+    async def post(path, body):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.post(path, json=body)
+
+    chat = asyncio.run(post("/assistant/chat", {"message": "hi", "backend": "missing"}))
+    extract = asyncio.run(
+        post("/extractInfo/extract-info", {"messages": [], "backend": "missing"})
+    )
+    print(f"  unknown backend → chat {chat.status_code}, extract {extract.status_code}")
+    assert chat.status_code == 400
+    assert extract.status_code == 400
+    print("✅ Backends are chosen per route and per request")
+
+
+def test_chat_turn_on_requested_backend():
+    stand_in = OllamaStandIn('{"messages": [{"text": "پاسخ محلی"}]}')
+    ollama = get_llm_backend("ollama")
+    ollama.service = ollama_with(stand_in)
+
+    def unexpected_openai(self, url, headers, payload):
+        raise AssertionError("OpenAI must not be called")
+
+    service = OpenAIService()
+    session_id = "backend-select"
+    service.clear_memory(session_id)
+    with patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json_sync",
+        unexpected_openai,
+    ):
+        messages, _ = service.get_assistant_response(
+            "سلام", session_id, "fa", backend="ollama"
+        )
+    assert messages[0]["text"] == "پاسخ محلی"
+    assert stand_in.payloads[0]["format"] == "json"
+    service.clear_memory(session_id)
+    print("✅ A chat turn can run on the backend named in the request")
+
+
+def test_openai_compatible_backend_under_another_name():
+    """A vLLM/LiteLLM backend of type openai gets its own model, not OpenAI's"""
+    backends = {
+        **PerformanceConfig.LLM_BACKENDS,
+        "vllm": {
+            "type": "openai",
+            "base_url": "http://vllm.test/v1",
+            "model": "served-model",
+        },
+    }
+    service = OpenAIService()
+    service.breaker.reset()
+    session_id = "backend-vllm"
+    service.clear_memory(session_id)
+    posted = []
+
+    def fake_post_sync(self, url, headers, payload):
+        posted.append(("chat", url, headers, payload["model"]))
+        return {
+            "choices": [{"message": {"content": '{"messages": [{"text": "پاسخ"}]}'}}]
+        }
+
+    async def fake_post(self, url, headers, payload):
+        posted.append(("extract", url, headers, payload["model"]))
+        return {"choices": [{"message": {"content": "{}"}}]}
+
+    with patch.object(PerformanceConfig, "LLM_BACKENDS", backends), patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json_sync",
+        fake_post_sync,
+    ), patch("api.services.upstream_client.HedgedUpstreamClient.post_json", fake_post):
+        messages, _ = service.get_assistant_response(
+            "سلام", session_id, "fa", backend="vllm"
+        )
+        request = ExtractInfoRequest(messages=[])
+        asyncio.run(call_openai(request, backend_for("extract_info", "vllm")))
+    service.clear_memory(session_id)
+
+    print(f"  posted: {posted}")
+    assert messages[0]["text"] == "پاسخ"
+    # One chat call (no cheap-model cascade) and one extraction call
+    assert [route for route, *_ in posted] == ["chat", "extract"]
+    for _, url, headers, model in posted:
+        assert url == "http://vllm.test/v1/chat/completions"
+        # A keyless server is not asked for OPENAI_API_KEY
+        assert "Authorization" not in headers
+        assert model == "served-model"
+    # The OpenAI breaker only tracks the configured OpenAI backend
+    assert service.breaker.stats()["window_calls"] == 0
+    print("✅ OpenAI-compatible backends use their own configured model")
+
+
+if __name__ == "__main__":
+    test_openai_compatible_chat_and_stream()
+    test_ollama_backend_usage_and_options()
+    test_selection_per_route_and_request()
+    test_chat_turn_on_requested_backend()
+    test_openai_compatible_backend_under_another_name()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the async load generator (load_test.py)
+Runs a few kiosks against a tiny in-process app and checks the report and baseline compare
+"""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from load_test import (
+    BOOKING_SCRIPTS,
+    build_parser,
+    compare_to_baseline,
+    percentile,
+    run_load,
+)
+
+
+def make_app(fail_tts: bool = False) -> FastAPI:
+    app = FastAPI()
+
+    class Chat(BaseModel):
+        message: str
+        session_id: str
+        language: str = "fa"
+
+    @app.post("/assistant/chat")
+    async def chat(request: Chat):
+        await asyncio.sleep(0.001)
+        return {
+            "messages": {
+                "id": "1",
+                "sender": "AVATAR",
+                "text": f"ok: {request.message}",
+            },
+            "session_id": request.session_id,
+        }
+
+    @app.post("/text-to-speech")
+    async def tts(request: dict):
+        if fail_tts:
+            raise HTTPException(status_code=503, detail="TTS unavailable")
+        return {"text": request["text"]}
+
+    @app.post("/extractInfo/extract-info")
+    async def extract(request: dict):
+        return {"messages": request["messages"]}
+
+    return app
+
+
+def run(app: FastAPI, *argv: str):
+    options = build_parser().parse_args(["--base-url", "http://kiosk", *argv])
+    transport = httpx.ASGITransport(app=app)
+    return asyncio.run(run_load(options, transport))
+
+
+def test_percentiles():
+    print("🧪 Testing load test percentiles")
+    print("=" * 50)
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 0.5) == 50.0
+    assert percentile(samples, 0.95) == 95.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile(list(reversed(samples)), 1.0) == 100.0
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) is None
+    print("✅ Nearest-rank percentiles match")
+
+
+def test_report_structure():
+    report = run(make_app(), "--sessions", "4", "--turns", "3")
+    turns = 4 * 3
+    print(f"  {report['requests']} requests, {report['throughput']:.1f} req/s")
+    assert report["endpoints"]["chat"]["requests"] == turns
+    assert report["endpoints"]["text_to_speech"]["requests"] == turns
+    assert report["endpoints"]["extract_info"]["requests"] == 4
+    assert report["requests"] == turns * 2 + 4
+    for stats in report["endpoints"].values():
+        assert stats["errors"] == 0 and stats["error_rate"] == 0.0
+        assert (
+            stats["p50"] <= stats["p90"] <= stats["p95"] <= stats["p99"] <= stats["max"]
+        )
+        assert stats["throughput"] > 0
+    assert set(report["config"]["scripts"]) == set(BOOKING_SCRIPTS)
+    print("✅ Report covers every endpoint with ordered percentiles")
+
+    report = run(
+        make_app(), "--sessions", "2", "--turns", "2", "--no-tts", "--no-extract"
+    )
+    assert set(report["endpoints"]) == {"chat"}
+    print("✅ TTS and extract-info can be left out")
+
+
+def test_regression_detection():
+    baseline = run(make_app(), "--sessions", "2", "--turns", "2")
+    assert compare_to_baseline(baseline, baseline, 0.2, 0.01) == []
+
+    slower = {
+        "endpoints": {
+            name: {**stats, "p95": stats["p95"] * 2, "p99": stats["p99"] * 2}
+            for name, stats in baseline["endpoints"].items()
+        }
+    }
+    regressions = compare_to_baseline(slower, baseline, 0.2, 0.01)
+    assert any("chat: p95" in line for line in regressions)
+    assert compare_to_baseline(slower, baseline, 1.5, 0.01) == []
+    print("✅ Latency over the tolerance is reported")
+
+    failing = run(make_app(fail_tts=True), "--sessions", "2", "--turns", "2")
+    assert failing["endpoints"]["text_to_speech"]["error_rate"] == 1.0
+    assert failing["error_kinds"] == {"text_to_speech:503": 4}
+    regressions = compare_to_baseline(failing, baseline, 10.0, 0.01)
+    assert regressions == [
+        "text_to_speech: error rate 100.00% > baseline 0.00% (+1.00%)"
+    ]
+    print("✅ Error rate increases are reported")
+
+
+if __name__ == "__main__":
+    test_percentiles()
+    test_report_structure()
+    test_regression_detection()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for the Prometheus /metrics endpoint
+Checks the text exposition format, upstream tracking and the app's route labels
+"""
+
+import os
+import asyncio
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app
+from api.config import metrics
+from api.config.metrics import MetricsRegistry, track_upstream, track_upstream_stream
+from api.config.performance_config import CacheManager
+from api.services.openai_service import OpenAIService
+
+
+def sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found in:\n{text}")
+
+
+def test_exposition_format():
+    print("🧪 Testing /metrics")
+    print("=" * 50)
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    requests.labels("/a").inc()
+    requests.labels(route="/a").inc(2)
+    requests.labels('/b"q').inc()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    registry.gauge_function("items", "Items", lambda: 7)
+
+    text = registry.render()
+    print(text)
+    assert "# TYPE requests_total counter" in text
+    assert sample(text, 'requests_total{route="/a"}') == 3
+    assert 'requests_total{route="/b\\"q"} 1' in text
+    assert sample(text, 'latency_seconds_bucket{le="0.1"}') == 2
+    assert sample(text, 'latency_seconds_bucket{le="1"}') == 3
+    assert sample(text, 'latency_seconds_bucket{le="+Inf"}') == 4
+    assert sample(text, "latency_seconds_count") == 4
+    assert sample(text, "latency_seconds_sum") == 3.65
+    assert sample(text, "items") == 7
+    print("✅ Counters, cumulative histogram buckets and callback gauges render")
+
+
+def test_track_upstream():
+    in_flight = metrics.upstream_requests_in_flight.labels("unit")
+    with track_upstream("unit", "model-a"):
+        assert in_flight.value == 1
+    try:
+        with track_upstream("unit", "model-a"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert in_flight.value == 0
+
+    async def chunks():
+        for part in (b"a", b"b"):
+            yield part
+
+    async def consume():
+        return [c async for c in track_upstream_stream("unit", "model-b", chunks())]
+
+    assert asyncio.run(consume()) == [b"a", b"b"]
+    text = metrics.registry.render()
+    ok = 'upstream_request_duration_seconds_count{provider="unit",model="model-a",outcome="ok"}'
+    error = ok.replace('"ok"', '"error"')
+    assert sample(text, ok) == 1 and sample(text, error) == 1
+    assert sample(text, ok.replace("model-a", "model-b")) == 1
+    print("✅ Upstream latency is labelled by provider, model and outcome")
+
+
+def test_cache_manager_counts():
+    cache = CacheManager()
+    cache.get("missing")
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["items"]) == (2, 1, 1)
+    assert abs(stats["hit_ratio"] - 2 / 3) < 1e-9
+    print("✅ CacheManager counts hits and misses")
+
+
+def test_app_metrics():
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            await c.get("/tts/stats")
+            await c.get("/audio/" + "0" * 64)
+            await c.get("/audio/" + "1" * 64)
+            await c.get("/no-such-route")
+            return await c.get("/metrics")
+
+    response = asyncio.run(scenario())
+    text = response.text
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        sample(
+            text, 'http_requests_total{route="/tts/stats",method="GET",status="200"}'
+        )
+        >= 1
+    )
+    assert (
+        sample(
+            text,
+            'http_requests_total{route="/audio/{audio_hash}",method="GET",status="404"}',
+        )
+        >= 2
+    )
+    assert (
+        sample(text, 'http_requests_total{route="unmatched",method="GET",status="404"}')
+        >= 1
+    )
+    assert (
+        'http_request_duration_seconds_bucket{route="/tts/stats",method="GET",le="+Inf"}'
+        in text
+    )
+    for name in ("active_sessions", "memory_messages"):
+        assert sample(text, name) >= 0
+    assert 'cache_hit_ratio{cache="cache_manager"}' in text
+    assert 'cache_misses_total{cache="tts_audio"}' in text
+    print("✅ /metrics reports routes by template plus session and cache gauges")
+
+
+def test_breaker_metrics():
+    service = OpenAIService()
+    service.breaker.reset()
+    service.breaker.record_success(0.1)
+    service.breaker.record_failure()
+    service.failover_stats["ollama_turns"] += 1
+
+    text = metrics.registry.render()
+    assert sample(text, 'circuit_breaker_state{breaker="openai_chat"}') == 0
+    assert sample(text, 'circuit_breaker_error_rate{breaker="openai_chat"}') == 0.5
+    assert sample(text, 'circuit_breaker_slow_rate{breaker="openai_chat"}') == 0
+    assert sample(text, "ollama_failover_turns_total") >= 1
+    assert sample(text, "ollama_failover_errors_total") >= 0
+    service.breaker.reset()
+    print("✅ /metrics reports the OpenAI breaker and Ollama failover")
+
+
+if __name__ == "__main__":
+    test_exposition_format()
+    test_track_upstream()
+    test_cache_manager_counts()
+    test_app_metrics()
+    test_breaker_metrics()
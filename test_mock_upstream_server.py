@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for the local OpenAI/ElevenLabs/Ollama stand-in (mock_upstream_server.py)
+The real clients are pointed at the stand-in through in-process transports
+"""
+
+import os
+import time
+import asyncio
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import httpx
+from elevenlabs import AsyncElevenLabs
+
+from mock_upstream_server import MockUpstream, ProviderConfig, create_app, parse_latency
+from api.services.llm_backend import OpenAICompatibleBackend, OllamaBackend
+from api.services.model_cascade import extract_reply_texts
+from api.services.ollamaService import OllamaService
+
+MESSAGES = [{"role": "user", "content": "سلام"}]
+
+
+def transport_for(mock: MockUpstream) -> httpx.ASGITransport:
+    return httpx.ASGITransport(app=create_app(mock))
+
+
+def test_latency_distributions():
+    print("🧪 Testing mock upstream server")
+    print("=" * 50)
+    assert parse_latency("0.25")() == 0.25
+    assert parse_latency("fixed:0.1")() == 0.1
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")() <= 0.2 for _ in range(50))
+    assert all(parse_latency("normal:0,1")() >= 0 for _ in range(50))
+    try:
+        parse_latency("zipf:1")
+        raise AssertionError("unknown distribution accepted")
+    except ValueError:
+        pass
+    print("✅ Latency specs parse into non-negative samplers")
+
+
+def test_openai_chat_and_stream():
+    mock = MockUpstream({"openai": ProviderConfig(latency="0.2", chunks=3)})
+    backend = OpenAICompatibleBackend(
+        "mock", "gpt-4o", "http://mock/v1", async_transport=transport_for(mock)
+    )
+
+    async def scenario():
+        async with httpx.AsyncClient(
+            transport=transport_for(mock), base_url="http://mock"
+        ) as client:
+            started = time.perf_counter()
+            response = await client.post(
+                "/v1/chat/completions", json={"model": "gpt-4o", "messages": MESSAGES}
+            )
+            elapsed = time.perf_counter() - started
+        chunks = [chunk async for chunk in backend.stream(MESSAGES)]
+        return response, elapsed, chunks
+
+    response, elapsed, chunks = asyncio.run(scenario())
+    content = response.json()["choices"][0]["message"]["content"]
+    print(f"  completion in {elapsed:.2f}s, {len(chunks)} streamed chunks")
+    assert elapsed >= 0.2
+    assert extract_reply_texts(content)
+    assert response.json()["usage"]["total_tokens"] > 0
+    assert "".join(c.content for c in chunks) == content
+    assert chunks[-1].usage["completion_tokens"] > 0
+    print("✅ Chat completions (plain and streaming) look like OpenAI")
+
+
+def test_scripted_replies_and_errors():
+    script = {
+        "rules": [{"match": "پرواز", "reply": "scripted flight answer"}],
+        "default": "default answer",
+    }
+    mock = MockUpstream(
+        {"ollama": ProviderConfig(error_rate=1.0, error_status=429)}, script
+    )
+
+    async def scenario():
+        async with httpx.AsyncClient(
+            transport=transport_for(mock), base_url="http://mock"
+        ) as client:
+            scripted = await client.post(
+                "/v1/chat/completions",
+                json={"messages": [{"role": "user", "content": "شماره پرواز"}]},
+            )
+            default = await client.post(
+                "/v1/chat/completions", json={"messages": MESSAGES}
+            )
+            failed = await client.post("/api/chat", json={"messages": MESSAGES})
+            await client.post("/__mock__/config", json={"ollama": {"error_rate": 0.0}})
+            recovered = await client.post(
+                "/api/chat", json={"messages": MESSAGES, "stream": False}
+            )
+            stats = (await client.get("/__mock__/stats")).json()
+        return scripted, default, failed, recovered, stats
+
+    scripted, default, failed, recovered, stats = asyncio.run(scenario())
+    assert (
+        scripted.json()["choices"][0]["message"]["content"] == "scripted flight answer"
+    )
+    assert default.json()["choices"][0]["message"]["content"] == "default answer"
+    assert failed.status_code == 429 and failed.headers["retry-after"] == "1"
+    assert recovered.json()["message"]["content"] == "default answer"
+    assert stats["counts"]["ollama"] == {"requests": 2, "errors": 1, "bytes": 0}
+    print("✅ Scripted replies, injected errors and runtime config work")
+
+
+def test_real_clients_against_stand_in():
+    mock = MockUpstream({"elevenlabs": ProviderConfig(chunks=5)})
+
+    async def scenario():
+        client = AsyncElevenLabs(
+            api_key="test-key",
+            base_url="http://mock",
+            httpx_client=httpx.AsyncClient(transport=transport_for(mock)),
+        )
+        audio = [
+            chunk
+            async for chunk in client.text_to_speech.stream(
+                voice_id="mock-voice-fa", text="سلام", output_format="opus_48000_32"
+            )
+        ]
+        voices = await client.voices.get_all()
+
+        service = OllamaService()
+        service.api_url = "http://mock/api/chat"
+        service.async_transport = transport_for(mock)
+        service._async_client = None
+        result = await OllamaBackend("ollama", "llama3", service).chat(MESSAGES)
+        return audio, voices, result
+
+    audio, voices, result = asyncio.run(scenario())
+    print(f"  TTS bytes: {len(b''.join(audio))}, voices: {len(voices.voices)}")
+    assert b"".join(audio).startswith(b"OggS")
+    assert len(b"".join(audio)) == len(b"OggS") + 100 * len("سلام")
+    assert voices.voices[0].voice_id == "mock-voice-fa"
+    assert extract_reply_texts(result.content)
+    assert result.usage["total_tokens"] > 0
+    print("✅ The ElevenLabs SDK and Ollama client work against the stand-in")
+
+
+if __name__ == "__main__":
+    test_latency_distributions()
+    test_openai_chat_and_stream()
+    test_scripted_replies_and_errors()
+    test_real_clients_against_stand_in()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script for the cheap-first model cascade in get_assistant_response
+OpenAI calls are patched per model, so no server or API key is needed
+"""
+
+import os
+import json
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from api.config.performance_config import PerformanceConfig
+from api.services.model_cascade import reply_asks_for
+from api.services.openai_service import OpenAIService
+
+CHEAP = PerformanceConfig.OPENAI_CHEAP_MODEL
+STRONG = PerformanceConfig.OPENAI_CHAT_MODEL
+
+
+def completion(content) -> dict:
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def run_turn(service, session_id, user_message, replies, language="fa"):
+    """Run one turn with canned replies per model; return (messages, models called)"""
+    called = []
+
+    def fake_post(self, url, headers, payload):
+        called.append(payload["model"])
+        return completion(replies[payload["model"]])
+
+    with patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json_sync", fake_post
+    ):
+        messages, _ = service.get_assistant_response(user_message, session_id, language)
+    return messages, called
+
+
+def test_model_cascade():
+    print("🧪 Testing model cascade")
+    print("=" * 50)
+
+    service = OpenAIService()
+    service.breaker.reset()
+    strong_reply = {"messages": [{"text": "پاسخ مدل اصلی"}]}
+
+    # 1. Cheap reply asks for the expected next field (origin airport) → accepted
+    session_id = "test_cascade_accept"
+    service.clear_memory(session_id)
+    service.booking_states.pop(session_id, None)
+    cheap_ok = {"messages": [{"text": "سلام! لطفاً فرودگاه مبدأ را بفرمایید."}]}
+    messages, called = run_turn(
+        service, session_id, "سلام", {CHEAP: cheap_ok, STRONG: strong_reply}
+    )
+    print(f"Accepted turn called: {called}")
+    assert called == [CHEAP]
+    assert messages[0]["text"] == cheap_ok["messages"][0]["text"]
+
+    # 2. Cheap reply is not valid JSON → escalated
+    messages, called = run_turn(
+        service, session_id, "سلام", {CHEAP: "not json", STRONG: strong_reply}
+    )
+    print(f"Invalid JSON turn called: {called}")
+    assert called == [CHEAP, STRONG]
+    assert messages[0]["text"] == "پاسخ مدل اصلی"
+
+    # 3. Origin given, next field is travel type; cheap asks for the date → escalated
+    cheap_wrong = {"messages": [{"text": "تاریخ سفر را بفرمایید."}]}
+    messages, called = run_turn(
+        service,
+        session_id,
+        "فرودگاه امام خمینی",
+        {CHEAP: cheap_wrong, STRONG: strong_reply},
+    )
+    print(f"Wrong field turn called: {called}")
+    assert called == [CHEAP, STRONG]
+
+    # 4. English: asks for the travel type as expected → accepted
+    session_id = "test_cascade_en"
+    service.clear_memory(session_id)
+    service.booking_states.pop(session_id, None)
+    cheap_en = {"messages": [{"text": "Is this an arrival or a departure flight?"}]}
+    messages, called = run_turn(
+        service,
+        session_id,
+        "Imam Khomeini airport",
+        {CHEAP: cheap_en, STRONG: strong_reply},
+        language="en",
+    )
+    print(f"English turn called: {called}")
+    assert called == [CHEAP]
+
+    stats = service.cascade_stats.stats()
+    print(f"Cascade stats: {json.dumps(stats, indent=2)}")
+    assert stats["tiers"]["cheap"]["accepted"] >= 2
+    assert stats["escalation_reasons"]["invalid_json_shape"] >= 1
+    assert stats["escalation_reasons"]["missed_next_field"] >= 1
+
+    for sid in ["test_cascade_accept", "test_cascade_en"]:
+        service.clear_memory(sid)
+        service.booking_states.pop(sid, None)
+    print("✅ Model cascade works")
+
+
+def test_cheap_errors_do_not_trip_breaker():
+    """Cheap-model failures escalate without counting against the main model"""
+    print("🧪 Testing cheap-model errors and the circuit breaker")
+    service = OpenAIService()
+    service.breaker.reset()
+    session_id = "test_cascade_breaker"
+    service.clear_memory(session_id)
+    service.booking_states.pop(session_id, None)
+
+    def fake_post(self, url, headers, payload):
+        if payload["model"] == CHEAP:
+            raise RuntimeError("cheap model unavailable")
+        return completion({"messages": [{"text": "پاسخ مدل اصلی"}]})
+
+    with patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json_sync", fake_post
+    ):
+        for _ in range(PerformanceConfig.OPENAI_BREAKER_MIN_CALLS + 2):
+            messages, _ = service.get_assistant_response("سلام", session_id, "fa")
+            assert messages[0]["text"] == "پاسخ مدل اصلی"
+
+    stats = service.breaker.stats()
+    print(f"Breaker after cheap errors: {stats}")
+    assert service.breaker.state == "closed"
+    assert stats["error_rate"] == 0.0
+    service.clear_memory(session_id)
+    service.booking_states.pop(session_id, None)
+    print("✅ Cheap-model errors stay out of the breaker")
+
+
+def test_field_keywords_are_specific():
+    """A reply asking about a different field than expected is not accepted"""
+    print("🧪 Testing next-field keyword matching")
+    service = OpenAIService()
+    fa = service._field_keywords("fa")
+    en = service._field_keywords("en")
+
+    accepted = [
+        (fa["first_name"], "لطفاً نام مسافر اول را بفرمایید."),
+        (fa["last_name"], "نام خانوادگی مسافر اول چیست؟"),
+        (fa["luggage_count"], "چند چمدان‌ همراه دارید؟"),
+        (fa["num_passengers"], "چند نفر مسافر هستید؟"),
+        (en["first_name"], "Please tell me the first name of passenger 1"),
+        (en["travel_date"], "What date are you travelling?"),
+        (en["num_passengers"], "How many passengers are travelling?"),
+    ]
+    rejected = [
+        # Last-name question while the first name is expected, and vice versa
+        (fa["first_name"], "لطفاً نام خانوادگی مسافر را بفرمایید."),
+        (fa["last_name"], "لطفاً نام مسافر اول را بفرمایید."),
+        # "مسافر" and "تعداد" appear in most booking replies
+        (fa["num_passengers"], "تعداد چمدان مسافر اول را بفرمایید."),
+        (fa["travel_date"], "نوع پرواز شما ورودی است یا خروجی؟"),
+        (en["first_name"], "What is the last name of passenger 1?"),
+        (en["travel_date"], "Let me know when you have the passport number."),
+        (en["num_passengers"], "What is the passport number of the passenger?"),
+        (en["origin"], "What is your flight number?"),
+    ]
+    for keywords, reply in accepted:
+        assert reply_asks_for([reply], keywords), reply
+    for keywords, reply in rejected:
+        assert not reply_asks_for([reply], keywords), reply
+    print("✅ Next-field keywords only match their own field")
+
+
+if __name__ == "__main__":
+    test_model_cascade()
+    test_cheap_errors_do_not_trip_breaker()
+    test_field_keywords_are_specific()
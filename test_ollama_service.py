@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming NDJSON consumption in OllamaService
+A local Ollama stand-in (httpx transport) replaces the server, so no model is needed
+"""
+
+import os
+import json
+import time
+import asyncio
+
+import httpx
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from api.config.performance_config import cache_manager
+from api.services.ollamaService import OllamaService, SYSTEM_PROMPT_CACHE_KEY
+
+PIECE_DELAY = 0.1
+
+
+class OllamaStandIn:
+    """Answers /api/chat like Ollama: one JSON object per line, then done"""
+
+    def __init__(self, pieces, error=None):
+        self.pieces = pieces
+        self.error = error
+        self.payloads = []
+
+    def _lines(self):
+        for piece in self.pieces:
+            yield json.dumps({"message": {"role": "assistant", "content": piece}})
+        if self.error:
+            yield json.dumps({"error": self.error})
+        yield json.dumps({"message": {"content": ""}, "done": True})
+
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        self.payloads.append(json.loads(request.content))
+
+        async def body():
+            for line in self._lines():
+                await asyncio.sleep(PIECE_DELAY)
+                yield (line + "\n").encode("utf-8")
+
+        return httpx.Response(200, content=body())
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.payloads.append(json.loads(request.content))
+        return httpx.Response(
+            200, content="\n".join(self._lines()).encode("utf-8") + b"\nnot json\n"
+        )
+
+
+def service_with(stand_in: OllamaStandIn) -> OllamaService:
+    service = OllamaService()
+    service.transport = httpx.MockTransport(stand_in.handle)
+    service.async_transport = httpx.MockTransport(stand_in.handle_async)
+    service._sync_client = None
+    service._async_client = None
+    return service
+
+
+def test_stream_is_consumed_incrementally():
+    print("🧪 Testing Ollama NDJSON streaming")
+    print("=" * 50)
+    stand_in = OllamaStandIn(["سلام", "، ", "خوش اومدی"])
+    service = service_with(stand_in)
+
+    async def consume():
+        start = time.perf_counter()
+        arrivals = []
+        async for piece in service.stream_chat(
+            [{"role": "user", "content": "hi"}], json_mode=True
+        ):
+            arrivals.append((time.perf_counter() - start, piece))
+        return arrivals, time.perf_counter() - start
+
+    arrivals, total = asyncio.run(consume())
+    print(f"  first piece: {arrivals[0][0]:.2f}s, complete: {total:.2f}s")
+    assert "".join(piece for _, piece in arrivals) == "سلام، خوش اومدی"
+    assert arrivals[0][0] < PIECE_DELAY * 2
+    assert total >= PIECE_DELAY * 4
+
+    payload = stand_in.payloads[0]
+    assert payload["stream"] is True
+    assert payload["format"] == "json"
+    assert payload["keep_alive"]
+    print("✅ Pieces arrive as Ollama produces them, with keep_alive and JSON format")
+
+
+def test_sync_complete_and_errors():
+    stand_in = OllamaStandIn(["part one, ", "part two"])
+    service = service_with(stand_in)
+    content = service.complete([{"role": "user", "content": "hi"}])
+    assert content == "part one, part two"
+    assert "format" not in stand_in.payloads[0]
+
+    failing = service_with(OllamaStandIn(["partial"], error="model not found"))
+    try:
+        asyncio.run(failing.acomplete([{"role": "user", "content": "hi"}]))
+        raise AssertionError("Ollama error was not raised")
+    except RuntimeError as e:
+        assert "model not found" in str(e)
+    print("✅ Blocking path joins the stream; Ollama errors are raised")
+
+
+def test_assistant_response_uses_cached_prompt():
+    reply = json.dumps(
+        {"messages": [{"text": "سلام!", "facialExpression": "smile"}]},
+        ensure_ascii=False,
+    )
+    stand_in = OllamaStandIn([reply[:10], reply[10:]])
+    service = service_with(stand_in)
+    cache_manager.clear(SYSTEM_PROMPT_CACHE_KEY)
+
+    messages, session_id = asyncio.run(
+        service.get_assistant_response("سلام", "ollama-test")
+    )
+    assert messages == [
+        {"text": "سلام!", "facialExpression": "smile", "animation": "Idle"}
+    ]
+    assert session_id == "ollama-test"
+    system_prompt = stand_in.payloads[0]["messages"][0]["content"]
+    assert cache_manager.get(SYSTEM_PROMPT_CACHE_KEY) == system_prompt
+
+    asyncio.run(service.get_assistant_response("دوباره", "ollama-test"))
+    assert stand_in.payloads[1]["messages"][0]["content"] == system_prompt
+    assert len(stand_in.payloads[1]["messages"]) == 4
+    service.clear_memory("ollama-test")
+    print("✅ JSON replies become messages; the prompt prefix is built once")
+
+
+if __name__ == "__main__":
+    test_stream_is_consumed_incrementally()
+    test_sync_complete_and_errors()
+    test_assistant_response_uses_cached_prompt()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test script for per-request phase timing (Server-Timing header and structured log)
+Runs in-process against a small app and the real extract-info route with a fake backend
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+import api.routes.extract_info_routes as extract_info_routes
+from api.app import app as real_app
+from api.services.llm_backend import LLMResult
+from api.services.request_timing import (
+    PhaseTimer,
+    ServerTimingMiddleware,
+    current_timer,
+    phase,
+)
+
+
+class RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def collect_timing_logs() -> RecordCollector:
+    collector = RecordCollector()
+    timing_logger = logging.getLogger("api.timing")
+    timing_logger.addHandler(collector)
+    timing_logger.setLevel(logging.INFO)
+    return collector
+
+
+def parse_server_timing(value: str) -> dict:
+    entries = {}
+    for part in value.split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        entries[name] = float(duration)
+    return entries
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/sync")
+    def sync_route():
+        # Sync endpoints run in the threadpool; the timer must follow them there
+        with phase("work"):
+            time.sleep(0.02)
+        with phase("work"):
+            time.sleep(0.01)
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_route():
+        with phase("upstream"):
+            await asyncio.sleep(0.01)
+
+        def blocking():
+            with phase("parse"):
+                time.sleep(0.005)
+
+        await asyncio.to_thread(blocking)
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream_route():
+        async def body():
+            for _ in range(3):
+                await asyncio.sleep(0.01)
+                yield b"x"
+
+        return StreamingResponse(body())
+
+    return app
+
+
+async def get(app, path: str, method: str = "GET", **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        return await c.request(method, path, **kwargs)
+
+
+def test_phase_timer():
+    print("🧪 Testing Server-Timing phases")
+    print("=" * 50)
+    timer = PhaseTimer()
+    timer.add("upstream", 0.25)
+    timer.add("kb", 0.001)
+    timer.add("upstream", 0.25)
+    assert timer.phases_ms() == {"upstream": 500.0, "kb": 1.0}
+    assert timer.server_timing(0.6) == "upstream;dur=500.0, kb;dur=1.0, total;dur=600.0"
+    assert current_timer() is None
+    with phase("ignored"):
+        pass
+    print("✅ Phases accumulate; phase() is a no-op outside a request")
+
+
+def test_middleware_phases():
+    app = make_app()
+    collector = collect_timing_logs()
+
+    response = asyncio.run(get(app, "/sync"))
+    timing = parse_server_timing(response.headers["server-timing"])
+    print(f"  /sync Server-Timing: {response.headers['server-timing']}")
+    assert set(timing) == {"work", "total"}
+    assert timing["work"] >= 30 and timing["total"] >= timing["work"]
+
+    response = asyncio.run(get(app, "/async"))
+    timing = parse_server_timing(response.headers["server-timing"])
+    assert list(timing) == ["upstream", "parse", "total"]
+    assert timing["upstream"] >= 10 and timing["parse"] >= 5
+    print("✅ Phases from the threadpool and asyncio.to_thread are recorded")
+
+    response = asyncio.run(get(app, "/stream"))
+    assert response.content == b"xxx"
+    record = collector.records[-1].timing
+    assert record["path"] == "/stream" and record["status"] == 200
+    assert record["total_ms"] >= 30
+    assert record["first_byte_ms"] <= record["total_ms"]
+    print("✅ Streamed responses log total time after the last chunk")
+
+
+def test_extract_info_phases():
+    class FakeBackend:
+        name = "fake"
+        kind = "fake"
+
+        async def chat(self, messages, model=None, temperature=None, route="default"):
+            await asyncio.sleep(0.01)
+            return LLMResult(
+                '{"airportName": "Imam Khomeini", "travelType": "departure",'
+                ' "travelDate": "2024-08-15", "passengerCount": 1,'
+                ' "flightNumber": "ir 123", "passengers": []}',
+                "fake-model",
+                {},
+            )
+
+    original = extract_info_routes.backend_for
+    extract_info_routes.backend_for = lambda route, requested=None: FakeBackend()
+    collector = collect_timing_logs()
+    try:
+        response = asyncio.run(
+            get(
+                real_app,
+                "/extractInfo/extract-info",
+                method="POST",
+                json={"messages": [{"text": "سلام", "sender": "CLIENT"}]},
+            )
+        )
+    finally:
+        extract_info_routes.backend_for = original
+
+    assert response.status_code == 200, response.text
+    assert response.json()["flightNumber"] == "IR123"
+    timing = parse_server_timing(response.headers["server-timing"])
+    print(f"  extract-info Server-Timing: {response.headers['server-timing']}")
+    assert list(timing) == ["prompt", "upstream", "parse", "total"]
+    assert timing["upstream"] >= 10
+    record = collector.records[-1].timing
+    assert record["path"] == "/extractInfo/extract-info"
+    assert set(record["phases_ms"]) == {"prompt", "upstream", "parse"}
+    print("✅ extract-info reports prompt/upstream/parse phases")
+
+
+if __name__ == "__main__":
+    test_phase_timer()
+    test_middleware_phases()
+    test_extract_info_phases()
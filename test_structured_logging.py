@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for queue-based JSON logging with redaction, truncation and sampling
+Writes through setup_logging to a temporary file and inspects the records
+"""
+
+import os
+import re
+import json
+import logging
+import tempfile
+import threading
+from unittest.mock import patch
+
+from api.config import logging_config
+from api.config.logging_config import (
+    JsonFormatter,
+    RedactingFormatter,
+    SamplingFilter,
+    _clean,
+    redact,
+    setup_logging,
+)
+
+
+def make_record(msg, level=logging.INFO, **extra):
+    record = logging.makeLogRecord(
+        {"name": "test", "levelno": level, "levelname": logging.getLevelName(level)}
+    )
+    record.msg = msg
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_redaction():
+    print("🧪 Testing structured logging")
+    print("=" * 50)
+    text = (
+        "passport A12345678, national id ۱۲۳۴۵۶۷۸۹۰, phone +98 912 345 6789,"
+        " mail ali@example.com, flight IR123 on 2024-08-15, 2 passengers"
+    )
+    cleaned = redact(text)
+    print(f"  {cleaned}")
+    for secret in ("A12345678", "۱۲۳۴۵۶۷۸۹۰", "912 345 6789", "ali@example.com"):
+        assert secret not in cleaned
+    for kept in ("IR123", "2024-08-15", "2 passengers"):
+        assert kept in cleaned
+    print("✅ Passport, national ID, phone and e-mail are redacted")
+
+
+def test_redaction_before_truncation():
+    """A number cut by the field limit must not leak its first digits"""
+    text = "x" * 40 + " 09123456789 and more text after it"
+    for limit in range(41, 52):
+        cleaned = _clean(text, limit, True)
+        assert "0912" not in cleaned, (limit, cleaned)
+    assert _clean(text, 60, True).startswith("x" * 40 + " [REDACTED]")
+    print("✅ Values straddling the truncation limit are redacted")
+
+
+def test_json_formatter():
+    formatter = JsonFormatter(max_field_chars=40, redact_enabled=True)
+    record = make_record(
+        "Extraction response received",
+        payload='{"passportNumber": "B87654321", "notes": "' + "x" * 100 + '"}',
+        timing={"path": "/chat", "total_ms": 12.5},
+        verbose=True,
+    )
+    entry = json.loads(formatter.format(record))
+    print(f"  {entry}")
+    assert entry["level"] == "INFO" and entry["logger"] == "test"
+    assert entry["message"] == "Extraction response received"
+    assert "B87654321" not in entry["payload"]
+    assert entry["payload"].endswith("chars truncated]")
+    assert entry["timing"] == {"path": "/chat", "total_ms": 12.5}
+    assert "verbose" not in entry
+    print("✅ Extras are kept as JSON fields, truncated and redacted")
+
+
+def test_text_formatter():
+    """Only the message and extras are redacted, never the timestamp prefix"""
+    formatter = RedactingFormatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        max_field_chars=200,
+        redact_enabled=True,
+    )
+    record = make_record(
+        "Booking at 2025-10-19 12:52:12 for 09123456789, used %d tokens",
+        payload={"passportNumber": "B87654321"},
+    )
+    record.args = (123456789,)
+    line = formatter.format(record)
+    print(f"  {line}")
+    assert re.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - test - INFO - ", line)
+    assert "2025-10-19 12:52:12" in line
+    assert "09123456789" not in line and "B87654321" not in line
+    assert "123456789 tokens" in line
+    assert line.count("[REDACTED]") == 2
+    # The record itself is left alone for other handlers
+    assert record.getMessage().endswith("123456789 tokens")
+
+    for kept in ("2025-10-19 12:52:12", "1729341132.123456", "at 12:34:56.789012"):
+        assert redact(kept) == kept, kept
+    print("✅ Text format keeps its timestamp prefix and dates intact")
+
+
+def test_sampling():
+    drop_all = SamplingFilter(rate=0.0)
+    assert drop_all.filter(make_record("plain"))
+    assert not drop_all.filter(make_record("verbose", verbose=True))
+    assert not drop_all.filter(make_record("debug", level=logging.DEBUG))
+    assert drop_all.filter(make_record("warn", level=logging.WARNING, verbose=True))
+    keep_all = SamplingFilter(rate=1.0)
+    assert keep_all.filter(make_record("verbose", verbose=True))
+    with patch("random.random", return_value=0.3):
+        assert SamplingFilter(rate=0.5).filter(make_record("v", verbose=True))
+        assert not SamplingFilter(rate=0.2).filter(make_record("v", verbose=True))
+    print("✅ Only DEBUG and verbose records are sampled")
+
+
+def test_queue_logging_to_file():
+    log_file = os.path.join(tempfile.mkdtemp(), "app.log")
+    try:
+        setup_logging(level="INFO", log_file=log_file, json_format=True, sample_rate=0)
+        assert isinstance(
+            logging.getLogger().handlers[0], logging.handlers.QueueHandler
+        )
+
+        logger = logging.getLogger("test.queue")
+        logger.info("OpenAI response received", extra={"payload": "x", "verbose": True})
+        logger.info("Processing %d messages", 3)
+        emitted_in = []
+        original_emit = logging.FileHandler.emit
+
+        def tracking_emit(self, record):
+            emitted_in.append(threading.current_thread().name)
+            return original_emit(self, record)
+
+        with patch.object(logging.FileHandler, "emit", tracking_emit):
+            try:
+                raise ValueError("bad passport A12345678")
+            except ValueError:
+                logger.exception("Extraction failed")
+            logging_config._stop_listener()  # drains the queue
+    finally:
+        setup_logging(level="INFO")
+
+    with open(log_file, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    messages = [entry["message"] for entry in entries]
+    print(f"  {messages}")
+    assert "OpenAI response received" not in messages
+    assert "Processing 3 messages" in messages
+    failure = entries[-1]
+    assert failure["level"] == "ERROR" and "ValueError" in failure["exception"]
+    assert "A12345678" not in failure["exception"]
+    assert emitted_in and threading.main_thread().name not in emitted_in
+    print("✅ Records are written by the queue listener thread, not the caller")
+
+
+if __name__ == "__main__":
+    test_redaction()
+    test_redaction_before_truncation()
+    test_json_formatter()
+    test_text_formatter()
+    test_sampling()
+    test_queue_logging_to_file()
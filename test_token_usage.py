@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for token usage accounting and per-session token budgets
+OpenAI calls are patched, so no server or API key is needed
+"""
+
+import os
+import json
+import asyncio
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app
+from api.config.performance_config import PerformanceConfig
+from api.services.llm_backend import _openai_usage
+from api.services.openai_service import OpenAIService
+from api.services.token_usage import TokenUsageLedger, token_usage
+
+CHEAP = PerformanceConfig.OPENAI_CHEAP_MODEL
+STRONG = PerformanceConfig.OPENAI_CHAT_MODEL
+
+
+def test_ledger():
+    print("🧪 Testing token usage accounting")
+    print("=" * 50)
+    assert _openai_usage(
+        {
+            "prompt_tokens": 100,
+            "completion_tokens": 20,
+            "prompt_tokens_details": {"cached_tokens": 64},
+        }
+    ) == {
+        "prompt_tokens": 100,
+        "completion_tokens": 20,
+        "total_tokens": 120,
+        "cached_tokens": 64,
+    }
+
+    ledger = TokenUsageLedger(budget=150, max_sessions=2)
+    usage = {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+    ledger.record("chat", "gpt-4o", usage, "s1")
+    ledger.record("chat", "gpt-4o-mini", {**usage, "cached_tokens": 50}, "s1")
+    ledger.record("extract_info", "gpt-3.5-turbo", usage)
+    ledger.record("chat", "gpt-4o", {}, "s1")  # no usage reported → ignored
+
+    report = ledger.session("s1")
+    assert report["total"]["total_tokens"] == 240 and report["total"]["calls"] == 2
+    assert report["total"]["cached_tokens"] == 50
+    assert report["by_model"]["gpt-4o-mini"]["prompt_tokens"] == 100
+    assert report["over_budget"] and ledger.over_budget("s1")
+    stats = ledger.stats()
+    assert stats["by_route"]["extract_info"]["total_tokens"] == 120
+    assert stats["total"]["calls"] == 3 and stats["sessions"] == 1
+    print("✅ Usage is aggregated per session, route and model")
+
+    ledger.record("chat", "gpt-4o", usage, "s2")
+    ledger.record("chat", "gpt-4o", usage, "s3")
+    assert ledger.session("s1") is None and ledger.stats()["sessions"] == 2
+    assert not TokenUsageLedger(budget=0).over_budget("s2")
+    print("✅ Session ledger is capped; a budget of 0 is unlimited")
+
+
+def run_turn(service, session_id, text, tokens):
+    called = []
+
+    def fake_post(self, url, headers, payload):
+        called.append(payload)
+        return {
+            "model": payload["model"],
+            "choices": [
+                {"message": {"content": json.dumps({"messages": [{"text": "باشه"}]})}}
+            ],
+            "usage": {"prompt_tokens": tokens, "completion_tokens": 10},
+        }
+
+    with patch(
+        "api.services.upstream_client.HedgedUpstreamClient.post_json_sync", fake_post
+    ):
+        service.get_assistant_response(text, session_id, "fa")
+    return called
+
+
+def test_session_budget():
+    service = OpenAIService()
+    service.breaker.reset()
+    session_id = "test_token_budget"
+    service.clear_memory(session_id)
+    service.booking_states.pop(session_id, None)
+    token_usage.clear()
+
+    with patch.object(token_usage, "budget", 500), patch.object(
+        PerformanceConfig, "SESSION_BUDGET_ACTIONS", {"cheap_model", "trim_context"}
+    ), patch.object(
+        PerformanceConfig, "SESSION_BUDGET_HISTORY_MESSAGES", 2
+    ), patch.object(
+        PerformanceConfig, "CASCADE_ENABLED", False
+    ):
+        for text in ("سلام", "فرودگاه امام خمینی", "خروجی"):
+            called = run_turn(service, session_id, text, 200)
+            assert [p["model"] for p in called] == [STRONG]
+        # 3 x 210 tokens is over the 500 budget
+        called = run_turn(service, session_id, "2024-08-15", 200)
+
+    payload = called[0]
+    print(f"  over budget: model={payload['model']} max_tokens={payload['max_tokens']}")
+    assert payload["model"] == CHEAP
+    assert payload["max_tokens"] <= PerformanceConfig.SESSION_BUDGET_MAX_TOKENS
+    # system prompt + 2 history messages + the new user message
+    assert len(payload["messages"]) == 4
+    assert token_usage.session(session_id)["by_model"][CHEAP]["calls"] == 1
+    print("✅ Over-budget sessions switch to the cheap model with trimmed context")
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return (
+                await c.get("/assistant/usage"),
+                await c.get(f"/assistant/usage/{session_id}"),
+                await c.get("/assistant/usage/unknown-session"),
+                await c.get("/metrics"),
+            )
+
+    totals, session, missing, metrics = asyncio.run(fetch())
+    assert totals.json()["by_route"]["chat"]["total_tokens"] == 4 * 210
+    assert session.json()["total"]["calls"] == 4
+    assert missing.status_code == 404
+    assert f'llm_tokens_total{{route="chat",model="{CHEAP}",kind="prompt_tokens"}}' in (
+        metrics.text
+    )
+    print("✅ Usage is exposed via /assistant/usage and /metrics")
+
+
+def test_budget_on_other_backend():
+    """cheap_model still caps the reply on Ollama but keeps its own model"""
+    service = OpenAIService()
+    session_id = "test_token_budget_ollama"
+    service.clear_memory(session_id)
+    service.booking_states.pop(session_id, None)
+    sent = {}
+
+    def fake_events(
+        self, messages, timeout=120, json_mode=False, model=None, options=None
+    ):
+        sent.update(model=model, options=options)
+        reply = json.dumps({"messages": [{"text": "باشه"}]})
+        yield {"message": {"content": reply}}
+        yield {"done": True, "prompt_eval_count": 40, "eval_count": 5}
+
+    with patch.object(token_usage, "budget", 100), patch.object(
+        PerformanceConfig, "SESSION_BUDGET_ACTIONS", {"cheap_model"}
+    ), patch.object(PerformanceConfig, "SESSION_BUDGET_MAX_TOKENS", 50), patch(
+        "api.services.ollamaService.OllamaService.events_sync", fake_events
+    ):
+        token_usage.record("chat", "llama3", {"total_tokens": 150}, session_id)
+        service.get_assistant_response("سلام", session_id, "fa", backend="ollama")
+
+    print(f"  over budget on Ollama: {sent}")
+    assert sent["model"] == PerformanceConfig.LLM_BACKENDS["ollama"]["model"]
+    assert sent["options"]["num_predict"] == 50
+    service.clear_memory(session_id)
+    print("✅ Over-budget sessions on other backends get the shorter reply cap")
+
+
+if __name__ == "__main__":
+    test_ledger()
+    test_session_budget()
+    test_budget_on_other_backend()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed TTS audio cache and /audio/{hash}
+ElevenLabs is replaced by a fake stream, so no API key or network is needed
+"""
+
+import os
+import asyncio
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app, tts_service
+from api.services.tts_cache import TTSAudioCache, audio_cache_key, parse_range
+
+
+class FakeTextToSpeech:
+    def __init__(self):
+        self.calls = 0
+
+    async def stream(self, **kwargs):
+        self.calls += 1
+        for chunk in [b"ID3", b"-", kwargs["text"].encode("utf-8")]:
+            yield chunk
+
+
+class FakeClient:
+    def __init__(self):
+        self.text_to_speech = FakeTextToSpeech()
+
+
+def test_cache_tiers():
+    print("🧪 Testing TTS cache tiers")
+    print("=" * 50)
+
+    cache_dir = tempfile.mkdtemp()
+    cache = TTSAudioCache(cache_dir, memory_max_bytes=10, disk_max_bytes=20)
+    keys = [audio_cache_key(f"phrase {i}", "voice", "model", {}) for i in range(3)]
+    assert keys[0] != audio_cache_key("phrase 0", "voice", "model", {"stability": 1})
+
+    for key in keys:
+        cache.put(key, b"x" * 8)
+    stats = cache.stats()
+    print(f"  after 3 puts: {stats}")
+    # Memory holds one 8-byte entry, disk holds the two most recent
+    assert stats["memory_items"] == 1 and stats["disk_items"] == 2
+    assert keys[0] not in cache and not os.path.exists(
+        os.path.join(cache_dir, keys[0] + ".audio")
+    )
+
+    assert cache.get(keys[1]) == b"x" * 8  # disk hit, promoted to memory
+    assert cache.get(keys[1]) == b"x" * 8  # memory hit
+    assert cache.get(keys[0]) is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+    # A new process picks the disk tier back up
+    reopened = TTSAudioCache(cache_dir, memory_max_bytes=10, disk_max_bytes=20)
+    assert reopened.get(keys[2]) == b"x" * 8
+    print("✅ Memory LRU and size-capped disk tier work")
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    for header in ["bytes=100-", "bytes=5-1", "bytes=-0"]:
+        try:
+            parse_range(header, 100)
+        except ValueError:
+            continue
+        raise AssertionError(f"{header} should be unsatisfiable")
+    print("✅ Range parsing works")
+
+
+async def _run_endpoints():
+    fake = FakeClient()
+    tts_service.client = fake
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        body = {"text": "لطفاً شماره پاسپورت را وارد کنید"}
+        first = await client.post("/text-to-speech", json=body)
+        second = await client.post("/text-to-speech", json=body)
+        audio_hash = first.headers["x-audio-hash"]
+
+        full = await client.get(f"/audio/{audio_hash}")
+        not_modified = await client.get(
+            f"/audio/{audio_hash}", headers={"If-None-Match": full.headers["etag"]}
+        )
+        partial = await client.get(
+            f"/audio/{audio_hash}", headers={"Range": "bytes=0-2"}
+        )
+        unsatisfiable = await client.get(
+            f"/audio/{audio_hash}", headers={"Range": "bytes=9999-"}
+        )
+        missing = await client.get("/audio/" + "0" * 64)
+        traversal = await client.get("/audio/..%2F..%2Fetc%2Fpasswd")
+    return (
+        fake,
+        first,
+        second,
+        full,
+        not_modified,
+        partial,
+        unsatisfiable,
+        missing,
+        traversal,
+    )
+
+
+def test_cached_endpoints():
+    print("🧪 Testing /text-to-speech cache and /audio/{hash}")
+    (
+        fake,
+        first,
+        second,
+        full,
+        not_modified,
+        partial,
+        unsatisfiable,
+        missing,
+        traversal,
+    ) = asyncio.run(_run_endpoints())
+    expected = b"ID3-" + "لطفاً شماره پاسپورت را وارد کنید".encode("utf-8")
+
+    print(f"  first: {first.headers['x-cache']}, second: {second.headers['x-cache']}")
+    assert first.content == expected and second.content == expected
+    assert first.headers["x-cache"] == "MISS" and second.headers["x-cache"] == "HIT"
+    assert fake.text_to_speech.calls == 1
+
+    assert full.status_code == 200 and full.content == expected
+    assert "immutable" in full.headers["cache-control"]
+    assert not_modified.status_code == 304
+    assert partial.status_code == 206 and partial.content == b"ID3"
+    assert partial.headers["content-range"] == f"bytes 0-2/{len(expected)}"
+    assert unsatisfiable.status_code == 416
+    assert missing.status_code == 404 and traversal.status_code == 404
+    print("✅ Repeated phrases are served from the cache")
+
+
+if __name__ == "__main__":
+    test_cache_tiers()
+    test_parse_range()
+    test_cached_endpoints()
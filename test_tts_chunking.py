@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for sentence-chunked parallel synthesis in /text-to-speech
+ElevenLabs is replaced by a fake stream, so no API key or network is needed
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app, tts_service
+from api.services.tts_cache import TTSAudioCache
+from api.services.text_normalization import split_sentences
+
+SENTENCE_DELAY = 0.2
+
+
+class FakeTextToSpeech:
+    def __init__(self):
+        self.texts = []
+
+    async def stream(self, **kwargs):
+        self.texts.append(kwargs["text"])
+        # Two chunks per request so live forwarding and buffering both happen
+        await asyncio.sleep(SENTENCE_DELAY / 2)
+        yield b"["
+        await asyncio.sleep(SENTENCE_DELAY / 2)
+        yield kwargs["text"].encode("utf-8") + b"]"
+
+
+class FakeClient:
+    def __init__(self):
+        self.text_to_speech = FakeTextToSpeech()
+
+
+def test_split_sentences():
+    print("🧪 Testing sentence splitting")
+    print("=" * 50)
+    text = "مشهد شهر زیبایی است. حرم امام رضا کجاست؟ قیمت ۲.۵ میلیون است! Visit the bazaar. Is it open?"
+    sentences = split_sentences(text, max_chars=10)
+    print(f"  {sentences}")
+    assert sentences == [
+        "مشهد شهر زیبایی است.",
+        "حرم امام رضا کجاست؟",
+        "قیمت ۲.۵ میلیون است!",
+        "Visit the bazaar.",
+        "Is it open?",
+    ]
+    # Short sentences are merged up to max_chars
+    assert split_sentences("Hi. Ok. Yes.", max_chars=50) == ["Hi. Ok. Yes."]
+    print("✅ Persian and English sentence boundaries are respected")
+
+
+async def _speak(payload):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        response = await client.post("/text-to-speech", json=payload)
+        return response, time.perf_counter() - start
+
+
+def test_chunked_synthesis():
+    print("🧪 Testing chunked synthesis")
+    fake = FakeClient()
+    tts_service.client = fake
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+
+    sentences = [f"جمله شماره {i} از یک پاسخ طولانی راهنمای سفر است." for i in range(6)]
+    text = " ".join(sentences)
+    response, elapsed = asyncio.run(_speak({"text": text, "chunked": True}))
+    print(f"  {response.headers['x-tts-chunks']} chunks in {elapsed:.2f}s")
+
+    expected_order = [s for s in split_sentences(text)]
+    expected = b"".join(b"[" + s.encode("utf-8") + b"]" for s in expected_order)
+    assert response.status_code == 200
+    assert response.content == expected
+    assert int(response.headers["x-tts-chunks"]) == len(expected_order) > 1
+    # 3 at a time instead of one after another
+    assert elapsed < SENTENCE_DELAY * len(expected_order)
+
+    # Each sentence was cached on its own and is reused by other texts
+    calls = len(fake.text_to_speech.texts)
+    again = " ".join(expected_order[:2])
+    response, _ = asyncio.run(_speak({"text": again, "chunked": True}))
+    assert len(fake.text_to_speech.texts) == calls
+    print("✅ Sentences are synthesized concurrently and streamed in order")
+
+
+def test_short_text_is_not_chunked():
+    fake = FakeClient()
+    tts_service.client = fake
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+    response, _ = asyncio.run(_speak({"text": "سلام. خوش آمدید."}))
+    assert "x-tts-chunks" not in response.headers
+    assert fake.text_to_speech.texts == ["سلام. خوش آمدید."]
+    print("✅ Short texts use a single request")
+
+
+if __name__ == "__main__":
+    test_split_sentences()
+    test_chunked_synthesis()
+    test_short_text_is_not_chunked()
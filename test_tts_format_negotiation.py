@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for output format negotiation and latency settings in /text-to-speech
+ElevenLabs is replaced by a fake stream that records its arguments
+"""
+
+import os
+import asyncio
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+from api.app import app, tts_service
+from api.services.tts_cache import TTSAudioCache
+
+
+class FakeTextToSpeech:
+    def __init__(self):
+        self.calls = []
+
+    async def stream(self, voice_id, text, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("output_format", "").startswith("opus"):
+            yield b"OggS"
+        else:
+            yield b"ID3"
+        yield b"-audio"
+
+
+class FakeClient:
+    def __init__(self):
+        self.text_to_speech = FakeTextToSpeech()
+        tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+
+
+async def post(body: dict, headers: dict = None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/text-to-speech", json=body, headers=headers or {})
+
+
+async def get(path: str):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path)
+
+
+def test_accept_header_selects_format():
+    print("🧪 Testing format negotiation")
+    print("=" * 50)
+    client = FakeClient()
+    tts_service.client = client
+
+    response = asyncio.run(
+        post({"text": "سلام"}, {"Accept": "audio/mpeg;q=0.5, audio/ogg"})
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/ogg"
+    assert "output.ogg" in response.headers["content-disposition"]
+    assert "Accept" in response.headers["vary"]
+    assert client.text_to_speech.calls[-1]["output_format"] == "opus_48000_32"
+
+    response = asyncio.run(post({"text": "سلام"}, {"Accept": "*/*"}))
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert client.text_to_speech.calls[-1]["output_format"] == "mp3_44100_128"
+    print("✅ Accept header picks the output format, */* keeps mp3")
+
+
+def test_explicit_format_model_and_latency():
+    client = FakeClient()
+    tts_service.client = client
+
+    body = {
+        "text": "سلام",
+        "output_format": "mp3_22050_32",
+        "model_id": "eleven_flash_v2_5",
+        "optimize_streaming_latency": 3,
+    }
+    response = asyncio.run(post(body, {"Accept": "audio/ogg"}))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/mpeg"
+    call = client.text_to_speech.calls[-1]
+    assert call["output_format"] == "mp3_22050_32"
+    assert call["model_id"] == "eleven_flash_v2_5"
+    assert call["optimize_streaming_latency"] == 3
+    print("✅ Request fields override Accept and reach ElevenLabs")
+
+
+def test_formats_are_cached_separately():
+    client = FakeClient()
+    tts_service.client = client
+
+    mp3 = asyncio.run(post({"text": "سلام"}))
+    opus = asyncio.run(post({"text": "سلام"}, {"Accept": "audio/ogg"}))
+    again = asyncio.run(post({"text": "سلام"}, {"Accept": "audio/ogg"}))
+    assert mp3.headers["x-audio-hash"] != opus.headers["x-audio-hash"]
+    assert again.headers["content-type"] == "audio/ogg"
+    assert len(client.text_to_speech.calls) == 2
+
+    audio = asyncio.run(get(f"/audio/{opus.headers['x-audio-hash']}"))
+    assert audio.headers["content-type"] == "audio/ogg"
+    print("✅ Each format has its own cache entry and media type")
+
+
+def test_invalid_format_or_model_is_400():
+    tts_service.client = FakeClient()
+    bad_format = asyncio.run(post({"text": "hi", "output_format": "wav_8000"}))
+    bad_model = asyncio.run(post({"text": "hi", "model_id": "unknown_model"}))
+    bad_latency = asyncio.run(post({"text": "hi", "optimize_streaming_latency": 9}))
+    print(
+        f"  bad format → {bad_format.status_code}, bad model → {bad_model.status_code}, "
+        f"bad latency → {bad_latency.status_code}"
+    )
+    assert bad_format.status_code == 400
+    assert bad_model.status_code == 400
+    assert bad_latency.status_code == 422
+    print("✅ Unsupported settings are rejected")
+
+
+if __name__ == "__main__":
+    test_accept_header_selects_format()
+    test_explicit_format_model_and_latency()
+    test_formats_are_cached_separately()
+    test_invalid_format_or_model_is_400()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for the TTS scheduler (concurrency caps, fair queue, coalescing)
+Pure local scheduling with fake upstream calls, no server or network needed
+"""
+
+import time
+import asyncio
+import threading
+
+from api.services.tts_scheduler import TTSScheduler
+
+
+def test_caps_and_fifo():
+    print("🧪 Testing TTS scheduler caps")
+    print("=" * 50)
+
+    scheduler = TTSScheduler(max_concurrency=2, per_voice_concurrency=1)
+    admitted = []
+    peak = {"total": 0, "per_voice": 0}
+
+    async def job(name, voice):
+        async with scheduler.slot_async(voice):
+            admitted.append(name)
+            stats = scheduler.stats()
+            peak["total"] = max(peak["total"], stats["active"])
+            peak["per_voice"] = max(
+                peak["per_voice"], max(stats["active_per_voice"].values())
+            )
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.gather(
+            job("a1", "A"), job("a2", "A"), job("b1", "B"), job("c1", "C")
+        )
+
+    asyncio.run(main())
+    print(f"  admission order: {admitted}, peak: {peak}")
+    assert peak == {"total": 2, "per_voice": 1}
+    # a2 waits for voice A, so b1 and c1 behind it are not blocked by it
+    assert admitted[:2] == ["a1", "b1"]
+    stats = scheduler.stats()
+    assert stats["queue_depth"] == 0 and stats["active"] == 0
+    assert stats["queued"] == 2 and stats["max_queue_depth"] >= 2
+    assert stats["wait_p95"] >= 0.04
+    print("✅ Global and per-voice caps hold")
+
+
+def test_threads_and_tasks_share_queue():
+    scheduler = TTSScheduler(max_concurrency=1, per_voice_concurrency=1)
+    order = []
+
+    def thread_job(name):
+        with scheduler.slot("A"):
+            order.append(name)
+            time.sleep(0.05)
+
+    async def main():
+        await scheduler.acquire_async("A")  # hold the only slot
+        worker = threading.Thread(target=thread_job, args=("thread",))
+        worker.start()
+        while scheduler.stats()["queue_depth"] < 1:
+            await asyncio.sleep(0.01)
+
+        async def task_job():
+            async with scheduler.slot_async("A"):
+                order.append("task")
+
+        task = asyncio.create_task(task_job())
+        await asyncio.sleep(0.01)
+        scheduler.release("A")
+        await task
+        await asyncio.to_thread(worker.join)
+
+    asyncio.run(main())
+    print(f"  order across thread and task: {order}")
+    assert order == ["thread", "task"]
+    print("✅ Threads and asyncio tasks are served first-come first-served")
+
+
+def test_cancelled_waiter_leaves_queue():
+    scheduler = TTSScheduler(max_concurrency=1, per_voice_concurrency=1)
+
+    async def main():
+        await scheduler.acquire_async("A")
+        waiter = asyncio.create_task(scheduler.acquire_async("A"))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["queue_depth"] == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.stats()["queue_depth"] == 0
+        scheduler.release("A")
+
+    asyncio.run(main())
+    assert scheduler.stats()["active"] == 0
+    print("✅ Cancelled waiters don't leak slots")
+
+
+def test_async_coalescing():
+    scheduler = TTSScheduler(max_concurrency=4, per_voice_concurrency=4)
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        for chunk in [b"a", b"b", b"c"]:
+            await asyncio.sleep(0.03)
+            yield chunk
+
+    async def listen(delay):
+        await asyncio.sleep(delay)
+        return b"".join(
+            [chunk async for chunk in scheduler.stream("same", "A", upstream)]
+        )
+
+    async def main():
+        # The last listener joins after the first chunk was already sent
+        return await asyncio.gather(listen(0), listen(0), listen(0.04))
+
+    results = asyncio.run(main())
+    print(f"  upstream calls: {len(calls)}, results: {results}")
+    assert len(calls) == 1
+    assert results == [b"abc", b"abc", b"abc"]
+    assert scheduler.stats()["coalesced"] == 2
+    print("✅ Identical in-flight streams share one upstream call")
+
+
+def test_sync_coalescing():
+    scheduler = TTSScheduler(max_concurrency=4, per_voice_concurrency=4)
+    calls = []
+    results = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(0.1)
+        return b"audio"
+
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(scheduler.run_sync("k", "A", upstream))
+        )
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"  upstream calls: {len(calls)}, results: {results}")
+    assert len(calls) == 1 and results == [b"audio"] * 3
+    print("✅ Identical blocking calls share one upstream call")
+
+
+if __name__ == "__main__":
+    test_caps_and_fifo()
+    test_threads_and_tasks_share_queue()
+    test_cancelled_waiter_leaves_queue()
+    test_async_coalescing()
+    test_sync_coalescing()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming passthrough in /text-to-speech
+ElevenLabs is replaced by a slow fake stream, so no API key or network is needed
+"""
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+from api.app import app, tts_service
+from api.services.tts_cache import TTSAudioCache
+
+CHUNK_DELAY = 0.2
+
+
+class FakeTextToSpeech:
+    def __init__(self, chunks, fail_at=None):
+        self.chunks = chunks
+        self.fail_at = fail_at
+
+    async def stream(self, **kwargs):
+        for index, chunk in enumerate(self.chunks):
+            if index == self.fail_at:
+                raise RuntimeError("upstream dropped")
+            await asyncio.sleep(CHUNK_DELAY)
+            yield chunk
+
+
+class FakeClient:
+    def __init__(self, chunks, fail_at=None):
+        self.text_to_speech = FakeTextToSpeech(chunks, fail_at)
+        # Fresh cache so earlier runs can't turn the request into a cache hit
+        tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+
+
+async def asgi_post(path: str, body: dict):
+    """Call the app directly and timestamp every ASGI message it sends"""
+    payload = json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.sleep(3600)
+
+    start = time.perf_counter()
+    events = []
+
+    async def send(message):
+        events.append((time.perf_counter() - start, message))
+
+    error = None
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        error = e
+    return events, error
+
+
+def test_first_byte_before_synthesis_finishes():
+    print("🧪 Testing TTS streaming passthrough")
+    print("=" * 50)
+
+    chunks = [b"ID3", b"chunk-1", b"chunk-2", b"chunk-3", b"chunk-4"]
+    tts_service.client = FakeClient(chunks)
+    events, error = asyncio.run(asgi_post("/text-to-speech", {"text": "سلام"}))
+    assert error is None
+
+    start = next(m for _, m in events if m["type"] == "http.response.start")
+    assert start["status"] == 200
+    bodies = [(t, m["body"]) for t, m in events if m["type"] == "http.response.body"]
+    first_audio = next(t for t, body in bodies if body)
+    total = bodies[-1][0]
+    print(f"  first audio byte: {first_audio:.2f}s, complete: {total:.2f}s")
+    assert b"".join(body for _, body in bodies) == b"".join(chunks)
+    assert first_audio < CHUNK_DELAY * 2
+    assert total >= CHUNK_DELAY * len(chunks)
+    print("✅ Audio is forwarded as it is synthesized")
+
+
+def test_error_before_first_chunk_is_500():
+    tts_service.client = FakeClient([b"ID3"], fail_at=0)
+    events, error = asyncio.run(asgi_post("/text-to-speech", {"text": "hi"}))
+    start = next(m for _, m in events if m["type"] == "http.response.start")
+    print(f"  upstream failure before audio → {start['status']}")
+    assert start["status"] == 500
+    print("✅ Early upstream errors map to 500")
+
+
+def test_error_mid_stream_aborts_response():
+    tts_service.client = FakeClient([b"ID3", b"chunk-1", b"chunk-2"], fail_at=2)
+    events, error = asyncio.run(asgi_post("/text-to-speech", {"text": "hi"}))
+    start = next(m for _, m in events if m["type"] == "http.response.start")
+    bodies = [m for _, m in events if m["type"] == "http.response.body"]
+    print(f"  mid-stream failure after {len(bodies)} body messages: {error!r}")
+    assert start["status"] == 200
+    # The response must not be closed as if it completed normally
+    assert not any(m.get("more_body") is False for m in bodies)
+    assert error is not None and "upstream dropped" in repr(error)
+    # Nothing partial is left in the cache, not even the temp file
+    assert os.listdir(tts_service.cache.cache_dir) == []
+    print("✅ Mid-stream errors abort the response instead of truncating silently")
+
+
+def test_stream_is_teed_to_disk_cache():
+    """Long audio is written to the disk tier in batches while it streams"""
+    chunks = [b"ID3"] + [bytes([i]) * 40_000 for i in range(1, 5)]
+    tts_service.client = FakeClient(chunks)
+    events, error = asyncio.run(asgi_post("/text-to-speech", {"text": "long"}))
+    assert error is None
+    start = next(m for _, m in events if m["type"] == "http.response.start")
+    audio_hash = dict(start["headers"])[b"x-audio-hash"].decode()
+    cache = tts_service.cache
+    files = os.listdir(cache.cache_dir)
+    print(f"  cache dir after stream: {files}")
+    assert files == [audio_hash + ".audio"]
+    # Written straight to disk, not kept in the memory tier
+    assert cache.stats()["memory_items"] == 0
+    assert cache.get(audio_hash) == b"".join(chunks)
+    print("✅ Streamed audio is cached without buffering the whole response")
+
+
+if __name__ == "__main__":
+    test_first_byte_before_synthesis_finishes()
+    test_error_before_first_chunk_is_500()
+    test_error_mid_stream_aborts_response()
+    test_stream_is_teed_to_disk_cache()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for pre-synthesizing fixed assistant phrases into the TTS cache
+ElevenLabs is replaced by a fake stream, so no API key or network is needed
+"""
+
+import os
+import asyncio
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app, tts_service
+from api.constants.phrases import FIXED_PHRASES, ERROR_MESSAGES, warmup_phrases
+from api.services.tts_cache import TTSAudioCache
+from api.services.tts_warmup import warmup_tts_cache
+
+
+class FakeTextToSpeech:
+    def __init__(self):
+        self.calls = []
+
+    async def stream(self, **kwargs):
+        self.calls.append((kwargs["voice_id"], kwargs["text"]))
+        yield b"ID3"
+        yield kwargs["text"].encode("utf-8")
+
+
+class FakeClient:
+    def __init__(self):
+        self.text_to_speech = FakeTextToSpeech()
+
+
+def test_warmup_fills_cache():
+    print("🧪 Testing TTS warmup")
+    print("=" * 50)
+
+    fake = FakeClient()
+    tts_service.client = fake
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+    phrases = warmup_phrases("fa") + warmup_phrases("en")
+    assert FIXED_PHRASES["booking_success"]["fa"] in phrases
+    assert ERROR_MESSAGES["parse_error"]["en"] in phrases
+
+    counts = asyncio.run(warmup_tts_cache(voice_ids=["voice-a", "voice-b"]))
+    print(f"  first run: {counts}")
+    assert counts == {"synthesized": len(phrases) * 2, "cached": 0, "failed": 0}
+
+    # Second run is a no-op against ElevenLabs
+    counts = asyncio.run(warmup_tts_cache(voice_ids=["voice-a", "voice-b"]))
+    print(f"  second run: {counts}")
+    assert counts["synthesized"] == 0 and counts["cached"] == len(phrases) * 2
+    print("✅ Warmup synthesizes each phrase once per voice")
+
+
+async def _speak(text):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/text-to-speech", json={"text": text})
+
+
+def test_request_path_hits_warm_cache():
+    fake = FakeClient()
+    tts_service.client = fake
+    tts_service.cache = TTSAudioCache(tempfile.mkdtemp())
+    asyncio.run(warmup_tts_cache(languages=["fa"]))
+    warmed_calls = len(fake.text_to_speech.calls)
+
+    response = asyncio.run(_speak(FIXED_PHRASES["booking_success"]["fa"]))
+    print(f"  booking success phrase → X-Cache: {response.headers['x-cache']}")
+    assert response.headers["x-cache"] == "HIT"
+    assert len(fake.text_to_speech.calls) == warmed_calls
+    print("✅ Fixed phrases never reach ElevenLabs on the request path")
+
+
+if __name__ == "__main__":
+    test_warmup_fills_cache()
+    test_request_path_hits_warm_cache()
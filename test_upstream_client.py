@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script for the hedged upstream client (adaptive timeouts, hedging, retries)
+Uses in-process mock transports, so no server or network is needed
+"""
+
+import time
+import asyncio
+import httpx
+
+from api.services.upstream_client import HedgedUpstreamClient
+
+URL = "http://upstream.test/v1/chat/completions"
+
+
+def make_client(**kwargs) -> HedgedUpstreamClient:
+    options = dict(
+        min_samples=5,
+        hedge_budget=1.0,
+        backoff_base=0.01,
+        backoff_max=0.05,
+    )
+    options.update(kwargs)
+    client = HedgedUpstreamClient("test", **options)
+    # Seed a fast latency profile so the hedge fires after ~50ms
+    for _ in range(10):
+        client.latency.record(0.05)
+    return client
+
+
+def test_adaptive_timeout():
+    """Timeout follows the rolling p99 within configured bounds"""
+    client = HedgedUpstreamClient("timeout", min_samples=5, min_timeout=1)
+    assert client.timeout_for() == client.max_timeout
+    for _ in range(10):
+        client.latency.record(2.0)
+    print(f"Timeout after 2s samples: {client.timeout_for():.1f}s")
+    assert client.timeout_for() == 2.0 * client.timeout_multiplier
+    print("✅ Adaptive timeout works")
+
+
+def test_async_hedge_wins():
+    """A slow primary is beaten by the hedged duplicate"""
+    calls = {"count": 0}
+
+    async def handler(request):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            await asyncio.sleep(1.0)
+            return httpx.Response(200, json={"winner": "primary"})
+        return httpx.Response(200, json={"winner": "hedge"})
+
+    client = make_client(async_transport=httpx.MockTransport(handler))
+
+    async def run():
+        started = time.perf_counter()
+        result = await client.post_json(URL, {}, {})
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(run())
+    print(f"Async result: {result} in {elapsed:.2f}s, stats: {client.stats()}")
+    assert result == {"winner": "hedge"}
+    assert elapsed < 0.5
+    assert client.stats()["hedge_wins"] == 1
+    print("✅ Async hedging works")
+
+
+def test_sync_hedge_wins():
+    """Same as above for the blocking path used by the chat route"""
+    calls = {"count": 0}
+
+    def handler(request):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            time.sleep(1.0)
+            return httpx.Response(200, json={"winner": "primary"})
+        return httpx.Response(200, json={"winner": "hedge"})
+
+    client = make_client(transport=httpx.MockTransport(handler))
+    started = time.perf_counter()
+    result = client.post_json_sync(URL, {}, {})
+    elapsed = time.perf_counter() - started
+    print(f"Sync result: {result} in {elapsed:.2f}s")
+    assert result == {"winner": "hedge"}
+    assert elapsed < 0.5
+    print("✅ Sync hedging works")
+
+
+def test_retry_on_429_and_5xx():
+    """429 and 5xx are retried, other 4xx are not"""
+    responses = [429, 503, 200]
+
+    def handler(request):
+        status = responses.pop(0)
+        return httpx.Response(status, json={"status": status})
+
+    client = make_client(transport=httpx.MockTransport(handler), hedge_budget=0)
+    result = client.post_json_sync(URL, {}, {})
+    print(f"Result after retries: {result}, stats: {client.stats()}")
+    assert result == {"status": 200}
+    assert client.stats()["retries"] == 2
+
+    def bad_request(request):
+        return httpx.Response(400, json={"error": "bad"})
+
+    client = make_client(transport=httpx.MockTransport(bad_request), hedge_budget=0)
+    try:
+        client.post_json_sync(URL, {}, {})
+        raise AssertionError("400 should not be retried")
+    except httpx.HTTPStatusError as e:
+        assert e.response.status_code == 400
+    assert client.stats()["retries"] == 0
+    print("✅ Retry policy works")
+
+
+def test_timeout_recovers_after_fast_run():
+    """Slow calls after a run of fast ones get a longer timeout instead of looping"""
+    client = HedgedUpstreamClient(
+        "slow",
+        min_samples=5,
+        min_timeout=0.05,
+        max_timeout=2.0,
+        hedge_budget=0,
+        backoff_base=0.01,
+        backoff_max=0.02,
+    )
+    for _ in range(50):
+        client.latency.record(0.01)
+    assert client.timeout_for() == 0.05
+
+    def handler(request):
+        # MockTransport does not enforce timeouts, so simulate the read timeout
+        read_timeout = request.extensions["timeout"]["read"]
+        if read_timeout < 0.2:
+            time.sleep(read_timeout)
+            raise httpx.ReadTimeout("slow upstream", request=request)
+        time.sleep(0.2)
+        return httpx.Response(200, json={"ok": True})
+
+    client.transport = httpx.MockTransport(handler)
+    for _ in range(5):
+        assert client.post_json_sync(URL, {}, {}) == {"ok": True}
+    stats = client.stats()
+    print(f"Stats after slow calls: {stats}")
+    # Only the first slow call needs retries; later ones fit the raised timeout
+    assert stats["retries"] <= client.max_retries
+    assert client.timeout_for() >= 0.2
+    print("✅ Timeout does not ratchet below slow calls")
+
+
+if __name__ == "__main__":
+    test_adaptive_timeout()
+    test_async_hedge_wins()
+    test_sync_hedge_wins()
+    test_retry_on_429_and_5xx()
+    test_timeout_recovers_after_fast_run()
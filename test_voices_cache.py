@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached /voices listing (TTL, stale-while-revalidate, 304)
+ElevenLabs is replaced by a fake async client, so no API key or network is needed
+"""
+
+import os
+import asyncio
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test-key")
+os.environ.setdefault("ELEVENLABS_VOICE_ID", "test-voice")
+
+import httpx
+
+from api.app import app, tts_service
+from api.services.tts_service import CachedVoiceList
+
+TTL = 0.2
+
+
+class FakeVoices:
+    def __init__(self):
+        self.calls = 0
+        self.names = ["Nexa"]
+        self.fail = False
+
+    async def get_all(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise ConnectionError("ElevenLabs unreachable")
+        return SimpleNamespace(
+            voices=[
+                SimpleNamespace(voice_id=f"v{i}", name=name)
+                for i, name in enumerate(self.names)
+            ]
+        )
+
+
+async def _run():
+    fake = FakeVoices()
+    tts_service.client = SimpleNamespace(voices=fake)
+    tts_service.voices = CachedVoiceList(
+        tts_service._fetch_voices, ttl=TTL, retry_interval=10
+    )
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first, second = await asyncio.gather(
+            client.get("/voices"), client.get("/voices")
+        )
+        results["first"], results["second"] = first, second
+        results["calls_after_first"] = fake.calls
+        results["not_modified"] = await client.get(
+            "/voices", headers={"If-None-Match": first.headers["etag"]}
+        )
+
+        # Past the TTL: the stale list is served at once and refreshed in the background
+        fake.names = ["Nexa", "Binad"]
+        await asyncio.sleep(TTL + 0.05)
+        results["stale"] = await client.get("/voices")
+        await asyncio.sleep(0.1)
+        results["refreshed"] = await client.get("/voices")
+        results["calls_after_refresh"] = fake.calls
+
+        # ElevenLabs goes down: keep serving the cached list
+        fake.fail = True
+        await asyncio.sleep(TTL + 0.05)
+        results["outage"] = await client.get("/voices")
+        await asyncio.sleep(0.1)
+        results["outage_again"] = await client.get("/voices")
+        results["calls_after_outage"] = fake.calls
+    return results
+
+
+def test_voices_cache():
+    print("🧪 Testing cached /voices")
+    print("=" * 50)
+    r = asyncio.run(_run())
+
+    assert r["first"].status_code == 200 and r["second"].status_code == 200
+    assert r["first"].json() == {"voices": [{"id": "v0", "name": "Nexa"}]}
+    assert r["calls_after_first"] == 1
+    assert "max-age" in r["first"].headers["cache-control"]
+    print(f"  concurrent first requests → {r['calls_after_first']} upstream call")
+
+    assert r["not_modified"].status_code == 304
+    print("  matching If-None-Match → 304")
+
+    assert len(r["stale"].json()["voices"]) == 1
+    assert len(r["refreshed"].json()["voices"]) == 2
+    assert r["refreshed"].headers["etag"] != r["first"].headers["etag"]
+    assert r["calls_after_refresh"] == 2
+    print("  stale list served while one background refresh ran")
+
+    assert r["outage"].status_code == 200 and r["outage_again"].status_code == 200
+    assert len(r["outage_again"].json()["voices"]) == 2
+    # A failed refresh is not retried on every request
+    assert r["calls_after_outage"] == 3
+    print("✅ Voice list is cached, revalidated and survives outages")
+
+
+def test_first_fetch_failure_is_500():
+    fake = FakeVoices()
+    fake.fail = True
+    tts_service.client = SimpleNamespace(voices=fake)
+    tts_service.voices = CachedVoiceList(tts_service._fetch_voices, ttl=TTL)
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.get("/voices")
+
+    assert asyncio.run(fetch()).status_code == 500
+    print("✅ Nothing cached and upstream down → 500")
+
+
+if __name__ == "__main__":
+    test_voices_cache()
+    test_first_fetch_failure_is_500()